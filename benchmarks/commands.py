@@ -0,0 +1,81 @@
+"""
+Command overhead benchmark: cost of creating, configuring and executing command objects
+
+Creates commands with keyword and chained parameters, and executes them against a real Redis
+server, reporting the mean time per call. Creation is measured without Redis. Execution
+requires a running Redis server, e.g.:
+
+    docker run --rm -p 6379:6379 redis
+    PYTHONPATH=src python benchmarks/commands.py -n 100000
+
+Use `--no-redis` to only measure creation of the commands.
+"""
+
+import argparse
+import sys
+import time
+
+from rsmq import RedisSMQ
+
+
+def timed(func, count):
+    """Run func `count` times and return its mean duration in microseconds"""
+    start = time.perf_counter()
+    for _ in range(count):
+        func()
+    return (time.perf_counter() - start) * 1000000 / count
+
+
+def creation(rsmq, qname):
+    """Get benchmarks of creating and configuring commands"""
+    send = rsmq.prepare_send(qname=qname)
+    return {
+        "create (kwargs)": lambda: rsmq.sendMessage(qname=qname, message="message"),
+        "create (chained)": lambda: rsmq.sendMessage().qname(qname).message("message"),
+        "create + ready": lambda: rsmq.receiveMessage(qname=qname, vt=30).ready(),
+        "prepared + ready": lambda: send.command("message").ready(),
+    }
+
+
+def execution(rsmq, qname):
+    """Get benchmarks of creating and executing commands"""
+    send = rsmq.prepare_send(qname=qname)
+    return {
+        "sendMessage": lambda: rsmq.sendMessage(qname=qname, message="m").execute(),
+        "prepare_send": lambda: send("m"),
+        "popMessage": lambda: rsmq.popMessage(qname=qname).execute(),
+    }
+
+
+def main(argv=None):
+    """Parse args and run benchmark"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-H", dest="host", default="127.0.0.1", help="Redis Host")
+    parser.add_argument("-P", dest="port", type=int, default=6379, help="Redis Port")
+    parser.add_argument("-n", dest="count", type=int, default=100000, help="calls")
+    parser.add_argument("-q", dest="qname", default="benchmark", help="queue name")
+    parser.add_argument("--ns", dest="ns", default="rsmq-benchmark", help="namespace")
+    parser.add_argument(
+        "--no-redis", dest="redis", action="store_false", help="skip execution"
+    )
+    args = parser.parse_args(argv)
+
+    rsmq = RedisSMQ(
+        host=args.host, port=args.port, ns=args.ns, queue_cache_ttl=60, clock_sync=True
+    )
+    benchmarks = creation(rsmq, args.qname)
+    if args.redis:
+        rsmq.deleteQueue(qname=args.qname, quiet=True).exceptions(False).execute()
+        rsmq.createQueue(qname=args.qname).execute()
+        benchmarks.update(execution(rsmq, args.qname))
+
+    print("%-20s %10s" % ("operation", "mean(us)"))
+    for name, func in benchmarks.items():
+        print("%-20s %10.2f" % (name, timed(func, args.count)))
+
+    if args.redis:
+        rsmq.deleteQueue(qname=args.qname).execute()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
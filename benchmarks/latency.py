@@ -0,0 +1,106 @@
+"""
+Latency benchmark: two round trip commands vs single round trip (`single_rtt`) scripts
+
+Sends, receives, changes visibility of and pops messages against a real Redis server and
+reports per-call latency for both modes. Requires a running Redis server, e.g.:
+
+    docker run --rm -p 6379:6379 redis
+    PYTHONPATH=src python benchmarks/latency.py -n 5000
+
+"""
+
+import argparse
+import statistics
+import sys
+import time
+
+from rsmq import RedisSMQ
+
+OPERATIONS = ["sendMessage", "receiveMessage", "changeMessageVisibility", "popMessage"]
+
+
+def timed(func, *args):
+    """Run func and return its latency in microseconds"""
+    start = time.perf_counter()
+    func(*args)
+    return (time.perf_counter() - start) * 1000000
+
+
+def run(rsmq, qname, count):
+    """Run all operations `count` times and return dict of latencies per operation"""
+    rsmq.deleteQueue(qname=qname, quiet=True).exceptions(False).execute()
+    rsmq.createQueue(qname=qname).execute()
+
+    latencies = {operation: [] for operation in OPERATIONS}
+    message_ids = []
+
+    for i in range(count):
+        command = rsmq.sendMessage(qname=qname, message="message-%s" % i)
+        start = time.perf_counter()
+        message_ids.append(command.execute())
+        latencies["sendMessage"].append((time.perf_counter() - start) * 1000000)
+    for _ in range(count):
+        latencies["receiveMessage"].append(
+            timed(rsmq.receiveMessage(qname=qname, vt=60).execute)
+        )
+    for message_id in message_ids:
+        latencies["changeMessageVisibility"].append(
+            timed(
+                rsmq.changeMessageVisibility(qname=qname, id=message_id, vt=0).execute
+            )
+        )
+    for _ in range(count):
+        latencies["popMessage"].append(timed(rsmq.popMessage(qname=qname).execute))
+
+    rsmq.deleteQueue(qname=qname).execute()
+    return latencies
+
+
+def percentile(values, pct):
+    """Get percentile of values"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def report(results):
+    """Print latency comparison table"""
+    print(
+        "%-24s %-10s %10s %10s %10s"
+        % ("operation", "mode", "mean(us)", "p50(us)", "p99(us)")
+    )
+    for operation in OPERATIONS:
+        for mode, latencies in results.items():
+            values = latencies[operation]
+            print(
+                "%-24s %-10s %10.1f %10.1f %10.1f"
+                % (
+                    operation,
+                    mode,
+                    statistics.mean(values),
+                    percentile(values, 50),
+                    percentile(values, 99),
+                )
+            )
+
+
+def main(argv=None):
+    """Parse args and run benchmark"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-H", dest="host", default="127.0.0.1", help="Redis Host")
+    parser.add_argument("-P", dest="port", type=int, default=6379, help="Redis Port")
+    parser.add_argument("-n", dest="count", type=int, default=1000, help="messages")
+    parser.add_argument("-q", dest="qname", default="benchmark", help="queue name")
+    parser.add_argument("--ns", dest="ns", default="rsmq-benchmark", help="namespace")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for mode, single_rtt in (("two-rtt", False), ("single-rtt", True)):
+        rsmq = RedisSMQ(
+            host=args.host, port=args.port, ns=args.ns, single_rtt=single_rtt
+        )
+        results[mode] = run(rsmq, args.qname, args.count)
+    report(results)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,80 @@
+"""
+Memory benchmark: legacy vs compact storage layout
+
+Sends messages to a queue of each layout, receives all of them, and reports memory used by
+the queue per message (`MEMORY USAGE` of the queue keys) before and after receiving. Requires
+a running Redis server, e.g.:
+
+    docker run --rm -p 6379:6379 redis
+    PYTHONPATH=src python benchmarks/memory.py -n 10000 -s 100
+
+"""
+
+import argparse
+import sys
+
+from rsmq import RedisSMQ
+
+LAYOUTS = ["legacy", "compact"]
+
+
+def memory_usage(rsmq, qname):
+    """Get memory used by the keys of the queue, in bytes"""
+    client = rsmq.client
+    base = "%s:%s" % (rsmq.options["ns"], qname)
+    return sum(client.memory_usage(key, samples=0) or 0 for key in (base, base + ":Q"))
+
+
+def run(rsmq, qname, layout, count, size):
+    """
+    Send and receive `count` messages of `size` bytes
+
+    @return dict of bytes per message after sending ("sent") and after receiving ("received")
+    """
+    rsmq.deleteQueue(qname=qname, quiet=True).exceptions(False).execute()
+    rsmq.createQueue(qname=qname, layout=layout).execute()
+    empty = memory_usage(rsmq, qname)
+
+    message = "x" * size
+    rsmq.sendMessages(qname=qname, messages=[message] * count).execute()
+    sent = memory_usage(rsmq, qname)
+    while rsmq.receiveMessages(qname=qname, vt=3600, count=1000).execute():
+        pass
+    received = memory_usage(rsmq, qname)
+
+    rsmq.deleteQueue(qname=qname).execute()
+    return {
+        "sent": (sent - empty) / count,
+        "received": (received - empty) / count,
+    }
+
+
+def report(results):
+    """Print memory comparison table"""
+    print("%-10s %-10s %12s" % ("state", "layout", "bytes/msg"))
+    for state in ("sent", "received"):
+        for layout in LAYOUTS:
+            print("%-10s %-10s %12.1f" % (state, layout, results[layout][state]))
+
+
+def main(argv=None):
+    """Parse args and run benchmark"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-H", dest="host", default="127.0.0.1", help="Redis Host")
+    parser.add_argument("-P", dest="port", type=int, default=6379, help="Redis Port")
+    parser.add_argument("-n", dest="count", type=int, default=10000, help="messages")
+    parser.add_argument("-s", dest="size", type=int, default=100, help="message size")
+    parser.add_argument("-q", dest="qname", default="benchmark", help="queue name")
+    parser.add_argument("--ns", dest="ns", default="rsmq-benchmark", help="namespace")
+    args = parser.parse_args(argv)
+
+    rsmq = RedisSMQ(host=args.host, port=args.port, ns=args.ns)
+    results = {
+        layout: run(rsmq, args.qname, layout, args.count, args.size)
+        for layout in LAYOUTS
+    }
+    report(results)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
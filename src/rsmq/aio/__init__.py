@@ -0,0 +1,6 @@
+"""
+asyncio version of the Redis Simple Message Queue, built on `redis.asyncio`
+"""
+
+from .rsmq import AsyncRedisSMQ
+from .consumer import AsyncRedisSMQConsumer
@@ -0,0 +1,337 @@
+"""
+asyncio versions of the commands.
+
+Parameters, defaults and validation are shared with the regular commands - only the
+execution is awaitable.
+"""
+
+import time
+
+from ..cmd import ChangeMessageVisibilityCommand, ChangeMessagesVisibilityCommand
+from ..cmd import CreateQueueCommand, DeleteQueueCommand, ListQueuesCommand
+from ..cmd import DeleteMessageCommand, DeleteMessagesCommand
+from ..cmd import SendMessageCommand, ReceiveMessageCommand, PopMessageCommand
+from ..cmd import SendMessagesCommand, ReceiveMessagesCommand, PopMessagesCommand
+from ..cmd import SetQueueAttributesCommand, GetQueueAttributesCommand
+from ..cmd import MigrateQueueCommand, RedriveMessagesCommand
+from ..cmd.exceptions import QueueDoesNotExist
+from ..cmd.exceptions import RedisSMQException
+from ..cmd.utils import to_str
+
+
+class AsyncCommandMixin:
+    """Awaitable execution for commands"""
+
+    __slots__ = ()
+
+    async def execute(self):
+        """Execute Command"""
+        if self._exceptions:
+            return await self._exec()
+        try:
+            ret = await self._exec()
+        except RedisSMQException as ex:
+            return self._failed(ex)
+        return ret
+
+    async def _exec(self):
+        if self.ready():
+            return await self.exec_command()
+        return False
+
+    async def queue_def(self):
+        """Get Queue Definition"""
+        queue = None
+        while queue is None:
+            tx = self.client.pipeline(transaction=True)
+            state = self._queue_def_request(tx)
+            queue = self._queue_def_result(await tx.execute() if len(tx) else [], state)
+        return queue
+
+    async def server_time(self):
+        """Get Redis server time in microseconds, estimated locally if possible"""
+        now = self.parent.clock.time_usec()
+        if now is None:
+            sent = time.monotonic()
+            seconds, microseconds = await self.client.time()
+            now = self.parent.clock.sample(
+                seconds, microseconds, sent, time.monotonic()
+            )
+        return now
+
+    async def eval_script(self, name, *keys):
+        """Execute named Lua script, passing all arguments as keys"""
+        return await self.parent.scripts.evalsha(name, *keys, client=self.client)
+
+    async def exec_script(self):
+        """Execute command by running its Lua script"""
+        queue = await self.queue_def() if self.uses_queue_def else None
+        name, keys = self.script(queue)
+        return self.script_result(await self.eval_script(name, *keys))
+
+
+class AsyncCreateQueueCommand(AsyncCommandMixin, CreateQueueCommand):
+    """Create Queue if does not exist"""
+
+    __slots__ = ()
+
+    async def exec_command(self):
+        """Exec Command"""
+        if self.get_dead_letter_queue is not None:
+            self.check_dead_letter_queue(
+                await self.client.hexists(self.dead_letter_queue_key, "vt")
+            )
+        tx = self.client.pipeline(transaction=True)
+        self.create_request(tx)
+        self.create_result(await tx.execute())
+        await self.client.sadd(self.queue_set, self.get_qname)
+        return True
+
+
+class AsyncDeleteQueueCommand(AsyncCommandMixin, DeleteQueueCommand):
+    """Delete Queue if it exists"""
+
+    __slots__ = ()
+
+    async def exec_command(self):
+        """Exec Command"""
+        tx = self.client.pipeline(transaction=True)
+        self.delete_request(tx)
+        return self.delete_result(await tx.execute())
+
+
+class AsyncSetQueueAttributesCommand(AsyncCommandMixin, SetQueueAttributesCommand):
+    """Set Queue Attributes"""
+
+    __slots__ = ()
+
+    async def exec_command(self):
+        """Exec Command"""
+        if self.get_dead_letter_queue is not None:
+            self.check_dead_letter_queue(
+                await self.client.hexists(self.dead_letter_queue_key, "vt")
+            )
+        tx = self.client.pipeline(transaction=True)
+        self.attributes_request(tx)
+        return await self.attributes_result(await tx.execute()).execute()
+
+
+class AsyncMigrateQueueCommand(AsyncCommandMixin, MigrateQueueCommand):
+    """Migrate queue to compact storage layout"""
+
+    __slots__ = ()
+
+    async def exec_command(self):
+        """Exec Command"""
+        if not await self.client.hexists(self.queue_key, "vt"):
+            raise QueueDoesNotExist(self.get_qname)
+        tx = self.client.pipeline(transaction=True)
+        self.layout_request(tx)
+        self.layout_result(await tx.execute())
+
+        batch_size = int(self.get_batch_size)
+        start = converted = 0
+        while True:
+            checked, count = self.batch_result(
+                await self.eval_script("migrateQueueCompact", *self.batch_keys(start))
+            )
+            converted += count
+            start += checked
+            if checked < batch_size:
+                break
+        self.log.debug("Converted %s messages of %s", converted, self.queue_base)
+        return converted
+
+
+class AsyncRedriveMessagesCommand(AsyncCommandMixin, RedriveMessagesCommand):
+    """Move messages from a dead-letter queue back to `target` queue"""
+
+    __slots__ = ()
+
+    async def exec_command(self):
+        """Exec Command"""
+        moved = 0
+        for size in self.batches():
+            keys = self.batch_keys(size, int(await self.server_time() / 1000))
+            count = self.batch_result(await self.eval_script("redriveMessages", *keys))
+            moved += count
+            if count < size:
+                break
+        self.log.debug("Moved %s messages from %s", moved, self.queue_base)
+        return moved
+
+
+class AsyncGetQueueAttributesCommand(AsyncCommandMixin, GetQueueAttributesCommand):
+    """Get Queue Attributes from existing queue"""
+
+    __slots__ = ()
+
+    async def exec_command(self):
+        """Exec Command"""
+        now = int(await self.server_time() / 1000)
+        tx = self.client.pipeline(transaction=True)
+        self.attributes_request(tx, now)
+        return self.attributes_result(await tx.execute())
+
+
+class AsyncListQueuesCommand(AsyncCommandMixin, ListQueuesCommand):
+    """List Queues"""
+
+    __slots__ = ()
+
+    async def exec_command(self):
+        """Exec Command"""
+        return {to_str(qname) for qname in await self.client.smembers(self.queue_set)}
+
+
+class AsyncSendMessageCommand(AsyncCommandMixin, SendMessageCommand):
+    """Send Message"""
+
+    __slots__ = ()
+
+    async def exec_command(self):
+        """
+        Execute command
+
+        @raise QueueDoesNotExist if queue does not exist
+        """
+        if self.single_rtt:
+            return await self.exec_script()
+
+        queue = await self.queue_def()
+        tx = self.client.pipeline(transaction=True)
+        state = self.pipeline_request(tx, queue)
+        return self.pipeline_result(await tx.execute(), state)
+
+
+class AsyncSendMessagesCommand(AsyncCommandMixin, SendMessagesCommand):
+    """Send multiple messages into the queue"""
+
+    __slots__ = ()
+
+    async def exec_command(self):
+        """
+        Execute command
+
+        @raise QueueDoesNotExist if queue does not exist
+        @return list of message ids, in the order messages were provided
+        """
+        queue = await self.queue_def()
+        message_ids = []
+        for chunk in self.chunks():
+            tx = self.client.pipeline(transaction=True)
+            state = self.send_chunk_request(tx, queue, chunk, len(message_ids))
+            await tx.execute()
+            self.send_chunk_result(state, message_ids)
+        return message_ids
+
+
+class AsyncReceiveMessageCommand(AsyncCommandMixin, ReceiveMessageCommand):
+    """Receive Message"""
+
+    __slots__ = ()
+
+    async def exec_command(self):
+        """Execute"""
+        return await self.exec_script()
+
+
+class AsyncReceiveMessagesCommand(AsyncCommandMixin, ReceiveMessagesCommand):
+    """Receive up to `count` messages atomically, marking all of them invisible"""
+
+    __slots__ = ()
+
+    async def exec_command(self):
+        """Execute"""
+        return await self.exec_script()
+
+
+class AsyncPopMessageCommand(AsyncCommandMixin, PopMessageCommand):
+    """Receive Message and delete it"""
+
+    __slots__ = ()
+
+    async def exec_command(self):
+        """Execute"""
+        return await self.exec_script()
+
+
+class AsyncPopMessagesCommand(AsyncCommandMixin, PopMessagesCommand):
+    """Receive up to `count` messages and delete them, atomically"""
+
+    __slots__ = ()
+
+    async def exec_command(self):
+        """Execute"""
+        return await self.exec_script()
+
+
+class AsyncDeleteMessageCommand(AsyncCommandMixin, DeleteMessageCommand):
+    """Delete Message if it exists"""
+
+    __slots__ = ()
+
+    async def exec_command(self):
+        """Exec Command"""
+        return self.pipeline_result(await self.get_transaction().execute(), None)
+
+
+class AsyncDeleteMessagesCommand(AsyncCommandMixin, DeleteMessagesCommand):
+    """Delete multiple messages, if they exist, in one transaction"""
+
+    __slots__ = ()
+
+    async def exec_command(self):
+        """Exec Command"""
+        message_ids = self.message_ids
+        if not message_ids:
+            return {}
+        return self.pipeline_result(await self.get_transaction().execute(), message_ids)
+
+
+class AsyncChangeMessageVisibilityCommand(
+    AsyncCommandMixin, ChangeMessageVisibilityCommand
+):
+    """Change Message Visibility Timeout Command"""
+
+    __slots__ = ()
+
+    async def exec_command(self):
+        """Execute"""
+        return await self.exec_script()
+
+
+class AsyncChangeMessagesVisibilityCommand(
+    AsyncCommandMixin, ChangeMessagesVisibilityCommand
+):
+    """Change Visibility Timeout of multiple messages with a single script call"""
+
+    __slots__ = ()
+
+    async def exec_command(self):
+        """Execute"""
+        if not self.get_ids:
+            return []
+        return await self.exec_script()
+
+
+# asyncio versions of the commands
+ASYNC_COMMANDS = {
+    CreateQueueCommand: AsyncCreateQueueCommand,
+    DeleteQueueCommand: AsyncDeleteQueueCommand,
+    SetQueueAttributesCommand: AsyncSetQueueAttributesCommand,
+    GetQueueAttributesCommand: AsyncGetQueueAttributesCommand,
+    MigrateQueueCommand: AsyncMigrateQueueCommand,
+    RedriveMessagesCommand: AsyncRedriveMessagesCommand,
+    ListQueuesCommand: AsyncListQueuesCommand,
+    SendMessageCommand: AsyncSendMessageCommand,
+    SendMessagesCommand: AsyncSendMessagesCommand,
+    ReceiveMessageCommand: AsyncReceiveMessageCommand,
+    ReceiveMessagesCommand: AsyncReceiveMessagesCommand,
+    PopMessageCommand: AsyncPopMessageCommand,
+    PopMessagesCommand: AsyncPopMessagesCommand,
+    DeleteMessageCommand: AsyncDeleteMessageCommand,
+    DeleteMessagesCommand: AsyncDeleteMessagesCommand,
+    ChangeMessageVisibilityCommand: AsyncChangeMessageVisibilityCommand,
+    ChangeMessagesVisibilityCommand: AsyncChangeMessagesVisibilityCommand,
+}
@@ -0,0 +1,245 @@
+"""
+asyncio Python Redis Simple Queue Manager Consumer
+"""
+
+import asyncio
+import inspect
+import logging
+
+from .. import const
+from ..cmd import utils
+from ..cmd.exceptions import NoMessageInQueue
+from ..cmd.exceptions import RedisSMQException
+from ..consumer import RedisSMQConsumer
+from ..message import Message
+from ..retry_delay_handler import RetryDelayHandler
+from .lease_manager import AsyncLeaseManager
+from .realtime import AsyncRealtimeListener
+from .rsmq import AsyncRedisSMQ
+
+LOG = logging.getLogger(__name__)
+
+
+class AsyncRedisSMQConsumer(RedisSMQConsumer):
+    """
+    RSMQ Consumer Worker for asyncio.
+
+    Processes up to `concurrency` messages concurrently, each in its own asyncio task.
+    Processor may be an `async def` function (or a regular one). Visibility timeout of all
+    in-flight messages is kept extended by a single asyncio task, and in-flight messages are
+    allowed to complete when consumer is stopped.
+
+        consumer = AsyncRedisSMQConsumer("my-queue", processor, host="127.0.0.1")
+        await consumer.run()
+    """
+
+    # local parameters and their value
+    LOCAL_PARAMS = dict(RedisSMQConsumer.LOCAL_PARAMS, concurrency=100, batch_size=10)
+    # controller class
+    CONTROLLER = AsyncRedisSMQ
+
+    def __init__(self, qname, processor, **rsmq_params):
+        """
+        initialize
+
+        Required Parameters:
+
+        @param qname: queue name
+        @param processor: processor (`async def` or regular function) for each item
+
+        Optional Parameters (in addition to ones of RedisSMQConsumer):
+        @param concurrency: max number of messages processed concurrently
+        @param batch_size: max number of messages received in one call
+
+        Remaining args are passed to AsyncRedisSMQ()
+
+        """
+        super(AsyncRedisSMQConsumer, self).__init__(qname, processor, **rsmq_params)
+        self._tasks = set()
+        self._semaphore = None
+        # number of slots taken by messages being processed (or received)
+        self._in_flight = 0
+        self._wakeup = None
+        self._done = None
+
+    @property
+    def concurrency(self):
+        """max number of messages processed concurrently"""
+        return int(self._param("concurrency"))
+
+    @property
+    def batch_size(self):
+        """max number of messages received in one call"""
+        return int(self._param("batch_size"))
+
+    def _get_vt(self):
+        """VT is read from the queue info when consumer starts"""
+
+    async def _resolve_vt(self):
+        """Get VT from the queue info if not set"""
+        if self.vt is None:
+            queue_info = await (
+                self.rsqm.getQueueAttributes()
+                .qname(self.qname)
+                .exceptions(False)
+                .execute()
+            )
+            if queue_info and "vt" in queue_info:
+                self.vt = int(queue_info.get("vt", const.VT_DEFAULT))
+            else:
+                self.vt = const.VT_DEFAULT
+
+    async def stop(self, wait=None):
+        """Stop, waiting up to `wait` seconds for consumer to finish"""
+        self._request_stop = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+        if wait and self._done is not None:
+            try:
+                await asyncio.wait_for(self._done.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+        return self._request_stop is None
+
+    async def on_success(self, msg):
+        """Run on success"""
+        # delete the item
+        if msg and "id" in msg:
+            self.trace("Processed message %s", msg["id"])
+            await self.rsqm.deleteMessage(qname=self.qname, id=msg["id"]).execute()
+
+    async def on_failure(self, msg):
+        """Run on failure"""
+        if msg and "id" in msg:
+            LOG.warning("Failed to process message %s", msg["id"])
+            await self.rsqm.changeMessageVisibility(
+                vt=self.retry_delay, qname=self.qname, id=msg["id"]
+            ).execute()
+
+    async def create_queue(self):
+        """Create queue if it does not exists"""
+        await self.rsqm.createQueue(qname=self.qname, quiet=True).exceptions(
+            False
+        ).execute()
+
+    async def process(self, msg):
+        """Process a single message, then acknowledge it"""
+        try:
+            try:
+                if self.message_object:
+                    success = self.processor(Message.from_dict(msg, self.decode))
+                else:
+                    if self.decode and "message" in msg:
+                        msg["message"] = utils.decode_message(msg["message"])
+                    success = self.processor(**msg)
+                if inspect.isawaitable(success):
+                    success = await success
+            except Exception as ex:
+                LOG.warning("Processor failed for message %s: %s", msg["id"], ex)
+                success = False
+            finally:
+                await self.leases.unregister(msg["id"])
+            if success:
+                await self.on_success(msg)
+            else:
+                await self.on_failure(msg)
+        except Exception as ex:
+            LOG.warning("Failed to acknowledge message %s: %s", msg["id"], ex)
+        finally:
+            self._release_slot()
+
+    async def _acquire_slot(self):
+        """Wait for an idle slot and take it"""
+        await self._semaphore.acquire()
+        self._in_flight += 1
+
+    def _release_slot(self):
+        """Give back a slot taken by `_acquire_slot()`"""
+        self._in_flight -= 1
+        self._semaphore.release()
+
+    async def consume(self):
+        """Wait for an idle slot, then receive messages and start processing them"""
+        await self._acquire_slot()
+        # idle slots, including the one just taken
+        count = max(1, min(self.batch_size, self.concurrency - self._in_flight + 1))
+        try:
+            msgs = await self.rsqm.receiveMessages(
+                qname=self.qname, count=count
+            ).execute()
+        except BaseException:
+            self._release_slot()
+            raise
+        for msg in msgs:
+            self.leases.register(msg["id"])
+        for index, msg in enumerate(msgs):
+            if index:
+                await self._acquire_slot()
+            task = asyncio.ensure_future(self.process(msg))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def sleep(self, delay):
+        """Sleep for `delay` seconds, or until consumer is stopped"""
+        if delay and not self._request_stop:
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def wait_for_messages(self):
+        """Wait before retrying when there are no messages in queue"""
+        delay = self.empty_queue_delay
+        if self.notifications is not None:
+            self.trace("No message in queue, waiting up to %s seconds", delay)
+            await self.notifications.wait(delay)
+            return
+        self.trace("No message in queue, waiting %s seconds", delay)
+        await self.sleep(delay)
+
+    async def shutdown(self):
+        """Wait for in-flight messages to complete and stop extending their visibility"""
+        if self._tasks:
+            self.trace("Waiting for %s in-flight messages", len(self._tasks))
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.leases.stop()
+        if self.notifications is not None:
+            await self.notifications.close()
+
+    async def run(self):
+        """main loop of the consumer"""
+        self.trace("Starting Queue Consumer for %s", self.qname)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._wakeup = asyncio.Event()
+        self._done = asyncio.Event()
+        await self.create_queue()
+        await self._resolve_vt()
+        retry_delay = RetryDelayHandler(0, 60)
+        self.leases = AsyncLeaseManager(self.rsqm, self.qname, self.vt)
+        self.leases.start()
+        if self.realtime:
+            self.notifications = AsyncRealtimeListener(self.rsqm, self.qname)
+        try:
+            while not self._request_stop:
+                try:
+                    await self.consume()
+                    retry_delay.reset()
+                except NoMessageInQueue:
+                    await self.wait_for_messages()
+                except RedisSMQException as ex:
+                    LOG.warning(
+                        "Exception while processing queue `%s`: %s", self.qname, ex
+                    )
+                except Exception as ex:
+                    LOG.warning(
+                        "Unexpected error while processing queue `%s`: %s",
+                        self.qname,
+                        ex,
+                    )
+                    await self.sleep(retry_delay.next_delay())
+        finally:
+            await self.shutdown()
+            self._request_stop = None
+            self._done.set()
+            self.trace("Ended Queue Consumer for %s", self.qname)
@@ -0,0 +1,70 @@
+"""
+Pipeline executing multiple commands together, for asyncio
+"""
+
+import logging
+
+from ..cmd.exceptions import RedisSMQException
+from ..pipeline import RedisSMQPipeline
+
+LOG = logging.getLogger(__name__)
+
+
+class AsyncRedisSMQPipeline(RedisSMQPipeline):
+    """
+    Version of RedisSMQPipeline for `AsyncRedisSMQ`:
+
+        async with rsmq.pipeline() as pipeline:
+            pipeline.add(rsmq.sendMessage(qname="queue-1", message="Hello"))
+            pipeline.add(rsmq.deleteMessage(qname="input", id=message_id))
+        message_id, deleted = pipeline.results
+    """
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            await self.execute()
+        return False
+
+    async def _execute_one(self, command):
+        """Execute command on its own"""
+        try:
+            return await command.execute()
+        except RedisSMQException as ex:
+            return self._error(command, ex)
+
+    async def execute(self):
+        """
+        Execute all commands
+
+        @return list of results, in the order commands were added
+        """
+        commands, batches = self._prepare()
+        for batch in batches:
+            if isinstance(batch, list):
+                await self._execute_batch(commands, batch)
+            else:
+                self.results[batch] = await self._execute_one(commands[batch])
+        return self._finish()
+
+    async def _execute_batch(self, commands, pipelined):
+        """Execute commands together, in at most two round trips"""
+        queue_defs = {}
+        stale = [commands[index] for index in pipelined]
+        while stale:
+            tx = self.rsmq.client.pipeline(transaction=False)
+            queues = self._queue_def_request(tx, stale)
+            if not queues:
+                break
+            results = await tx.execute() if len(tx) else []
+            stale = self._queue_def_result(queues, results, queue_defs)
+
+        await self.rsmq.scripts.load()
+        tx = self.rsmq.client.pipeline(transaction=True)
+        pending = self._request(tx, commands, pipelined, queue_defs)
+        results = await tx.execute(raise_on_error=False) if len(tx) else []
+        for index in self._result(commands, pending, results):
+            LOG.info("Scripts are not loaded in Redis, executing command again")
+            self.results[index] = await self._execute_one(commands[index])
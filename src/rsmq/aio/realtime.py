@@ -0,0 +1,63 @@
+"""
+Realtime notifications about new messages for asyncio
+"""
+
+import time
+
+from ..realtime import RealtimeListener
+
+
+class AsyncRealtimeListener(RealtimeListener):
+    """Version of RealtimeListener for `AsyncRedisSMQ`"""
+
+    async def subscribe(self):
+        """Subscribe to the notification channel"""
+        self.pubsub = self.rsmq.client.pubsub(ignore_subscribe_messages=True)
+        await self.pubsub.subscribe(self.channel)
+
+    async def next_visible(self):
+        """Get time, in seconds, until the next message becomes visible, or None"""
+        tx = self.rsmq.client.pipeline(transaction=False)
+        tx.zrange(self.queue_base, 0, 0, withscores=True)
+        tx.time()
+        items, (seconds, microseconds) = await tx.execute()
+        if not items:
+            return None
+        now = int(seconds) * 1000 + int(microseconds) // 1000
+        return max(0.0, (float(items[0][1]) - now) / 1000.0)
+
+    async def wait(self, timeout):
+        """
+        Wait up to `timeout` seconds for new messages
+
+        @return True if notification was received
+        """
+        if self.pubsub is None:
+            # Notifications published before subscribing are lost, so the queue must be
+            # checked again before waiting
+            await self.subscribe()
+            return False
+
+        next_visible = await self.next_visible()
+        if next_visible is not None:
+            timeout = min(timeout, next_visible)
+
+        wait_until = time.monotonic() + timeout
+        notified = False
+        while not notified:
+            remaining = wait_until - time.monotonic()
+            if remaining <= 0:
+                break
+            notified = await self.pubsub.get_message(timeout=remaining) is not None
+
+        # Drop queued notifications, they are all handled by the next receive
+        while await self.pubsub.get_message(timeout=0) is not None:
+            pass
+        return notified
+
+    async def close(self):
+        """Unsubscribe and release the connection"""
+        if self.pubsub is not None:
+            close = getattr(self.pubsub, "aclose", None) or self.pubsub.close
+            await close()
+            self.pubsub = None
@@ -0,0 +1,64 @@
+"""
+asyncio Python Redis Simple Queue Manager
+"""
+
+from redis.asyncio import Redis
+
+from ..cmd.exceptions import CommandNotImplementedException
+from ..rsmq import RedisSMQ
+from .commands import ASYNC_COMMANDS
+from .pipeline import AsyncRedisSMQPipeline
+from .scripts import AsyncScriptManager
+
+
+class AsyncRedisSMQ(RedisSMQ):
+    """
+    Redis Simple Message Queue implementation for asyncio, built on `redis.asyncio`.
+
+    Has the same API as `RedisSMQ`, except that `execute()` of each command is awaitable:
+
+        message_id = await rsmq.sendMessage(qname="my-queue", message="Hello").execute()
+    """
+
+    def __init__(
+        self, client=None, host="127.0.0.1", port="6379", options=None, **kwargs
+    ):
+        """
+        Constructor:
+
+        @param client: if provided, `redis.asyncio` client object to use
+        @param host: if client is not provided, redis hostname
+        @param port: if client is not provided, redis port
+        @param options: if client is not provided, additional options for redis client creation
+
+        Remaining arguments are same as for `RedisSMQ`
+        """
+        super(AsyncRedisSMQ, self).__init__(
+            client=client, host=host, port=port, options=options, **kwargs
+        )
+        self.scripts = AsyncScriptManager(self)
+
+    @property
+    def client(self):
+        """get Redis client. Create one if one does not exist"""
+        if not self._client:
+            self._client = Redis(**self.redis_options)
+            self._own_client = True
+        return self._client
+
+    def _command(self, command, **kwargs):
+        """Run command"""
+        if command not in ASYNC_COMMANDS:
+            raise CommandNotImplementedException()
+        return super(AsyncRedisSMQ, self)._command(ASYNC_COMMANDS[command], **kwargs)
+
+    def pipeline(self):
+        """Create pipeline executing multiple commands together (see `RedisSMQ.pipeline()`)"""
+        return AsyncRedisSMQPipeline(self)
+
+    async def quit(self):
+        """Close connections of the client created by this controller"""
+        if self._client is not None and self._own_client:
+            close = getattr(self._client, "aclose", None) or self._client.close
+            await close()
+        self._client = None
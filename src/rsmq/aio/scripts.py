@@ -0,0 +1,66 @@
+"""
+Lua script manager for asyncio clients
+"""
+import asyncio
+import logging
+
+from redis.exceptions import NoScriptError
+
+from ..scripts import ScriptManager
+
+LOG = logging.getLogger(__name__)
+
+
+class AsyncScriptManager(ScriptManager):
+    """
+    Version of ScriptManager for asyncio clients: scripts are loaded once and only
+    re-loaded if Redis reports it no longer has them
+    """
+
+    def __init__(self, rsmq, scripts=None):
+        """Initialize"""
+        super(AsyncScriptManager, self).__init__(rsmq, scripts)
+        self._load_lock = None
+
+    async def load(self, force=False):
+        """
+        Load all scripts into Redis in one round trip, unless already loaded
+
+        @return dict of script SHA1s, by name
+        """
+        if self._load_lock is None:
+            self._load_lock = asyncio.Lock()
+        async with self._load_lock:
+            if self._sha1 and not force:
+                return self._sha1
+            names = list(self.scripts)
+            tx = self.rsmq.client.pipeline(transaction=False)
+            for name in names:
+                tx.script_load(self.scripts[name])
+            self._sha1 = dict(zip(names, await tx.execute()))
+            self.loads += len(names)
+            LOG.debug("Loaded %s scripts", len(names))
+            return self._sha1
+
+    async def sha1(self, name):
+        """Get SHA1 of a loaded script"""
+        sha1s = self._sha1 or await self.load()
+        return sha1s[name]
+
+    async def evalsha(self, name, *keys, client=None):
+        """
+        Execute script by name, passing all arguments as keys.
+
+        If Redis no longer has the script, scripts are re-loaded and execution is retried once
+        """
+        if client is None:
+            client = self.rsmq.client
+        sha1 = await self.sha1(name)
+        self.executions += 1
+        try:
+            return await client.evalsha(sha1, len(keys), *keys)
+        except NoScriptError:
+            LOG.info("Script '%s' is not loaded in Redis, re-loading scripts", name)
+            self.reloads += 1
+            await self.load(force=True)
+            return await client.evalsha(await self.sha1(name), len(keys), *keys)
@@ -0,0 +1,127 @@
+"""
+Estimation of Redis server time
+"""
+
+import threading
+import time
+
+
+class ClockSync:
+    """
+    Estimates Redis server time locally, from samples of the `TIME` command, so commands do not
+    have to read it on every call.
+
+    Each sample is taken at the midpoint of its round trip, so its error is at most half of the
+    round trip time. Offset between server time and `time.monotonic()` is taken from the most
+    precise recent sample, and its drift from the change of offset between samples. The error
+    bound of the estimate grows with its age by `MAX_DRIFT`, and the estimate is considered
+    stale (and `time_usec()` returns None) once the bound exceeds `max_error`, or `interval`
+    seconds after the sample was taken. Commands then read `TIME` again, and the result is used
+    as a new sample - so while the controller is in use, server time is sampled every
+    `interval` seconds.
+    """
+
+    # max rate (seconds per second) at which unaccounted drift is assumed to grow
+    MAX_DRIFT = 0.0001
+    # Drift estimates beyond this rate are treated as clock jumps and ignored
+    DRIFT_LIMIT = 0.001
+
+    def __init__(self, enabled=False, max_error=0.01, interval=10):
+        """
+        Initialize
+
+        @param enabled: if false, estimate is never available
+        @param max_error: max error (in seconds) of the estimate
+        @param interval: max time (in seconds) the estimate is used for without a new sample
+        """
+        self.enabled = enabled
+        self.max_error = max_error
+        self.interval = interval
+        self._lock = threading.Lock()
+        # (monotonic time of the sample, offset in usec, error in seconds)
+        self._sample = None
+        # sample the drift is estimated from
+        self._base = None
+        self._drift = 0.0
+        self.samples = 0
+        self.estimates = 0
+
+    def reset(self):
+        """Drop all samples"""
+        with self._lock:
+            self._sample = None
+            self._base = None
+            self._drift = 0.0
+
+    def error(self, now=None):
+        """Error bound (in seconds) of the current estimate, or None if there is no estimate"""
+        sample = self._sample
+        if sample is None:
+            return None
+        if now is None:
+            now = time.monotonic()
+        return sample[2] + (now - sample[0]) * self.MAX_DRIFT
+
+    def time_usec(self):
+        """Get estimated Redis server time in microseconds, or None if estimate is stale"""
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            sample = self._sample
+            if sample is None or now - sample[0] > self.interval:
+                return None
+            if self.error(now) > self.max_error:
+                return None
+            self.estimates += 1
+            age = now - sample[0]
+            return int(sample[1] + now * 1000000 + age * self._drift * 1000000)
+
+    def sample(self, seconds, microseconds, sent, received):
+        """
+        Add sample of the Redis server time
+
+        @param seconds: seconds part of `TIME` result
+        @param microseconds: microseconds part of `TIME` result
+        @param sent: `time.monotonic()` before the request was sent
+        @param received: `time.monotonic()` after the response was received
+        @return server time in microseconds
+        """
+        server_usec = int(seconds) * 1000000 + int(microseconds)
+        if not self.enabled:
+            return server_usec
+        midpoint = (sent + received) / 2
+        error = (received - sent) / 2
+        if error > self.max_error:
+            return server_usec
+        sample = (midpoint, server_usec - midpoint * 1000000, error)
+        with self._lock:
+            self.samples += 1
+            base = self._base
+            if base is None:
+                self._base = sample
+            else:
+                # Drift is only estimated over intervals long enough for errors of both
+                # samples to add up to less than MAX_DRIFT
+                elapsed = midpoint - base[0]
+                if elapsed > 0 and (base[2] + error) / elapsed <= self.MAX_DRIFT:
+                    drift = (sample[1] - base[1]) / 1000000 / elapsed
+                    self._drift = drift if abs(drift) <= self.DRIFT_LIMIT else 0.0
+                    self._base = sample
+            current = self._sample
+            if (
+                current is None
+                or midpoint - current[0] > self.interval
+                or error <= self.error(midpoint)
+            ):
+                self._sample = sample
+        return server_usec
+
+    def stats(self):
+        """Get counters of samples and local estimates"""
+        return {
+            "samples": self.samples,
+            "estimates": self.estimates,
+            "drift": self._drift,
+            "error": self.error(),
+        }
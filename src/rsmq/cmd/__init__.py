@@ -3,13 +3,20 @@ Commands
 """
 
 from .change_message_visibility import ChangeMessageVisibilityCommand
+from .change_messages_visibility import ChangeMessagesVisibilityCommand
 from .create_queue import CreateQueueCommand
 from .delete_message import DeleteMessageCommand
+from .delete_messages import DeleteMessagesCommand
 from .delete_queue import DeleteQueueCommand
 from .exceptions import *
 from .get_queue_attributes import GetQueueAttributesCommand
 from .list_queues import ListQueuesCommand
+from .migrate_queue import MigrateQueueCommand
 from .pop_message import PopMessageCommand
+from .pop_messages import PopMessagesCommand
 from .receive_message import ReceiveMessageCommand
+from .receive_messages import ReceiveMessagesCommand
+from .redrive_messages import RedriveMessagesCommand
 from .send_message import SendMessageCommand
+from .send_messages import SendMessagesCommand
 from .set_queue_attributes import SetQueueAttributesCommand
@@ -4,37 +4,113 @@ Base Command for all the commands
 
 import logging
 import re
+import time
 
 from .. import const
+from ..codec import CODECS
+from ..compression import decompress
 from .exceptions import CommandNotImplementedException
 from .exceptions import InvalidParameterValue
 from .exceptions import QueueDoesNotExist
 from .exceptions import RedisSMQException
-from .utils import validate_int
+from .utils import to_str, validate_int
 
 # REGEX matching invalid QNAME characters
 QNAME_INVALID_RE = re.compile(const.QNAME_INVALID_CHARS_RE)
 
 
+def _param_setter(name):
+    """Create setter method of the named parameter"""
+
+    def setter(self, value):
+        if self._validate_param(name, value):
+            self._params[name] = value
+        elif self._exceptions:
+            raise InvalidParameterValue(name, value)
+        elif self.get_quiet is not True:
+            self.log.info("Invalid value for '%s': '%s'", name, value)
+        return self
+
+    setter.__name__ = name
+    setter.__doc__ = "Set '%s' parameter" % name
+    return setter
+
+
+def _param_getter(name):
+    """Create property getting value of the named parameter"""
+    return property(
+        lambda self: self._params[name], doc="Value of '%s' parameter" % name
+    )
+
+
 class BaseRSMQCommand:
-    """Base for all RQMS commands"""
+    """
+    Base for all RQMS commands
+
+    Parameter metadata (defaults, required parameters and validators) is computed once per
+    command class from `PARAMS`, which also gets a setter method (e.g. `qname(value)`) and a
+    `get_<name>` property for each parameter
+    """
+
+    __slots__ = ("parent", "_params", "__exceptions", "_validated", "_keys")
 
     PARAMS = {
         "qname": {"required": True, "value": None},
         "quiet": {"required": False, "value": False},
     }
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._prepare_params()
+
+    @classmethod
+    def _prepare_params(cls):
+        """Compute parameter metadata of the class and create parameter accessors"""
+        cls.log = logging.getLogger(f"rsmq.cmd.{cls.__name__}")
+        cls._DEFAULTS = {
+            name: definition.get("value", None)
+            for name, definition in cls.PARAMS.items()
+        }
+        cls._REQUIRED = tuple(
+            name
+            for name, definition in cls.PARAMS.items()
+            if definition.get("required", False) is True
+        )
+        cls._VALIDATORS = {
+            name: getattr(cls, f"_validate_{name}", None) for name in cls.PARAMS
+        }
+        for name in cls.PARAMS:
+            if not hasattr(cls, name):
+                setattr(cls, name, _param_setter(name))
+            if not hasattr(cls, f"get_{name}"):
+                setattr(cls, f"get_{name}", _param_getter(name))
+
     def __init__(self, rsmq, **kwargs):
-        self.log = logging.getLogger(f"rsmq.cmd.{self.__class__.__name__}")
         self.parent = rsmq
-        self._params = {}
-        # Load Defaults
-        for name, value in self._param_defaults().items():
-            self._params[name] = value
+        self._params = self._DEFAULTS.copy()
         # load args
         for name, value in kwargs.items():
             self._set_param(name, value)
         self.__exceptions = None
+        self._validated = False
+        self._keys = None
+
+    def prepared(self, keys, **params):
+        """
+        Get copy of this command, whose parameters were validated, with `params` set.
+
+        Used by prepared commands (see `rsmq.prepared.PreparedSend`): copy skips validation
+        of its parameters, so `params` must be validated by the caller
+
+        @param keys: (queue_base, queue_key) of the command
+        """
+        command = self.__class__.__new__(self.__class__)
+        command.parent = self.parent
+        command._params = dict(self._params, **params)
+        command.__exceptions = self.__exceptions
+        command._validated = True
+        command._keys = keys
+        return command
 
     @property
     def popMessageSha1(self):  # pylint: disable=C0103
@@ -51,6 +127,39 @@ class BaseRSMQCommand:
         """changeMessageVisibilitySha1"""
         return self.parent.changeMessageVisibilitySha1
 
+    def eval_script(self, name, *keys):
+        """Execute named Lua script, passing all arguments as keys"""
+        return self.parent.scripts.evalsha(name, *keys, client=self.client)
+
+    def script_request(self, tx, name, *keys):
+        """Add named Lua script call, passing all arguments as keys, to a transaction"""
+        self.parent.scripts.request(tx, name, *keys)
+
+    @property
+    def single_rtt(self):
+        """Returns true if queue definition should be resolved inside the scripts"""
+        return self.config("single_rtt", False) is True
+
+    @property
+    def realtime(self):
+        """Returns true if new messages should be published to the realtime channel"""
+        return self.config("realtime", False) is True
+
+    @property
+    def realtime_prefix(self):
+        """Get prefix of the channels notifications about new messages are published to"""
+        return self.namespace + const.REALTIME_PREFIX
+
+    @property
+    def realtime_channel(self):
+        """Get name of the channel notifications about new messages are published to"""
+        return self.realtime_prefix + self.get_qname
+
+    def publish(self, tx, count):
+        """Add notification about `count` new messages to transaction, if realtime is on"""
+        if self.realtime:
+            tx.publish(self.realtime_channel, count)
+
     @property
     def _exceptions(self):
         """Returns true if exceptions are enabled"""
@@ -70,18 +179,11 @@ class BaseRSMQCommand:
 
     def _param_defaults(self):
         """Get dict of default parameters and their values"""
-        defaults = {}
-        for name, value in self.PARAMS.items():
-            defaults[name] = value.get("value", None)
-        return defaults
+        return dict(self._DEFAULTS)
 
     def _required_params(self):
         """List of parameters that are required"""
-        return [
-            param
-            for param, definition in self.PARAMS.items()
-            if definition.get("required", False) is True
-        ]
+        return list(self._REQUIRED)
 
     def config(self, key, default_value):
         """Get value from global config"""
@@ -98,11 +200,15 @@ class BaseRSMQCommand:
     @property
     def queue_base(self):
         """Get base name of the queue"""
+        if self._keys is not None:
+            return self._keys[0]
         return self.namespace + self.get_qname
 
     @property
     def queue_key(self):
         """Get Full queue name"""
+        if self._keys is not None:
+            return self._keys[1]
         return self.queue_base + const.QUEUE_SUFFUX
 
     @property
@@ -114,36 +220,11 @@ class BaseRSMQCommand:
         """Get parameter by name"""
         return self._params.get(param, self.PARAMS[param].get("default", default_value))
 
-    def __getattr__(self, name):
-        """
-        Create setters for parameters on the fly
-        """
-        if name in self.PARAMS:
-
-            def setter(value):
-                if self._validate_param(name, value):
-                    self._params[name] = value
-                elif self._exceptions:
-                    raise InvalidParameterValue(name, value)
-                elif self.get_quiet is not True:
-                    self.log.info("Invalid value for '%s': '%s'", name, value)
-                return self
-
-            return setter
-        if name.startswith("get_"):
-            param = name[4:]
-            if param in self.PARAMS:
-                return self.param_get(param, default_value=None)
-
-        raise AttributeError(
-            f"'{self.__class__.__name__}' object has no attribute '{name}'"
-        )
-
     def _validate_param(self, name, value):
         """Validate parameter value"""
-        if hasattr(self, f"_validate_{name}"):
-            validator = getattr(self, f"_validate_{name}")
-            return validator(value)
+        validator = self._VALIDATORS.get(name)
+        if validator is not None:
+            return validator(self, value)
         return self._default_validator(name, value)
 
     def _default_validator(self, name, value):
@@ -178,6 +259,28 @@ class BaseRSMQCommand:
             delay, const.DELAY_MIN, const.DELAY_MAX, logger=self.log, name="delay"
         )
 
+    def _validate_count(self, count):
+        """Validate count (number of messages) parameter"""
+        return validate_int(
+            count,
+            const.RECEIVE_COUNT_MIN,
+            const.RECEIVE_COUNT_MAX,
+            logger=self.log,
+            name="count",
+        )
+
+    def _validate_ids(self, ids):
+        """Validate ids parameter - a list, tuple or set of message ids"""
+        return isinstance(ids, (list, tuple, set, frozenset))
+
+    @property
+    def message_ids(self):
+        """List of message ids, decoded to strings when provided as bytes"""
+        return [
+            message_id.decode("utf-8") if isinstance(message_id, bytes) else message_id
+            for message_id in self.get_ids
+        ]
+
     def _validate_maxsize(self, maxsize):
         """Validate maxsize parameter"""
         return maxsize == -1 or validate_int(
@@ -188,9 +291,43 @@ class BaseRSMQCommand:
             name="maxsize",
         )
 
+    def _validate_max_receive_count(self, max_receive_count):
+        """Validate max_receive_count parameter"""
+        return validate_int(
+            max_receive_count,
+            const.MAX_RECEIVE_COUNT_MIN,
+            const.MAX_RECEIVE_COUNT_MAX,
+            logger=self.log,
+            name="max_receive_count",
+        )
+
+    def _validate_dead_letter_queue(self, dead_letter_queue):
+        """Validate dead_letter_queue parameter - name of a queue"""
+        return self._validate_qname(dead_letter_queue)
+
+    def _validate_layout(self, layout):
+        """Validate layout parameter"""
+        return layout in const.LAYOUTS
+
+    def _validate_codec(self, codec):
+        """Validate codec parameter - name of a registered codec"""
+        return codec in CODECS
+
+    @property
+    def message_codec(self):
+        """
+        Name of the codec messages are encoded with: `codec` parameter of the command, else
+        codec of the queue or default codec set by controller options
+        """
+        codec = self.get_codec
+        if codec is None:
+            codec = self.config("queue_codecs", None) or {}
+            codec = codec.get(self.get_qname, self.config("codec", None))
+        return codec
+
     def _set_param(self, name, value):
         """set parameter, with validation"""
-        if name in self.PARAMS:
+        if name in self._DEFAULTS:
             if self._validate_param(name, value):
                 self._params[name] = value
                 return True
@@ -198,7 +335,9 @@ class BaseRSMQCommand:
 
     def ready(self):
         """Check if we are ready to execute"""
-        for param in self._required_params():
+        if self._validated:
+            return True
+        for param in self._REQUIRED:
             if not self._validate_param(param, self._params[param]):
                 self.log.info("Invalid value for parameter '%s'", param)
                 return False
@@ -211,16 +350,20 @@ class BaseRSMQCommand:
         try:
             ret = self._exec()
         except RedisSMQException as ex:
-            if self.get_quiet is not True:
-                self.log.warning(
-                    "%s: Exception while processing %s: %s",
-                    ex.__class__.__name__,
-                    self.__class__.__name__,
-                    ex,
-                )
-            return False
+            return self._failed(ex)
         return ret
 
+    def _failed(self, ex):
+        """Log exception (unless quiet) when exceptions are disabled, returns False"""
+        if self.get_quiet is not True:
+            self.log.warning(
+                "%s: Exception while processing %s: %s",
+                ex.__class__.__name__,
+                self.__class__.__name__,
+                ex,
+            )
+        return False
+
     def _exec(self):
         if self.ready():
             return self.exec_command()
@@ -230,28 +373,188 @@ class BaseRSMQCommand:
         """Execute Command"""
         raise CommandNotImplementedException()
 
-    def queue_def(self):
-        """Get Queue Definition"""
-        queue_key = self.queue_key
-        tx = self.client.pipeline(transaction=True)
-        tx.hmget(queue_key, "vt", "delay", "maxsize")
-        tx.time()
+    # Commands that can be executed as part of a pipeline (see `RedisSMQ.pipeline()`)
+    # implement `pipeline_request()` and `pipeline_result()`, or `script()` if the command
+    # is a single Lua script call
+    PIPELINED = False
+
+    @property
+    def uses_queue_def(self):
+        """Returns true if command needs the queue definition to build its operations"""
+        return False
 
-        results = tx.execute()
+    def pipeline_request(self, tx, queue):
+        """
+        Add operations of the command to a shared transaction
 
-        if not results or results[0][0] is None:
-            raise QueueDoesNotExist(self.get_qname)
-        stats = results[0]
-        redis_time = results[1]
+        @param tx: transaction to add the operations to
+        @param queue: queue definition, if `uses_queue_def`
+        @return state to pass to `pipeline_result()`
+        """
+        name, keys = self.script(queue)
+        self.script_request(tx, name, *keys)
 
-        ts_usec = redis_time[0] * 1000000 + redis_time[1]
-        ts = int(ts_usec / 1000)
+    def pipeline_result(self, results, state):
+        """Build result of the command from results of its operations in the transaction"""
+        return self.script_result(results[0])
+
+    def script(self, queue):
+        """
+        Get name and keys of the Lua script executing the command
+
+        @param queue: queue definition, if `uses_queue_def`
+        """
+        raise CommandNotImplementedException()
+
+    def script_result(self, result):
+        """Build result of the command from result of its Lua script"""
+        return result
+
+    def compact(self, queue):
+        """True if messages of the queue are stored in compact layout"""
+        return to_str(queue.get("layout")) == const.LAYOUT_COMPACT
+
+    def layout_script(self, name, queue):
+        """Get name of the version of the script for the layout of the queue"""
+        return name + "Compact" if self.compact(queue) else name
+
+    def dead_letter(self, queue):
+        """
+        Get max receive count, base name and realtime channel of the dead-letter queue of the
+        queue, passed to receive scripts. Max receive count is 0 if queue has no dead-letter
+        queue, channel is empty if realtime is off
+        """
+        max_receive_count = int(queue.get("max_receive_count") or 0)
+        dead_letter_queue = to_str(queue.get("dead_letter_queue"))
+        if not max_receive_count or not dead_letter_queue:
+            return 0, "", ""
+        return (
+            max_receive_count,
+            self.namespace + dead_letter_queue,
+            self.realtime_prefix + dead_letter_queue if self.realtime else "",
+        )
+
+    @property
+    def dead_letter_queue_key(self):
+        """Get full name of the dead-letter queue set by `dead_letter_queue` parameter"""
+        return self.namespace + self.get_dead_letter_queue + const.QUEUE_SUFFUX
+
+    def check_dead_letter_queue(self, exists):
+        """
+        Check dead-letter queue can be used by the queue
 
+        @param exists: true if dead-letter queue exists
+        """
+        if self.get_dead_letter_queue == self.get_qname:
+            raise InvalidParameterValue("dead_letter_queue", self.get_dead_letter_queue)
+        if not exists:
+            raise QueueDoesNotExist(self.get_dead_letter_queue)
+
+    def make_message(self, message_id, message, rc, ts):
+        """
+        Build received message, decompressing its payload if needed. In binary mode, payload
+        is returned as bytes and the rest of the message is decoded
+        """
         return {
-            "qname": self.get_qname,
-            "vt": stats[0],
-            "delay": stats[1],
-            "maxsize": stats[2],
-            "ts": ts,
-            "ts_usec": ts_usec,
+            "id": to_str(message_id),
+            "message": decompress(message),
+            "rc": rc,
+            "ts": int(ts),
         }
+
+    def exec_script(self):
+        """Execute command by running its Lua script"""
+        queue = self.queue_def() if self.uses_queue_def else None
+        name, keys = self.script(queue)
+        return self.script_result(self.eval_script(name, *keys))
+
+    def queue_def(self):
+        """Get Queue Definition"""
+        queue = None
+        while queue is None:
+            tx = self.client.pipeline(transaction=True)
+            state = self._queue_def_request(tx)
+            queue = self._queue_def_result(tx.execute() if len(tx) else [], state)
+        return queue
+
+    def server_time(self):
+        """Get Redis server time in microseconds, estimated locally if possible"""
+        now = self.parent.clock.time_usec()
+        if now is None:
+            sent = time.monotonic()
+            seconds, microseconds = self.client.time()
+            now = self.parent.clock.sample(
+                seconds, microseconds, sent, time.monotonic()
+            )
+        return now
+
+    # Queue attributes making the queue definition
+    QUEUE_DEF_ATTRIBUTES = (
+        "vt",
+        "delay",
+        "maxsize",
+        "layout",
+        "max_receive_count",
+        "dead_letter_queue",
+    )
+    # Queue attributes changed whenever the queue definition changes
+    QUEUE_VERSION_ATTRIBUTES = ("modified", "revision")
+
+    def _queue_def_request(self, tx):
+        """
+        Add commands retrieving queue definition to transaction. Nothing is added if cached
+        definition can be used and Redis time can be estimated locally.
+
+        @return state to pass to `_queue_def_result()`
+        """
+        cached, check = self.parent.queue_cache.get(self.queue_key)
+        if cached is None:
+            tx.hmget(
+                self.queue_key,
+                *(self.QUEUE_DEF_ATTRIBUTES + self.QUEUE_VERSION_ATTRIBUTES),
+            )
+        elif check:
+            tx.hmget(self.queue_key, *self.QUEUE_VERSION_ATTRIBUTES)
+        now = self.parent.clock.time_usec()
+        if now is None:
+            tx.time()
+        return cached, check, now, time.monotonic()
+
+    def _queue_def_result(self, results, state):
+        """
+        Build queue definition from results of the `_queue_def_request()` commands
+
+        @return queue definition, or None if cached definition is out of date and queue
+        definition must be retrieved again
+        """
+        cached, check, ts_usec, sent = state
+        results = list(results)
+        if cached is None or check:
+            stats = results.pop(0) if results else None
+            if stats is None or stats[0] is None:
+                self.parent.queue_cache.invalidate(self.queue_key)
+                raise QueueDoesNotExist(self.get_qname)
+
+        if ts_usec is None:
+            seconds, microseconds = results[0]
+            ts_usec = self.parent.clock.sample(
+                seconds, microseconds, sent, time.monotonic()
+            )
+        ts = int(ts_usec / 1000)
+
+        size = len(self.QUEUE_DEF_ATTRIBUTES)
+        if cached is None:
+            queue = dict(zip(self.QUEUE_DEF_ATTRIBUTES, stats[:size]))
+            self.parent.queue_cache.put(self.queue_key, queue, stats[size:], ts)
+        elif check and not self.parent.queue_cache.checked(
+            self.queue_key, cached, stats
+        ):
+            return None
+        else:
+            queue = {name: cached[name] for name in self.QUEUE_DEF_ATTRIBUTES}
+
+        queue.update(qname=self.get_qname, ts=ts, ts_usec=ts_usec)
+        return queue
+
+
+BaseRSMQCommand._prepare_params()
@@ -3,7 +3,7 @@ Change Message Visibility
 """
 
 from .base_command import BaseRSMQCommand
-from .exceptions import NoMessageInQueue
+from .exceptions import NoMessageInQueue, QueueDoesNotExist
 
 
 class ChangeMessageVisibilityCommand(BaseRSMQCommand):
@@ -11,6 +11,8 @@ class ChangeMessageVisibilityCommand(BaseRSMQCommand):
     Change Message Visibility Timeout Command
     """
 
+    __slots__ = ()
+
     PARAMS = {
         "qname": {"required": True, "value": None},
         "id": {"required": True, "value": None},
@@ -18,19 +20,34 @@ class ChangeMessageVisibilityCommand(BaseRSMQCommand):
         "quiet": {"required": False, "value": False},
     }
 
+    PIPELINED = True
+
+    @property
+    def uses_queue_def(self):
+        """Queue definition is resolved inside the script in single round trip mode"""
+        return not self.single_rtt
+
     def exec_command(self):
         """Execute"""
-        client = self.client
+        return self.exec_script()
 
-        queue_base = self.queue_base
-        queue = self.queue_def()
+    def script(self, queue):
+        """Get name and keys of the script changing message visibility"""
+        if queue is None:
+            # single round trip
+            vt = self.get_vt
+            vt = "" if vt is None else int(round(float(vt) * 1000))
+            return "changeMessageVisibilityRtt", (self.queue_base, self.get_id, vt)
 
         ts = int(queue["ts"])
         vt = float(queue["vt"] if self.get_vt is None else self.get_vt)
         vtimeout = ts + int(round(vt * 1000))
-        result = client.evalsha(
-            self.changeMessageVisibilitySha1, 3, queue_base, self.get_id, vtimeout
-        )
+        return "changeMessageVisibility", (self.queue_base, self.get_id, vtimeout)
+
+    def script_result(self, result):
+        """Returns True if message visibility was changed"""
+        if result is None:
+            raise QueueDoesNotExist(self.get_qname)
         if not result:
             raise NoMessageInQueue(self.get_qname)
         return result == 1
@@ -0,0 +1,47 @@
+"""
+Change Messages Visibility (batch) Command
+"""
+
+from .base_command import BaseRSMQCommand
+from .exceptions import QueueDoesNotExist
+from .utils import to_str
+
+
+class ChangeMessagesVisibilityCommand(BaseRSMQCommand):
+    """
+    Change Visibility Timeout of multiple messages with a single script call
+    """
+
+    __slots__ = ()
+
+    PARAMS = {
+        "qname": {"required": True, "value": None},
+        "ids": {"required": True, "value": None},
+        "vt": {"required": False, "value": None},
+        "quiet": {"required": False, "value": False},
+    }
+
+    PIPELINED = True
+
+    def exec_command(self):
+        """
+        Execute
+
+        @raise QueueDoesNotExist if queue does not exist
+        @return list of ids of messages that still existed, and had their visibility changed
+        """
+        if not self.get_ids:
+            return []
+        return self.exec_script()
+
+    def script(self, queue):
+        """Get name and keys of the script changing visibility of the messages"""
+        vt = self.get_vt
+        vt = "" if vt is None else int(round(float(vt) * 1000))
+        return "changeMessagesVisibility", (self.queue_base, vt, *self.message_ids)
+
+    def script_result(self, result):
+        """Returns list of ids of messages that still existed"""
+        if result is None:
+            raise QueueDoesNotExist(self.get_qname)
+        return [to_str(message_id) for message_id in result]
@@ -13,28 +13,56 @@ class CreateQueueCommand(BaseRSMQCommand):
     Create Queue if does not exist
     """
 
+    __slots__ = ()
+
     PARAMS = {
         "qname": {"required": True, "value": None},
         "vt": {"required": True, "value": const.VT_DEFAULT},
         "delay": {"required": True, "value": const.DELAY_DEFAULT},
         "maxsize": {"required": True, "value": const.MAXSIZE_DEFAULT},
+        "layout": {"required": True, "value": const.LAYOUT_LEGACY},
+        "max_receive_count": {
+            "required": True,
+            "value": const.MAX_RECEIVE_COUNT_DEFAULT,
+        },
+        "dead_letter_queue": {"required": False, "value": None},
         "quiet": {"required": False, "value": False},
     }
 
-    def exec_command(self):
-        """Exec Command"""
-        client = self.client
+    def create_request(self, tx):
+        """Add commands creating the queue, unless it exists, to transaction"""
         now = int(time.time())
-
         key = self.queue_key
-        tx = client.pipeline(transaction=True)
         tx.hsetnx(key, "vt", self.get_vt)
         tx.hsetnx(key, "delay", self.get_delay)
         tx.hsetnx(key, "maxsize", self.get_maxsize)
         tx.hsetnx(key, "created", now)
         tx.hsetnx(key, "modified", now)
-        results = tx.execute()
+        if self.get_layout != const.LAYOUT_LEGACY:
+            tx.hsetnx(key, "layout", self.get_layout)
+        if self.get_dead_letter_queue is not None:
+            tx.hsetnx(key, "max_receive_count", self.get_max_receive_count)
+            tx.hsetnx(key, "dead_letter_queue", self.get_dead_letter_queue)
+
+    def create_result(self, results):
+        """
+        Check result of the transaction creating the queue
+
+        @raise QueueAlreadyExists if queue already existed
+        """
+        self.parent.queue_cache.invalidate(self.queue_key)
         if True not in results:
             raise QueueAlreadyExists(self.get_qname)
+
+    def exec_command(self):
+        """Exec Command"""
+        client = self.client
+        if self.get_dead_letter_queue is not None:
+            self.check_dead_letter_queue(
+                client.hexists(self.dead_letter_queue_key, "vt")
+            )
+        tx = client.pipeline(transaction=True)
+        self.create_request(tx)
+        self.create_result(tx.execute())
         client.sadd(self.queue_set, self.get_qname)
         return True
@@ -10,25 +10,40 @@ class DeleteMessageCommand(BaseRSMQCommand):
     Delete Message if it exists
     """
 
+    __slots__ = ()
+
     PARAMS = {
         "qname": {"required": True, "value": None},
         "id": {"required": True, "value": None},
         "quiet": {"required": False, "value": False},
     }
 
+    PIPELINED = True
+
     def exec_command(self):
         """Exec Command"""
-        result = self.get_transaction().execute()
+        return self.pipeline_result(self.get_transaction().execute(), None)
 
+    def pipeline_request(self, tx, queue):
+        """Add deleteMessage commands to transaction"""
+        self.get_transaction(tx)
+
+    def pipeline_result(self, results, state):
+        """Returns True if message was deleted"""
         # 1 key deleted from zset
-        # 3 keys deleted from hash (message itself, receive count, first receive field)
-        if int(result[0]) == 1 and int(result[1]) == 3:
+        # 1-3 keys deleted from hash: message itself, and receive count and first receive
+        # fields if message was received from a queue of legacy layout
+        if int(results[0]) == 1 and int(results[1]) > 0:
             return True
 
         return False
 
-    def get_transaction(self):
-        """Returns a transaction (pipeline), pre-populated with the deleteMessage commands"""
+    def get_transaction(self, tx=None):
+        """
+        Returns a transaction (pipeline), pre-populated with the deleteMessage commands
+
+        @param tx: if provided, existing transaction to add the commands to
+        """
         client = self.client
         queue_base = self.queue_base
         queue_key = self.queue_key
@@ -36,7 +51,8 @@ class DeleteMessageCommand(BaseRSMQCommand):
         # decode to string when provided as bytes
         if isinstance(message_id, bytes):
             message_id = message_id.decode('utf-8')
-        tx = client.pipeline(transaction=True)
+        if tx is None:
+            tx = client.pipeline(transaction=True)
         tx.zrem(queue_base, message_id)
         tx.hdel(queue_key, message_id, "%s:rc" % message_id, "%s:fr" % message_id)
         return tx
@@ -0,0 +1,68 @@
+"""
+Delete Messages (batch) Command
+"""
+
+from .base_command import BaseRSMQCommand
+
+
+class DeleteMessagesCommand(BaseRSMQCommand):
+    """
+    Delete multiple messages, if they exist, in one transaction
+    """
+
+    __slots__ = ()
+
+    PARAMS = {
+        "qname": {"required": True, "value": None},
+        "ids": {"required": True, "value": None},
+        "quiet": {"required": False, "value": False},
+    }
+
+    PIPELINED = True
+
+    def exec_command(self):
+        """
+        Exec Command
+
+        @return dict of message id to True if message was deleted, False if it did not exist
+        """
+        message_ids = self.message_ids
+        if not message_ids:
+            return {}
+        return self.pipeline_result(self.get_transaction().execute(), message_ids)
+
+    def pipeline_request(self, tx, queue):
+        """Add deleteMessages commands to transaction, returns message ids"""
+        message_ids = self.message_ids
+        if message_ids:
+            self.get_transaction(tx)
+        return message_ids
+
+    def pipeline_result(self, results, state):
+        """Map each message id to True if message existed before it was deleted"""
+        if not state:
+            return {}
+        return {
+            message_id: bool(existed) for message_id, existed in zip(state, results)
+        }
+
+    def get_transaction(self, tx=None):
+        """
+        Returns a transaction (pipeline), pre-populated with the deleteMessages commands:
+        HEXISTS of each message (to tell which ones existed, without reading the messages),
+        one ZREM of all ids and one HDEL of all message fields
+
+        @param tx: if provided, existing transaction to add the commands to
+        """
+        queue_key = self.queue_key
+        message_ids = self.message_ids
+        fields = []
+        for message_id in message_ids:
+            fields.extend((message_id, message_id + ":rc", message_id + ":fr"))
+        if tx is None:
+            tx = self.client.pipeline(transaction=True)
+        for message_id in message_ids:
+            tx.hexists(queue_key, message_id)
+        tx.zrem(self.queue_base, *message_ids)
+        tx.hdel(queue_key, *fields)
+        return tx
@@ -11,23 +11,33 @@ class DeleteQueueCommand(BaseRSMQCommand):
     Delete Queue if it exists
     """
 
+    __slots__ = ()
+
     PARAMS = {
         "qname": {"required": True, "value": None},
         "quiet": {"required": False, "value": False},
     }
 
-    def exec_command(self):
-        """Exec Command"""
-        client = self.client
-
-        queue_name = self.queue_base
-        queue_key = self.queue_key
-        tx = client.pipeline(transaction=True)
-        tx.delete(queue_key)
-        tx.delete(queue_name)
+    def delete_request(self, tx):
+        """Add commands deleting the queue to transaction"""
+        tx.delete(self.queue_key)
+        tx.delete(self.queue_base)
         tx.srem(self.queue_set, self.get_qname)
-        results = tx.execute()
+
+    def delete_result(self, results):
+        """
+        Check result of the transaction deleting the queue
+
+        @raise QueueDoesNotExist if queue did not exist
+        """
+        self.parent.queue_cache.invalidate(self.queue_key)
         if True not in results:
             raise QueueDoesNotExist(self.get_qname)
         self.log.debug("Deleted Queue %s", self.queue_base)
         return True
+
+    def exec_command(self):
+        """Exec Command"""
+        tx = self.client.pipeline(transaction=True)
+        self.delete_request(tx)
+        return self.delete_result(tx.execute())
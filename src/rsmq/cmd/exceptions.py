@@ -43,6 +43,21 @@ class QueueDoesNotExist(RedisSMQException):
         super(QueueDoesNotExist, self).__init__("Queue '%s' does not exist" % name)
 
 
+class MessageTooLong(RedisSMQException):
+    """Message is longer than maxsize of the queue"""
+
+    def __init__(self, name, maxsize, message_ids=None):
+        """
+        Constructor
+
+        @param message_ids: ids of messages sent before the message was rejected, if any
+        """
+        super(MessageTooLong, self).__init__(
+            "Message is longer than maxsize (%s bytes) of queue '%s'" % (maxsize, name)
+        )
+        self.message_ids = message_ids or []
+
+
 class NoMessageInQueue(RedisSMQException):
     """Queue Already Exists"""
 
@@ -2,10 +2,10 @@
 GetQueueAttributes Command
 """
 
-import time
-
+from .. import const
 from .base_command import BaseRSMQCommand
 from .exceptions import QueueDoesNotExist
+from .utils import to_str
 
 
 class GetQueueAttributesCommand(BaseRSMQCommand):
@@ -13,22 +13,18 @@ class GetQueueAttributesCommand(BaseRSMQCommand):
     Get Queue Attributes from existing queue
     """
 
+    __slots__ = ()
+
     PARAMS = {
         "qname": {"required": True, "value": None},
         "quiet": {"required": False, "value": False},
     }
 
-    def exec_command(self):
-        """Exec Command"""
-        secs, usecs = self.client.time()
-        now = secs * 1000 + int(usecs / 1000)
-
+    def attributes_request(self, tx, now):
+        """Add commands getting attributes and message counts at `now` to transaction"""
         queue_base = self.queue_base
-        queue_key = self.queue_key
-
-        tx = self.client.pipeline(transaction=True)
         tx.hmget(
-            queue_key,
+            self.queue_key,
             "vt",
             "delay",
             "maxsize",
@@ -36,12 +32,21 @@ class GetQueueAttributesCommand(BaseRSMQCommand):
             "totalsent",
             "created",
             "modified",
+            "totalrejected",
+            "layout",
+            "max_receive_count",
+            "dead_letter_queue",
+            "totaldeadlettered",
         )
         tx.zcard(queue_base)
         tx.zcount(queue_base, now, "+inf")
 
-        results = tx.execute()
+    def attributes_result(self, results):
+        """
+        Build queue attributes from result of the transaction
 
+        @raise QueueDoesNotExist if queue does not exist
+        """
         if not results or results[0][0] is None:
             raise QueueDoesNotExist(self.get_qname)
 
@@ -55,6 +60,18 @@ class GetQueueAttributesCommand(BaseRSMQCommand):
             "totalsent": int(stats[4] or 0),
             "created": int(stats[5]),
             "modified": int(stats[6]),
+            "totalrejected": int(stats[7] or 0),
+            "layout": to_str(stats[8]) or const.LAYOUT_LEGACY,
+            "max_receive_count": int(stats[9] or 0),
+            "dead_letter_queue": to_str(stats[10]),
+            "totaldeadlettered": int(stats[11] or 0),
             "msgs": results[1],
             "hiddenmsgs": results[2],
         }
+
+    def exec_command(self):
+        """Exec Command"""
+        now = int(self.server_time() / 1000)
+        tx = self.client.pipeline(transaction=True)
+        self.attributes_request(tx, now)
+        return self.attributes_result(tx.execute())
@@ -3,6 +3,7 @@
 """
 
 from .base_command import BaseRSMQCommand
+from .utils import to_str
 
 
 class ListQueuesCommand(BaseRSMQCommand):
@@ -12,10 +13,12 @@ class ListQueuesCommand(BaseRSMQCommand):
     On execution returns a set of queues already existing on the redis in this namespace
     """
 
+    __slots__ = ()
+
     PARAMS = {"quiet": {"required": False, "value": False}}
 
     def exec_command(self):
         """Exec Command"""
         client = self.client
         ret = client.smembers(self.queue_set)
-        return ret
+        return {to_str(qname) for qname in ret}
@@ -0,0 +1,96 @@
+"""
+Migrate Queue Command
+"""
+
+import time
+
+from .. import const
+from .base_command import BaseRSMQCommand
+from .exceptions import QueueDoesNotExist
+from .utils import validate_int
+
+
+class MigrateQueueCommand(BaseRSMQCommand):
+    """
+    Migrate queue to another storage layout.
+
+    Only migration from `legacy` to `compact` layout is supported. Queue is switched to
+    compact layout first, then received messages are converted in batches of `batch_size`
+    messages (one script call each), so the queue stays usable during migration. Messages
+    missed by the conversion (e.g. received by a client still using legacy scripts) are
+    converted when they are received again. Migration can be repeated safely.
+    """
+
+    __slots__ = ()
+
+    PARAMS = {
+        "qname": {"required": True, "value": None},
+        "layout": {"required": True, "value": const.LAYOUT_COMPACT},
+        "batch_size": {"required": False, "value": const.MIGRATE_BATCH_SIZE_DEFAULT},
+        "quiet": {"required": False, "value": False},
+    }
+
+    def _validate_layout(self, layout):
+        """Validate layout parameter - only compact layout can be migrated to"""
+        return layout == const.LAYOUT_COMPACT
+
+    def _validate_batch_size(self, batch_size):
+        """Validate batch_size parameter"""
+        return validate_int(
+            batch_size,
+            const.MIGRATE_BATCH_SIZE_MIN,
+            const.MIGRATE_BATCH_SIZE_MAX,
+            logger=self.log,
+            name="batch_size",
+        )
+
+    def layout_request(self, tx):
+        """Add commands switching the queue to the new layout to transaction"""
+        queue_key = self.queue_key
+        tx.hset(queue_key, "layout", self.get_layout)
+        tx.hset(queue_key, "modified", int(time.time()))
+        tx.hincrby(queue_key, "revision", 1)
+
+    def layout_result(self, _results):
+        """Handle result of the transaction switching the queue to the new layout"""
+        self.parent.queue_cache.invalidate(self.queue_key)
+
+    def batch_keys(self, start):
+        """Get keys of the script converting a batch of messages, from index `start`"""
+        return (self.queue_base, start, int(self.get_batch_size))
+
+    def batch_result(self, result):
+        """
+        Check result of the migration script
+
+        @return (number of messages checked, number of messages converted)
+        """
+        if result is None:
+            raise QueueDoesNotExist(self.get_qname)
+        return int(result[0]), int(result[1])
+
+    def exec_command(self):
+        """
+        Execute command
+
+        @raise QueueDoesNotExist if queue does not exist
+        @return number of converted messages
+        """
+        if not self.client.hexists(self.queue_key, "vt"):
+            raise QueueDoesNotExist(self.get_qname)
+        tx = self.client.pipeline(transaction=True)
+        self.layout_request(tx)
+        self.layout_result(tx.execute())
+
+        batch_size = int(self.get_batch_size)
+        start = converted = 0
+        while True:
+            checked, count = self.batch_result(
+                self.eval_script("migrateQueueCompact", *self.batch_keys(start))
+            )
+            converted += count
+            start += checked
+            if checked < batch_size:
+                break
+        self.log.debug("Converted %s messages of %s", converted, self.queue_base)
+        return converted
@@ -3,7 +3,7 @@
 """
 
 from .base_command import BaseRSMQCommand
-from .exceptions import NoMessageInQueue
+from .exceptions import NoMessageInQueue, QueueDoesNotExist
 
 
 class PopMessageCommand(BaseRSMQCommand):
@@ -11,21 +11,36 @@ class PopMessageCommand(BaseRSMQCommand):
     Receive Message and delete it
     """
 
+    __slots__ = ()
+
     PARAMS = {
         "qname": {"required": True, "value": None},
         "quiet": {"required": False, "value": False},
     }
 
-    def exec_command(self):
-        """Execute"""
-        client = self.client
+    PIPELINED = True
 
-        queue_base = self.queue_base
-        queue = self.queue_def()
+    @property
+    def uses_queue_def(self):
+        """Queue definition is resolved inside the script in single round trip mode"""
+        return not self.single_rtt
 
-        ts = int(queue["ts"])
-        result = client.evalsha(self.popMessageSha1, 2, queue_base, ts)
+    def exec_command(self):
+        """Execute"""
+        return self.exec_script()
+
+    def script(self, queue):
+        """Get name and keys of the script popping the message"""
+        if queue is None:
+            # single round trip
+            return "popMessageRtt", (self.queue_base,)
+        name = self.layout_script("popMessage", queue)
+        return name, (self.queue_base, int(queue["ts"]))
+
+    def script_result(self, result):
+        """Build message from result of the script"""
+        if result is None:
+            raise QueueDoesNotExist(self.get_qname)
         if not result:
             raise NoMessageInQueue(self.get_qname)
-        [message_id, message, rc, ts] = result
-        return {"id": message_id, "message": message, "rc": rc, "ts": int(ts)}
+        return self.make_message(*result)
@@ -0,0 +1,43 @@
+"""
+Pop Messages (batch) Command
+"""
+
+from .. import const
+from .base_command import BaseRSMQCommand
+from .exceptions import NoMessageInQueue
+
+
+class PopMessagesCommand(BaseRSMQCommand):
+    """
+    Receive up to `count` messages and delete them, atomically
+    """
+
+    __slots__ = ()
+
+    PARAMS = {
+        "qname": {"required": True, "value": None},
+        "count": {"required": True, "value": const.RECEIVE_COUNT_DEFAULT},
+        "quiet": {"required": False, "value": False},
+    }
+
+    PIPELINED = True
+
+    @property
+    def uses_queue_def(self):
+        """Queue definition is required to build the script call"""
+        return True
+
+    def exec_command(self):
+        """Execute"""
+        return self.exec_script()
+
+    def script(self, queue):
+        """Get name and keys of the script popping the messages"""
+        name = self.layout_script("popMessages", queue)
+        return name, (self.queue_base, int(queue["ts"]), int(self.get_count))
+
+    def script_result(self, result):
+        """Build list of messages from result of the script"""
+        if not result:
+            raise NoMessageInQueue(self.get_qname)
+        return [self.make_message(*message) for message in result]
@@ -3,7 +3,7 @@
 """
 
 from .base_command import BaseRSMQCommand
-from .exceptions import NoMessageInQueue
+from .exceptions import NoMessageInQueue, QueueDoesNotExist
 
 
 class ReceiveMessageCommand(BaseRSMQCommand):
@@ -11,24 +11,44 @@ class ReceiveMessageCommand(BaseRSMQCommand):
     Receive Message
     """
 
+    __slots__ = ()
+
     PARAMS = {
         "qname": {"required": True, "value": None},
         "vt": {"required": False, "value": None},
         "quiet": {"required": False, "value": False},
     }
 
+    PIPELINED = True
+
+    @property
+    def uses_queue_def(self):
+        """Queue definition is resolved inside the script in single round trip mode"""
+        return not self.single_rtt
+
     def exec_command(self):
         """Execute"""
-        client = self.client
+        return self.exec_script()
 
-        queue_base = self.queue_base
-        queue = self.queue_def()
+    def script(self, queue):
+        """Get name and keys of the script receiving the message"""
+        if queue is None:
+            # single round trip
+            vt = self.get_vt
+            vt = "" if vt is None else int(round(float(vt) * 1000))
+            realtime = self.realtime_prefix if self.realtime else ""
+            return "receiveMessageRtt", (self.queue_base, vt, self.namespace, realtime)
 
         ts = int(queue["ts"])
         vt = float(queue["vt"] if self.get_vt is None else self.get_vt)
         vtimeout = ts + int(round(vt * 1000))
-        result = client.evalsha(self.receiveMessageSha1, 3, queue_base, ts, vtimeout)
+        name = self.layout_script("receiveMessage", queue)
+        return name, (self.queue_base, ts, vtimeout) + self.dead_letter(queue)
+
+    def script_result(self, result):
+        """Build message from result of the script"""
+        if result is None:
+            raise QueueDoesNotExist(self.get_qname)
         if not result:
             raise NoMessageInQueue(self.get_qname)
-        [message_id, message, rc, ts] = result
-        return {"id": message_id, "message": message, "rc": rc, "ts": int(ts)}
+        return self.make_message(*result)
@@ -0,0 +1,48 @@
+"""
+Receive Messages (batch) Command
+"""
+
+from .. import const
+from .base_command import BaseRSMQCommand
+from .exceptions import NoMessageInQueue
+
+
+class ReceiveMessagesCommand(BaseRSMQCommand):
+    """
+    Receive up to `count` messages atomically, marking all of them invisible
+    """
+
+    __slots__ = ()
+
+    PARAMS = {
+        "qname": {"required": True, "value": None},
+        "count": {"required": True, "value": const.RECEIVE_COUNT_DEFAULT},
+        "vt": {"required": False, "value": None},
+        "quiet": {"required": False, "value": False},
+    }
+
+    PIPELINED = True
+
+    @property
+    def uses_queue_def(self):
+        """Queue definition is required to build the script call"""
+        return True
+
+    def exec_command(self):
+        """Execute"""
+        return self.exec_script()
+
+    def script(self, queue):
+        """Get name and keys of the script receiving the messages"""
+        ts = int(queue["ts"])
+        vt = float(queue["vt"] if self.get_vt is None else self.get_vt)
+        vtimeout = ts + int(round(vt * 1000))
+        name = self.layout_script("receiveMessages", queue)
+        keys = (self.queue_base, ts, vtimeout, int(self.get_count))
+        return name, keys + self.dead_letter(queue)
+
+    def script_result(self, result):
+        """Build list of messages from result of the script"""
+        if not result:
+            raise NoMessageInQueue(self.get_qname)
+        return [self.make_message(*message) for message in result]
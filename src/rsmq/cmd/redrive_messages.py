@@ -0,0 +1,91 @@
+"""
+Redrive Messages Command
+"""
+
+from .. import const
+from .base_command import BaseRSMQCommand
+from .exceptions import QueueDoesNotExist
+from .utils import validate_int
+
+
+class RedriveMessagesCommand(BaseRSMQCommand):
+    """
+    Move messages from a dead-letter queue (`qname`) back to `target` queue.
+
+    Messages are moved in batches of `batch_size` messages (one script call each), including
+    messages that are currently invisible. Moved messages are visible immediately, and their
+    receive count starts again from 0. Up to `count` messages are moved, all by default.
+    """
+
+    __slots__ = ()
+
+    PARAMS = {
+        "qname": {"required": True, "value": None},
+        "target": {"required": True, "value": None},
+        "count": {"required": False, "value": None},
+        "batch_size": {"required": False, "value": const.REDRIVE_BATCH_SIZE_DEFAULT},
+        "quiet": {"required": False, "value": False},
+    }
+
+    def _validate_target(self, target):
+        """Validate target parameter - name of a queue"""
+        return self._validate_qname(target)
+
+    def _validate_count(self, count):
+        """Validate count parameter - max number of messages to move"""
+        return validate_int(count, 1, logger=self.log, name="count")
+
+    def _validate_batch_size(self, batch_size):
+        """Validate batch_size parameter"""
+        return validate_int(
+            batch_size,
+            const.REDRIVE_BATCH_SIZE_MIN,
+            const.REDRIVE_BATCH_SIZE_MAX,
+            logger=self.log,
+            name="batch_size",
+        )
+
+    def batches(self):
+        """Get sizes of the batches of messages to move, ends when `count` is reached"""
+        batch_size = int(self.get_batch_size)
+        remaining = None if self.get_count is None else int(self.get_count)
+        while remaining is None or remaining > 0:
+            size = batch_size if remaining is None else min(batch_size, remaining)
+            yield size
+            if remaining is not None:
+                remaining -= size
+
+    def batch_keys(self, size, now):
+        """Get keys of the script moving a batch of `size` messages, visible at `now`"""
+        target = self.get_target
+        realtime = self.realtime_prefix + target if self.realtime else ""
+        return (self.queue_base, self.namespace + target, size, now, realtime)
+
+    def batch_result(self, result):
+        """
+        Check result of the redrive script
+
+        @return number of moved messages
+        """
+        if result is None:
+            raise QueueDoesNotExist(self.get_qname)
+        if int(result) < 0:
+            raise QueueDoesNotExist(self.get_target)
+        return int(result)
+
+    def exec_command(self):
+        """
+        Execute command
+
+        @raise QueueDoesNotExist if dead-letter queue or target queue does not exist
+        @return number of moved messages
+        """
+        moved = 0
+        for size in self.batches():
+            keys = self.batch_keys(size, int(self.server_time() / 1000))
+            count = self.batch_result(self.eval_script("redriveMessages", *keys))
+            moved += count
+            if count < size:
+                break
+        self.log.debug("Moved %s messages from %s", moved, self.queue_base)
+        return moved
@@ -3,7 +3,9 @@
 """
 
 from .base_command import BaseRSMQCommand
-from .utils import make_message_id, encode_message
+from .exceptions import MessageTooLong, QueueDoesNotExist
+from .utils import make_message_id, encode_message, message_too_long, random_chars
+from .utils import escape_compact, to_str
 
 
 class SendMessageCommand(BaseRSMQCommand):
@@ -11,26 +13,59 @@ class SendMessageCommand(BaseRSMQCommand):
     Create Queue if does not exist
     """
 
+    __slots__ = ()
+
     PARAMS = {
         "qname": {"required": True, "value": None},
         "message": {"required": True, "value": None},
         "delay": {"required": False, "value": None},
         "quiet": {"required": False, "value": False},
         "encode": {"required": False, "value": False},
+        "codec": {"required": False, "value": None},
     }
 
+    PIPELINED = True
+
+    @property
+    def uses_queue_def(self):
+        """Queue definition is resolved inside the script in single round trip mode"""
+        return not self.single_rtt
+
     def exec_command(self):
         """
         Execute command
 
         @raise QueueDoesNotExist if queue does not exist
+        @raise MessageTooLong if message is longer than maxsize of the queue
         """
+        if self.single_rtt:
+            return self.exec_script()
+
         queue = self.queue_def()
-        message_id = make_message_id(queue.get("ts_usec", None))
+        tx = self.client.pipeline(transaction=True)
+        state = self.pipeline_request(tx, queue)
+        return self.pipeline_result(tx.execute(), state)
+
+    def pipeline_request(self, tx, queue):
+        """
+        Add commands sending the message to transaction, returns the message id.
+
+        Message longer than maxsize of the queue is only counted as rejected, and
+        MessageTooLong exception is returned instead
+        """
+        if queue is None:
+            return super(SendMessageCommand, self).pipeline_request(tx, queue)
 
         queue_key = self.queue_key
         queue_base = self.queue_base
 
+        message = self._encoded_message()
+        if message_too_long(message, queue["maxsize"]):
+            tx.hincrby(queue_key, "totalrejected", 1)
+            return MessageTooLong(self.get_qname, queue["maxsize"])
+
+        message_id = make_message_id(queue.get("ts_usec", None))
+
         ts = int(queue["ts"])
 
         delay = self.get_delay
@@ -38,18 +73,56 @@ class SendMessageCommand(BaseRSMQCommand):
             delay = queue.get("delay", 0)
         delay = float(delay or 0)
 
-        message = self.get_message
-        if self.get_encode or not isinstance(message, (str, bytes)):
-            message = encode_message(message)
-            self.log.debug("Encoded message: %s", message)
-
-        tx = self.client.pipeline(transaction=True)
         timestamp = ts + int(round(delay * 1000))
         self.log.debug("tx.zadd(%s, %s, %s)", queue_base, timestamp, message_id)
         tx.zadd(queue_base, {message_id: timestamp})
 
+        if self.compact(queue):
+            message = escape_compact(message)
         tx.hset(queue_key, message_id, message)
         tx.hincrby(queue_key, "totalsent", 1)
-        _results = tx.execute()
-
+        self.publish(tx, 1)
         return message_id
+
+    def pipeline_result(self, results, state):
+        """Returns the message id"""
+        if self.single_rtt:
+            return super(SendMessageCommand, self).pipeline_result(results, state)
+        if isinstance(state, MessageTooLong):
+            raise state
+        return state
+
+    def _encoded_message(self):
+        """Get message, encoded and compressed if needed"""
+        message = self.get_message
+        codec = self.message_codec
+        if codec or self.get_encode or not isinstance(message, (str, bytes)):
+            message = encode_message(
+                message, codec=codec, binary=self.config("binary", False)
+            )
+            self.log.debug("Encoded message: %s", message)
+        return self.parent.compression.compress(message)
+
+    def script(self, queue):
+        """
+        Get name and keys of the script sending the message in a single round trip, message
+        id is built from server time
+        """
+        delay = self.get_delay
+        delay = "" if delay is None else int(round(float(delay) * 1000))
+        return "sendMessageRtt", (
+            self.queue_base,
+            random_chars(22),
+            self._encoded_message(),
+            delay,
+            self.realtime_channel if self.realtime else "",
+        )
+
+    def script_result(self, result):
+        """Returns the message id"""
+        if result is None:
+            raise QueueDoesNotExist(self.get_qname)
+        if isinstance(result, list):
+            # message was rejected, maxsize of the queue is returned
+            raise MessageTooLong(self.get_qname, result[0])
+        return to_str(result)
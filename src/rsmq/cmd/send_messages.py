@@ -0,0 +1,178 @@
+"""
+Send Messages (batch) Command
+"""
+
+from itertools import islice
+
+from .. import const
+from .base_command import BaseRSMQCommand
+from .exceptions import MessageTooLong
+from .utils import make_message_ids, encode_message, message_too_long, validate_int
+from .utils import escape_compact
+
+
+class SendMessagesCommand(BaseRSMQCommand):
+    """
+    Send multiple messages into the queue
+
+    Queue definition is fetched once, message ids are generated locally and each chunk of
+    messages is written in a single transaction
+    """
+
+    __slots__ = ()
+
+    PARAMS = {
+        "qname": {"required": True, "value": None},
+        "messages": {"required": True, "value": None},
+        "delay": {"required": False, "value": None},
+        "chunk_size": {"required": False, "value": const.SEND_CHUNK_SIZE_DEFAULT},
+        "quiet": {"required": False, "value": False},
+        "encode": {"required": False, "value": False},
+        "codec": {"required": False, "value": None},
+    }
+
+    def _validate_messages(self, messages):
+        """Validate messages parameter - any iterable other than a string"""
+        if messages is None or isinstance(messages, (str, bytes, dict)):
+            return False
+        return hasattr(messages, "__iter__")
+
+    def _validate_chunk_size(self, chunk_size):
+        """Validate chunk_size parameter"""
+        return validate_int(
+            chunk_size,
+            const.SEND_CHUNK_SIZE_MIN,
+            const.SEND_CHUNK_SIZE_MAX,
+            logger=self.log,
+            name="chunk_size",
+        )
+
+    def _encode(self, message, codec=None):
+        """Encode and compress single message, if needed"""
+        if codec or self.get_encode or not isinstance(message, (str, bytes)):
+            message = encode_message(
+                message, codec=codec, binary=self.config("binary", False)
+            )
+        return self.parent.compression.compress(message)
+
+    PIPELINED = True
+
+    @property
+    def uses_queue_def(self):
+        """Queue definition is required to send the messages"""
+        return True
+
+    def chunks(self):
+        """Split messages into lists of up to `chunk_size` encoded messages"""
+        chunk_size = int(self.get_chunk_size)
+        messages = iter(self.get_messages)
+        codec = self.message_codec
+        while True:
+            chunk = [
+                self._encode(message, codec) for message in islice(messages, chunk_size)
+            ]
+            if not chunk:
+                break
+            yield chunk
+
+    def rejected_request(self, tx, queue, chunk):
+        """
+        Count messages of the chunk longer than maxsize of the queue as rejected
+
+        @return number of rejected messages
+        """
+        rejected = sum(1 for msg in chunk if message_too_long(msg, queue["maxsize"]))
+        if rejected:
+            tx.hincrby(self.queue_key, "totalrejected", rejected)
+        return rejected
+
+    def chunk_request(self, tx, queue, chunk, first=0):
+        """
+        Add commands sending a chunk of encoded messages to transaction, returns message ids
+
+        @param first: index of the first message of the chunk in the batch
+        """
+        queue_key = self.queue_key
+        delay = self.get_delay
+        if delay is None:
+            delay = queue.get("delay", 0)
+        delay = float(delay or 0)
+        timestamp = int(queue["ts"]) + int(round(delay * 1000))
+
+        # All messages share the same score, so they are ordered by id. Ids are made from
+        # increasing timestamps to keep messages in the order they were provided
+        chunk_ids = make_message_ids(int(queue["ts_usec"]) + first, len(chunk))
+        if self.compact(queue):
+            chunk = [escape_compact(message) for message in chunk]
+        tx.zadd(self.queue_base, dict.fromkeys(chunk_ids, timestamp))
+        tx.hset(queue_key, mapping=dict(zip(chunk_ids, chunk)))
+        tx.hincrby(queue_key, "totalsent", len(chunk_ids))
+        self.publish(tx, len(chunk_ids))
+        return chunk_ids
+
+    def send_chunk_request(self, tx, queue, chunk, first):
+        """
+        Add commands sending a chunk of encoded messages to transaction, unless a message of
+        the chunk is longer than maxsize of the queue
+
+        @param first: index of the first message of the chunk in the batch
+        @return message ids of the chunk, or MessageTooLong exception if chunk is rejected
+        """
+        if self.rejected_request(tx, queue, chunk):
+            return MessageTooLong(self.get_qname, queue["maxsize"])
+        return self.chunk_request(tx, queue, chunk, first)
+
+    def send_chunk_result(self, state, message_ids):
+        """
+        Add message ids of a sent chunk to `message_ids`
+
+        @raise MessageTooLong if the chunk was rejected, with `message_ids` sent before
+        """
+        if isinstance(state, MessageTooLong):
+            state.message_ids = message_ids
+            raise state
+        self.log.debug("Sent %s messages to %s", len(state), self.queue_base)
+        message_ids.extend(state)
+
+    def exec_command(self):
+        """
+        Execute command
+
+        @raise QueueDoesNotExist if queue does not exist
+        @raise MessageTooLong if a message is longer than maxsize of the queue. Chunk containing
+            the message and following chunks are not sent, ids of messages sent before are in
+            `message_ids` of the exception
+        @return list of message ids, in the order messages were provided
+        """
+        queue = self.queue_def()
+        message_ids = []
+        for chunk in self.chunks():
+            tx = self.client.pipeline(transaction=True)
+            state = self.send_chunk_request(tx, queue, chunk, len(message_ids))
+            tx.execute()
+            self.send_chunk_result(state, message_ids)
+        return message_ids
+
+    def pipeline_request(self, tx, queue):
+        """
+        Add commands sending all chunks to transaction, returns message ids.
+
+        If any message is longer than maxsize of the queue, no message is sent and
+        MessageTooLong exception is returned instead
+        """
+        chunks = list(self.chunks())
+        rejected = 0
+        for chunk in chunks:
+            rejected += self.rejected_request(tx, queue, chunk)
+        if rejected:
+            return MessageTooLong(self.get_qname, queue["maxsize"])
+        message_ids = []
+        for chunk in chunks:
+            message_ids.extend(self.chunk_request(tx, queue, chunk, len(message_ids)))
+        return message_ids
+
+    def pipeline_result(self, results, state):
+        """Returns the message ids"""
+        if isinstance(state, MessageTooLong):
+            raise state
+        return state
@@ -10,30 +10,50 @@ class SetQueueAttributesCommand(BaseRSMQCommand):
     Get Queue Attributes if does not exist
     """
 
+    __slots__ = ()
+
     PARAMS = {
         "qname": {"required": True, "value": None},
         "vt": {"required": False, "value": None},
         "delay": {"required": False, "value": None},
         "maxsize": {"required": False, "value": None},
+        "max_receive_count": {"required": False, "value": None},
+        "dead_letter_queue": {"required": False, "value": None},
         "quiet": {"required": False, "value": False},
     }
 
-    def exec_command(self):
-        """Exec Command"""
-        now = int(time.time())
+    ATTRIBUTES = ("vt", "delay", "maxsize", "max_receive_count", "dead_letter_queue")
 
+    def attributes_request(self, tx):
+        """Add commands updating the attributes that were set to transaction"""
+        now = int(time.time())
         queue_key = self.queue_key
-
-        tx = self.client.pipeline(transaction=True)
-        for param in ["vt", "delay", "maxsize"]:
+        for param in self.ATTRIBUTES:
             value = self.param_get(param, default_value=None)
             if value is not None:
                 tx.hset(queue_key, param, value)
         if tx:
             self.log.debug("Applying queue attribute changes")
             tx.hset(queue_key, "modified", now)
+            tx.hincrby(queue_key, "revision", 1)
         else:
             self.log.debug("No queue attribute changes")
-        _result = tx.execute()
 
-        return self.parent.getQueueAttributes().qname(self.get_qname).execute()
+    def attributes_result(self, _results):
+        """
+        Handle result of the transaction updating the attributes
+
+        @return command getting the attributes of the queue
+        """
+        self.parent.queue_cache.invalidate(self.queue_key)
+        return self.parent.getQueueAttributes().qname(self.get_qname)
+
+    def exec_command(self):
+        """Exec Command"""
+        if self.get_dead_letter_queue is not None:
+            self.check_dead_letter_queue(
+                self.client.hexists(self.dead_letter_queue_key, "vt")
+            )
+        tx = self.client.pipeline(transaction=True)
+        self.attributes_request(tx)
+        return self.attributes_result(tx.execute()).execute()
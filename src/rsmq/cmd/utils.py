@@ -1,6 +1,11 @@
 """ Utilities """
 import json
+import os
 import random
+import re
+
+from .. import codec as codecs
+from .. import const
 
 DEFAULT_CHARSET = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"
 
@@ -35,7 +40,10 @@ def validate_int(value, min_value=None, max_value=None, logger=None, name=None):
     return True
 
 
-def baseXencode(value, chars="0123456789abcdefghijklmnopqrstuvwxyz"):
+BASE36_CHARS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+def baseXencode(value, chars=BASE36_CHARS):
     """
     Converts an integer to a base X string using charset.
     Base is implied by charset = base36 by default
@@ -69,23 +77,143 @@ def random_string(length, charset=None):
     return string
 
 
+# os.urandom() bytes are mapped to DEFAULT_CHARSET by bytes.translate(). Bytes above the
+# largest multiple of the charset length are dropped, so all characters are equally likely
+_RANDOM_LIMIT = 256 - 256 % len(DEFAULT_CHARSET)
+_RANDOM_TABLE = bytes(
+    ord(DEFAULT_CHARSET[byte % len(DEFAULT_CHARSET)]) for byte in range(256)
+)
+_RANDOM_DROP = bytes(range(_RANDOM_LIMIT, 256))
+
+
+def random_chars(length):
+    """
+    Generate a random string of `length` characters from DEFAULT_CHARSET. Much faster than
+    `random_string()`, as all characters are generated at once from `os.urandom()`
+    """
+    chars = b""
+    while len(chars) < length:
+        missing = length - len(chars)
+        # request a few more bytes than needed, so that dropped bytes rarely need another call
+        data = os.urandom(missing + missing // 16 + 8)
+        chars += data.translate(_RANDOM_TABLE, _RANDOM_DROP)
+    return chars[:length].decode("ascii")
+
+
+# base36 encoded values of 0 - 1295, as two characters
+_BASE36_PAIRS = [high + low for high in BASE36_CHARS for low in BASE36_CHARS]
+
+
+def escape_compact(message):
+    """
+    Prefix message starting with `const.COMPACT_MARK` with an empty header, so it is not
+    mistaken for a header in queues of compact layout
+    """
+    if isinstance(message, str):
+        if message[:1] == const.COMPACT_MARK:
+            return const.COMPACT_MARK + "0:0:" + message
+    elif bytes(message[:1]) == const.COMPACT_MARK.encode("ascii"):
+        return (const.COMPACT_MARK + "0:0:").encode("ascii") + bytes(message)
+    return message
+
+
+def to_str(value):
+    """Decode value to string if it is bytes, other values are returned as is"""
+    if isinstance(value, bytes):
+        return value.decode("utf-8")
+    return value
+
+
 def make_message_id(usec):
     """Create a message id based on Redis time"""
-    return baseXencode(usec) + random_string(22)
+    return baseXencode(usec) + random_chars(22)
 
 
-def encode_message(msg):
-    """Encode message to JSON if not already string"""
-    if isinstance(msg, str):
-        return msg
-    return json.dumps(msg)
+def make_message_ids(usec, count):
+    """
+    Create `count` message ids for consecutive microseconds, starting at `usec` (Redis
+    time). Ids have the same format as ids made by `make_message_id()` and are in sort order.
+
+    Random part of all ids is generated at once, and only the last two base36 digits of the
+    timestamp are encoded for each id
+    """
+    usec = int(usec)
+    randoms = random_chars(22 * count)
+    ids = []
+    prefix, high = "", None
+    for index in range(count):
+        value = usec + index
+        if value < len(_BASE36_PAIRS):
+            ids.append(baseXencode(value) + randoms[22 * index : 22 * index + 22])
+            continue
+        value_high, value_low = divmod(value, len(_BASE36_PAIRS))
+        if value_high != high:
+            high = value_high
+            prefix = baseXencode(high)
+        ids.append(
+            prefix + _BASE36_PAIRS[value_low] + randoms[22 * index : 22 * index + 22]
+        )
+    return ids
+
+
+def message_too_long(message, maxsize):
+    """
+    Check if message is longer than `maxsize` bytes (`-1` for unlimited). Length of strings is
+    their utf-8 encoded length, but strings are only encoded if their length can not be
+    told otherwise
+    """
+    maxsize = int(maxsize)
+    if maxsize < 0:
+        return False
+    if isinstance(message, memoryview):
+        return message.nbytes > maxsize
+    length = len(message)
+    if length > maxsize:
+        # every character is at least one byte long
+        return True
+    if not isinstance(message, str) or length * 4 <= maxsize:
+        # every character is at most four bytes long
+        return False
+    if _isascii is not None and _isascii(message):
+        return False
+    return len(message.encode("utf-8")) > maxsize
+
+
+# str.isascii() is only available in Python 3.7+
+_isascii = getattr(str, "isascii", None)
+
+
+def encode_message(msg, compression=None, codec=None, binary=False):
+    """
+    Encode message with the named `codec` (see `rsmq.codec`), or to JSON if not already
+    string, and compress it if `compression` (see `rsmq.compression.Compression`) is given.
+    In `binary` mode, binary codecs produce bytes
+    """
+    if codec is not None:
+        msg = codecs.encode(msg, codec, binary=binary)
+    elif not isinstance(msg, str):
+        msg = json.dumps(msg)
+    if compression is not None:
+        msg = compression.compress(msg)
+    return msg
+
+
+# Legacy messages are only parsed as JSON if they start like a JSON document
+_JSON_START = re.compile(r'\s*[-\[{"0-9tfnNI]')
 
 
 def decode_message(msg):
-    """Decode message from JSON if decodable, else return message as is"""
+    """
+    Decode message, as returned by receive commands (decompressed), with the codec it was
+    encoded with. Legacy messages are decoded from JSON if decodable, else message is returned
+    as is. Legacy messages received as bytes (in binary mode) are always returned as is
+    """
+    if codecs.is_encoded(msg):
+        return codecs.decode(msg)
     if isinstance(msg, str):
-        try:
-            return json.loads(msg)
-        except json.decoder.JSONDecodeError:
-            pass
+        if _JSON_START.match(msg):
+            try:
+                return json.loads(msg)
+            except json.decoder.JSONDecodeError:
+                pass
     return msg
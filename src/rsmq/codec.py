@@ -0,0 +1,145 @@
+"""
+Codecs serializing message payloads
+"""
+
+import base64
+import json
+import logging
+import pickle
+
+LOG = logging.getLogger(__name__)
+
+# First character of encoded messages, followed by the codec tag and the encoded payload
+# (base64 encoded for binary codecs). Messages not starting with it are legacy messages.
+MARK = "\x1e"
+# First character of messages encoded by binary codecs in binary mode, followed by the codec
+# tag and the encoded payload as is
+BINARY_MARK = "\x1c"
+
+_MARK = MARK.encode("ascii")
+_BINARY_MARK = BINARY_MARK.encode("ascii")
+
+
+class Codec:
+    """
+    Codec serializing messages
+
+    @param name: name of the codec, used in `codec` option
+    @param tag: single character identifying the codec in encoded messages
+    @param encode: function serializing message to str (or to bytes, if `binary`)
+    @param decode: function deserializing message from str (or from bytes, if `binary`)
+    @param binary: if true, codec produces bytes
+    """
+
+    def __init__(self, name, tag, encode, decode, binary=False):
+        self.name = name
+        self.tag = tag
+        self.encode = encode
+        self.decode = decode
+        self.binary = binary
+
+
+# Registered codecs, by name
+CODECS = {}
+# Registered codecs, by tag
+_TAGS = {}
+
+
+def register_codec(name, tag, encode, decode, binary=False):
+    """
+    Register a codec, e.g. a faster third party JSON encoder:
+
+        register_codec("orjson", "o", lambda msg: orjson.dumps(msg).decode(), orjson.loads)
+
+    Codecs must be registered by both senders and receivers. See `Codec` for parameters
+    """
+    if not isinstance(tag, str) or len(tag) != 1 or ord(tag) > 127:
+        raise ValueError("Codec tag must be a single ASCII character")
+    if tag in _TAGS and _TAGS[tag].name != name:
+        raise ValueError("Codec tag '%s' is used by '%s'" % (tag, _TAGS[tag].name))
+    codec = Codec(name, tag, encode, decode, binary=binary)
+    CODECS[name] = codec
+    _TAGS[tag] = codec
+    return codec
+
+
+def get_codec(name):
+    """Get registered codec by name"""
+    codec = CODECS.get(name)
+    if codec is None:
+        raise ValueError("Unknown codec '%s'" % name)
+    return codec
+
+
+def _text(message):
+    """Message as str"""
+    return message.decode("utf-8") if isinstance(message, bytes) else str(message)
+
+
+def _bytes(message):
+    """Message as bytes"""
+    return message.encode("utf-8") if isinstance(message, str) else bytes(message)
+
+
+register_codec("json", "j", json.dumps, json.loads)
+register_codec("text", "t", _text, _text)
+register_codec("bytes", "b", _bytes, _bytes, binary=True)
+
+
+def enable_pickle():
+    """
+    Register `pickle` codec. It is not registered by default, as unpickling messages from
+    untrusted senders can execute arbitrary code
+    """
+    return register_codec("pickle", "p", pickle.dumps, pickle.loads, binary=True)
+
+
+def encode(message, name, binary=False):
+    """
+    Encode message with the named codec. In binary mode, payload of binary codecs is not
+    base64 encoded, and encoded message is bytes
+    """
+    codec = get_codec(name)
+    payload = codec.encode(message)
+    if not codec.binary:
+        return MARK + codec.tag + payload
+    if binary:
+        return _BINARY_MARK + codec.tag.encode("ascii") + payload
+    return MARK + codec.tag + base64.b64encode(payload).decode("ascii")
+
+
+def is_encoded(message):
+    """True if message was encoded by a codec"""
+    if isinstance(message, str):
+        return message[:1] == MARK
+    if isinstance(message, (bytes, memoryview)):
+        return bytes(message[:1]) in (_MARK, _BINARY_MARK)
+    return False
+
+
+def decode(message):
+    """
+    Decode message encoded by a codec. Messages of unknown codecs, and messages that only
+    look encoded, are returned as is
+    """
+    if isinstance(message, str):
+        tag, encoded = message[1:2], True
+    else:
+        message = bytes(message)
+        tag, encoded = message[1:2].decode("ascii", "replace"), message[:1] == _MARK
+    codec = _TAGS.get(tag)
+    if codec is None:
+        LOG.warning("Unknown codec tag %r, message left as is", tag)
+        return message
+    payload = message[2:]
+    try:
+        if codec.binary:
+            if encoded:
+                payload = base64.b64decode(payload, validate=True)
+        elif isinstance(payload, bytes):
+            payload = payload.decode("utf-8")
+        return codec.decode(payload)
+    except Exception as ex:  # pylint: disable=W0703
+        # e.g. a legacy message starting with the mark
+        LOG.debug("Message not decoded by %s codec, left as is: %s", codec.name, ex)
+        return message
@@ -0,0 +1,169 @@
+"""
+Compression of message payloads
+"""
+
+import base64
+import logging
+import threading
+import zlib
+
+try:
+    import lzma
+except ImportError:  # pragma: no cover - Python built without lzma
+    lzma = None
+
+LOG = logging.getLogger(__name__)
+
+# First character of compressed messages, followed by the compressor tag and the base64
+# encoded compressed payload. Messages not starting with it are not compressed.
+MARK = "\x1f"
+# First character of messages compressed in binary mode, followed by the compressor tag and
+# the compressed payload as is
+BINARY_MARK = "\x1d"
+
+_MARK = MARK.encode("ascii")
+_BINARY_MARK = BINARY_MARK.encode("ascii")
+
+# Registered compressors: name -> (tag, compress, decompress)
+COMPRESSORS = {}
+# Registered compressors by tag: tag -> name
+_TAGS = {}
+
+
+def register_compressor(name, tag, compress, decompress):
+    """
+    Register a compressor
+
+    @param name: name of the compressor, used in `compression` option
+    @param tag: single character identifying the compressor in compressed messages
+    @param compress: function compressing bytes
+    @param decompress: function decompressing bytes
+    """
+    if not isinstance(tag, str) or len(tag) != 1 or ord(tag) > 127:
+        raise ValueError("Compressor tag must be a single ASCII character")
+    if _TAGS.get(tag, name) != name:
+        raise ValueError("Compressor tag '%s' is used by '%s'" % (tag, _TAGS[tag]))
+    COMPRESSORS[name] = (tag, compress, decompress)
+    _TAGS[tag] = name
+
+
+register_compressor("zlib", "z", zlib.compress, zlib.decompress)
+if lzma is not None:
+    register_compressor("lzma", "x", lzma.compress, lzma.decompress)
+
+
+def decompress(message):
+    """
+    Decompress message, if compressed. Other messages (including legacy messages, and messages
+    that only look compressed) are returned as is.
+
+    Messages received as str are decompressed to str, messages received as bytes (in
+    binary mode) to bytes
+    """
+    if isinstance(message, str):
+        if message[:1] != MARK:
+            return message
+        tag = message[1:2]
+    elif isinstance(message, (bytes, memoryview)):
+        mark = bytes(message[:1])
+        if mark != _MARK and mark != _BINARY_MARK:
+            return message
+        tag = bytes(message[1:2]).decode("ascii", "replace")
+    else:
+        return message
+    name = _TAGS.get(tag)
+    if name is None:
+        LOG.warning("Unknown compressor tag %r, message left as is", tag)
+        return message
+    data = message[2:]
+    try:
+        if isinstance(message, str):
+            return COMPRESSORS[name][2](base64.b64decode(data, validate=True)).decode(
+                "utf-8"
+            )
+        if mark == _MARK:
+            data = base64.b64decode(data, validate=True)
+        return COMPRESSORS[name][2](bytes(data))
+    except Exception as ex:  # pylint: disable=W0703
+        # e.g. a message sent before compression existed, starting with the mark
+        LOG.debug("Message not decompressed by %s, left as is: %s", name, ex)
+        return message
+
+
+class Compression:
+    """
+    Compresses messages sent by `RedisSMQ`, when `compression` option is set.
+
+    Only messages of at least `threshold` bytes are compressed, and only if compressed
+    message is shorter. Compressed messages start with `MARK` and the compressor tag, so
+    received messages are decompressed regardless of the options of the receiving controller,
+    and messages sent without compression remain readable.
+
+    In binary mode, compressed payload is not base64 encoded, and messages start with
+    `BINARY_MARK` instead. Such messages can only be received in binary mode.
+    """
+
+    def __init__(self, method=None, threshold=1024, binary=False):
+        """
+        Initialize
+
+        @param method: name of registered compressor (`zlib`, `lzma`, ...), or None
+        @param threshold: min size (in bytes) of compressed messages
+        @param binary: if true, compressed messages are bytes
+        """
+        if method is not None and method not in COMPRESSORS:
+            raise ValueError("Unknown compression method '%s'" % method)
+        self.method = method
+        self.threshold = threshold
+        self.binary = binary
+        self._lock = threading.Lock()
+        # counters
+        self.messages = 0
+        self.skipped = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    @property
+    def enabled(self):
+        """True if messages are compressed"""
+        return self.method is not None
+
+    def compress(self, message):
+        """Compress message (str or bytes) if enabled and long enough"""
+        if self.method is None or not isinstance(message, (str, bytes)):
+            return message
+        if len(message) * (4 if isinstance(message, str) else 1) < self.threshold:
+            # not long enough even if every character is four bytes long
+            return message
+        data = message.encode("utf-8") if isinstance(message, str) else message
+        if len(data) < self.threshold:
+            return message
+        tag, compress, _ = COMPRESSORS[self.method]
+        if self.binary:
+            compressed = _BINARY_MARK + tag.encode("ascii") + compress(data)
+        else:
+            compressed = MARK + tag + base64.b64encode(compress(data)).decode("ascii")
+        with self._lock:
+            self.bytes_in += len(data)
+            if len(compressed) >= len(data):
+                self.skipped += 1
+                self.bytes_out += len(data)
+                return message
+            self.messages += 1
+            self.bytes_out += len(compressed)
+        return compressed
+
+    def stats(self):
+        """
+        Get counters of compressed messages and their size before and after compression.
+
+        `ratio` is size before compression to size after compression, including messages
+        skipped because compression did not make them shorter
+        """
+        return {
+            "messages": self.messages,
+            "skipped": self.skipped,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "ratio": self.bytes_in / self.bytes_out if self.bytes_out else None,
+        }
@@ -13,6 +13,9 @@ QUEUE_SUFFUX = ":Q"
 # suffix to append to the queue set
 QUEUES = "QUEUES"
 
+# Realtime notification channel prefix
+REALTIME_PREFIX = "rt:"
+
 # minimum VT - seconds
 VT_MIN = 0
 
@@ -35,8 +38,74 @@ MAXSIZE_MIN = 1024
 MAXSIZE_MAX = 65565
 MAXSIZE_DEFAULT = MAXSIZE_MAX
 
+# Storage layouts of queues: "legacy" (default, compatible with other RSMQ implementations)
+# keeps receive count and first receive time of messages in separate fields, "compact" in a
+# header of the message field
+LAYOUT_LEGACY = "legacy"
+LAYOUT_COMPACT = "compact"
+LAYOUTS = (LAYOUT_LEGACY, LAYOUT_COMPACT)
+# First character of the header of messages stored in compact layout
+COMPACT_MARK = "\x1a"
+
+
+# number of messages written per transaction by sendMessages
+SEND_CHUNK_SIZE_MIN = 1
+SEND_CHUNK_SIZE_MAX = 100000
+SEND_CHUNK_SIZE_DEFAULT = 1000
+
+# number of messages converted per script call by migrateQueue
+MIGRATE_BATCH_SIZE_MIN = 1
+MIGRATE_BATCH_SIZE_MAX = 100000
+MIGRATE_BATCH_SIZE_DEFAULT = 1000
+
+# max receive count of messages, before they are moved to dead-letter queue (0 for no limit)
+MAX_RECEIVE_COUNT_MIN = 0
+MAX_RECEIVE_COUNT_MAX = 1000
+MAX_RECEIVE_COUNT_DEFAULT = 0
+
+# number of messages moved per script call by redriveMessages
+REDRIVE_BATCH_SIZE_MIN = 1
+REDRIVE_BATCH_SIZE_MAX = 100000
+REDRIVE_BATCH_SIZE_DEFAULT = 1000
+
+# number of messages retrieved by receiveMessages/popMessages
+RECEIVE_COUNT_MIN = 1
+RECEIVE_COUNT_MAX = 1000
+RECEIVE_COUNT_DEFAULT = 10
+
 
 # pylint: disable = C0301
+# Receive scripts take max receive count (0 for no limit), base name of the dead-letter queue and
+# its realtime channel ("" if realtime is off) as the last three keys. Messages received more
+# times are moved to the dead-letter queue (if it exists) instead of being returned
 SCRIPT_POPMESSAGE = 'local msg = redis.call("ZRANGEBYSCORE", KEYS[1], "-inf", KEYS[2], "LIMIT", "0", "1") if #msg == 0 then return {} end redis.call("HINCRBY", KEYS[1] .. ":Q", "totalrecv", 1) local mbody = redis.call("HGET", KEYS[1] .. ":Q", msg[1]) local rc = redis.call("HINCRBY", KEYS[1] .. ":Q", msg[1] .. ":rc", 1) local o = {msg[1], mbody, rc} if rc==1 then table.insert(o, KEYS[2]) else local fr = redis.call("HGET", KEYS[1] .. ":Q", msg[1] .. ":fr") table.insert(o, fr) end redis.call("ZREM", KEYS[1], msg[1]) redis.call("HDEL", KEYS[1] .. ":Q", msg[1], msg[1] .. ":rc", msg[1] .. ":fr") return o'
-SCRIPT_RECEIVEMESSAGE = 'local msg = redis.call("ZRANGEBYSCORE", KEYS[1], "-inf", KEYS[2], "LIMIT", "0", "1") if #msg == 0 then return {} end redis.call("ZADD", KEYS[1], KEYS[3], msg[1]) redis.call("HINCRBY", KEYS[1] .. ":Q", "totalrecv", 1) local mbody = redis.call("HGET", KEYS[1] .. ":Q", msg[1]) local rc = redis.call("HINCRBY", KEYS[1] .. ":Q", msg[1] .. ":rc", 1) local o = {msg[1], mbody, rc} if rc==1 then redis.call("HSET", KEYS[1] .. ":Q", msg[1] .. ":fr", KEYS[2]) table.insert(o, KEYS[2]) else local fr = redis.call("HGET", KEYS[1] .. ":Q", msg[1] .. ":fr") table.insert(o, fr) end return o'
+SCRIPT_RECEIVEMESSAGE = 'local q = KEYS[1] .. ":Q" local now, dlq, max, rt = KEYS[2], KEYS[5], tonumber(KEYS[4]) or 0, KEYS[6] if max > 0 and not redis.call("HGET", dlq .. ":Q", "vt") then max = 0 end local function dead(id, mbody) redis.call("ZREM", KEYS[1], id) redis.call("HDEL", q, id, id .. ":rc", id .. ":fr") redis.call("HINCRBY", q, "totaldeadlettered", 1) if not mbody then return end local d = dlq .. ":Q" if redis.call("HGET", d, "layout") == "compact" and string.byte(mbody, 1) == 26 then mbody = "\\26" .. "0:0:" .. mbody end redis.call("ZADD", dlq, now, id) redis.call("HSET", d, id, mbody) redis.call("HINCRBY", d, "totalsent", 1) if rt ~= "" then redis.call("PUBLISH", rt, 1) end end while true do local msg = redis.call("ZRANGEBYSCORE", KEYS[1], "-inf", KEYS[2], "LIMIT", "0", "1") if #msg == 0 then return {} end redis.call("HINCRBY", q, "totalrecv", 1) local mbody = redis.call("HGET", q, msg[1]) local rc = redis.call("HINCRBY", q, msg[1] .. ":rc", 1) if max > 0 and rc > max then dead(msg[1], mbody) else redis.call("ZADD", KEYS[1], KEYS[3], msg[1]) local o = {msg[1], mbody, rc} if rc==1 then redis.call("HSET", q, msg[1] .. ":fr", KEYS[2]) table.insert(o, KEYS[2]) else local fr = redis.call("HGET", q, msg[1] .. ":fr") table.insert(o, fr) end return o end end'
 SCRIPT_CHANGEMESSAGEVISIBILITY = 'local msg = redis.call("ZSCORE", KEYS[1], KEYS[2]) if not msg then return 0 end redis.call("ZADD", KEYS[1], KEYS[3], KEYS[2]) return 1'
+
+SCRIPT_POPMESSAGES = 'local msgs = redis.call("ZRANGEBYSCORE", KEYS[1], "-inf", KEYS[2], "LIMIT", "0", KEYS[3]) if #msgs == 0 then return {} end local q = KEYS[1] .. ":Q" redis.call("HINCRBY", q, "totalrecv", #msgs) local o = {} for i, id in ipairs(msgs) do local mbody = redis.call("HGET", q, id) local rc = redis.call("HINCRBY", q, id .. ":rc", 1) local fr = KEYS[2] if rc ~= 1 then fr = redis.call("HGET", q, id .. ":fr") end o[i] = {id, mbody, rc, fr} redis.call("ZREM", KEYS[1], id) redis.call("HDEL", q, id, id .. ":rc", id .. ":fr") end return o'
+SCRIPT_RECEIVEMESSAGES = 'local q = KEYS[1] .. ":Q" local now, dlq, max, rt = KEYS[2], KEYS[6], tonumber(KEYS[5]) or 0, KEYS[7] if max > 0 and not redis.call("HGET", dlq .. ":Q", "vt") then max = 0 end local function dead(id, mbody) redis.call("ZREM", KEYS[1], id) redis.call("HDEL", q, id, id .. ":rc", id .. ":fr") redis.call("HINCRBY", q, "totaldeadlettered", 1) if not mbody then return end local d = dlq .. ":Q" if redis.call("HGET", d, "layout") == "compact" and string.byte(mbody, 1) == 26 then mbody = "\\26" .. "0:0:" .. mbody end redis.call("ZADD", dlq, now, id) redis.call("HSET", d, id, mbody) redis.call("HINCRBY", d, "totalsent", 1) if rt ~= "" then redis.call("PUBLISH", rt, 1) end end local o, seen, count = {}, {}, tonumber(KEYS[4]) while #o < count do local need = count - #o local ids = {} for i, id in ipairs(redis.call("ZRANGEBYSCORE", KEYS[1], "-inf", KEYS[2], "LIMIT", "0", need + #o)) do if not seen[id] and #ids < need then table.insert(ids, id) end end if #ids == 0 then break end redis.call("HINCRBY", q, "totalrecv", #ids) for i, id in ipairs(ids) do local mbody = redis.call("HGET", q, id) local rc = redis.call("HINCRBY", q, id .. ":rc", 1) if max > 0 and rc > max then dead(id, mbody) else redis.call("ZADD", KEYS[1], KEYS[3], id) local fr = KEYS[2] if rc == 1 then redis.call("HSET", q, id .. ":fr", KEYS[2]) else fr = redis.call("HGET", q, id .. ":fr") end seen[id] = true table.insert(o, {id, mbody, rc, fr}) end end if #ids < need then break end end return o'
+
+# Versions of the scripts for queues of compact layout. Message is stored in a single field,
+# prefixed by "\x1a<rc>:<fr>:" header once received. Messages received before the queue was
+# migrated (with <id>:rc and <id>:fr fields) are converted when received again
+SCRIPT_POPMESSAGE_COMPACT = 'local msg = redis.call("ZRANGEBYSCORE", KEYS[1], "-inf", KEYS[2], "LIMIT", "0", "1") if #msg == 0 then return {} end local q = KEYS[1] .. ":Q" redis.call("HINCRBY", q, "totalrecv", 1) local m = redis.call("HMGET", q, msg[1], msg[1] .. ":rc", msg[1] .. ":fr") local mbody, rc, fr = m[1] or "", tonumber(m[2]) or 0, m[3] local h, r, f = string.match(mbody, "^(\\26(%d+):(%d+):)") if h then rc, fr, mbody = tonumber(r), f, string.sub(mbody, #h + 1) end rc = rc + 1 if rc == 1 then fr = KEYS[2] end redis.call("ZREM", KEYS[1], msg[1]) redis.call("HDEL", q, msg[1], msg[1] .. ":rc", msg[1] .. ":fr") return {msg[1], mbody, rc, fr}'
+SCRIPT_RECEIVEMESSAGE_COMPACT = 'local q = KEYS[1] .. ":Q" local now, dlq, max, rt = KEYS[2], KEYS[5], tonumber(KEYS[4]) or 0, KEYS[6] if max > 0 and not redis.call("HGET", dlq .. ":Q", "vt") then max = 0 end local function dead(id, mbody) redis.call("ZREM", KEYS[1], id) redis.call("HDEL", q, id, id .. ":rc", id .. ":fr") redis.call("HINCRBY", q, "totaldeadlettered", 1) if not mbody then return end local d = dlq .. ":Q" if redis.call("HGET", d, "layout") == "compact" and string.byte(mbody, 1) == 26 then mbody = "\\26" .. "0:0:" .. mbody end redis.call("ZADD", dlq, now, id) redis.call("HSET", d, id, mbody) redis.call("HINCRBY", d, "totalsent", 1) if rt ~= "" then redis.call("PUBLISH", rt, 1) end end while true do local msg = redis.call("ZRANGEBYSCORE", KEYS[1], "-inf", KEYS[2], "LIMIT", "0", "1") if #msg == 0 then return {} end redis.call("HINCRBY", q, "totalrecv", 1) local m = redis.call("HMGET", q, msg[1], msg[1] .. ":rc", msg[1] .. ":fr") local mbody, rc, fr = m[1] or "", tonumber(m[2]) or 0, m[3] local h, r, f = string.match(mbody, "^(\\26(%d+):(%d+):)") if h then rc, fr, mbody = tonumber(r), f, string.sub(mbody, #h + 1) elseif m[2] then redis.call("HDEL", q, msg[1] .. ":rc", msg[1] .. ":fr") end rc = rc + 1 if rc == 1 then fr = KEYS[2] end if max > 0 and rc > max then dead(msg[1], mbody) else redis.call("ZADD", KEYS[1], KEYS[3], msg[1]) redis.call("HSET", q, msg[1], "\\26" .. rc .. ":" .. fr .. ":" .. mbody) return {msg[1], mbody, rc, fr} end end'
+SCRIPT_POPMESSAGES_COMPACT = 'local msgs = redis.call("ZRANGEBYSCORE", KEYS[1], "-inf", KEYS[2], "LIMIT", "0", KEYS[3]) if #msgs == 0 then return {} end local q = KEYS[1] .. ":Q" redis.call("HINCRBY", q, "totalrecv", #msgs) local o = {} for i, id in ipairs(msgs) do local m = redis.call("HMGET", q, id, id .. ":rc", id .. ":fr") local mbody, rc, fr = m[1] or "", tonumber(m[2]) or 0, m[3] local h, r, f = string.match(mbody, "^(\\26(%d+):(%d+):)") if h then rc, fr, mbody = tonumber(r), f, string.sub(mbody, #h + 1) end rc = rc + 1 if rc == 1 then fr = KEYS[2] end o[i] = {id, mbody, rc, fr} redis.call("ZREM", KEYS[1], id) redis.call("HDEL", q, id, id .. ":rc", id .. ":fr") end return o'
+SCRIPT_RECEIVEMESSAGES_COMPACT = 'local q = KEYS[1] .. ":Q" local now, dlq, max, rt = KEYS[2], KEYS[6], tonumber(KEYS[5]) or 0, KEYS[7] if max > 0 and not redis.call("HGET", dlq .. ":Q", "vt") then max = 0 end local function dead(id, mbody) redis.call("ZREM", KEYS[1], id) redis.call("HDEL", q, id, id .. ":rc", id .. ":fr") redis.call("HINCRBY", q, "totaldeadlettered", 1) if not mbody then return end local d = dlq .. ":Q" if redis.call("HGET", d, "layout") == "compact" and string.byte(mbody, 1) == 26 then mbody = "\\26" .. "0:0:" .. mbody end redis.call("ZADD", dlq, now, id) redis.call("HSET", d, id, mbody) redis.call("HINCRBY", d, "totalsent", 1) if rt ~= "" then redis.call("PUBLISH", rt, 1) end end local o, seen, count = {}, {}, tonumber(KEYS[4]) while #o < count do local need = count - #o local ids = {} for i, id in ipairs(redis.call("ZRANGEBYSCORE", KEYS[1], "-inf", KEYS[2], "LIMIT", "0", need + #o)) do if not seen[id] and #ids < need then table.insert(ids, id) end end if #ids == 0 then break end redis.call("HINCRBY", q, "totalrecv", #ids) for i, id in ipairs(ids) do local m = redis.call("HMGET", q, id, id .. ":rc", id .. ":fr") local mbody, rc, fr = m[1] or "", tonumber(m[2]) or 0, m[3] local h, r, f = string.match(mbody, "^(\\26(%d+):(%d+):)") if h then rc, fr, mbody = tonumber(r), f, string.sub(mbody, #h + 1) elseif m[2] then redis.call("HDEL", q, id .. ":rc", id .. ":fr") end rc = rc + 1 if rc == 1 then fr = KEYS[2] end if max > 0 and rc > max then dead(id, mbody) else redis.call("ZADD", KEYS[1], KEYS[3], id) redis.call("HSET", q, id, "\\26" .. rc .. ":" .. fr .. ":" .. mbody) seen[id] = true table.insert(o, {id, mbody, rc, fr}) end end if #ids < need then break end end return o'
+# Convert up to KEYS[3] messages of the queue, starting at index KEYS[2], to compact layout:
+# received messages get a header, unreceived messages starting with the header mark are escaped.
+# Returns {number of messages checked, number of messages converted}
+SCRIPT_MIGRATEQUEUE_COMPACT = 'local q = KEYS[1] .. ":Q" if not redis.call("HGET", q, "vt") then return false end local ids = redis.call("ZRANGE", KEYS[1], KEYS[2], KEYS[2] + KEYS[3] - 1) local n = 0 for i, id in ipairs(ids) do local m = redis.call("HMGET", q, id, id .. ":rc", id .. ":fr") if m[1] and m[2] then redis.call("HSET", q, id, "\\26" .. m[2] .. ":" .. (m[3] or "0") .. ":" .. m[1]) redis.call("HDEL", q, id .. ":rc", id .. ":fr") n = n + 1 elseif m[1] and string.byte(m[1], 1) == 26 and not string.match(m[1], "^\\26%d+:%d+:") then redis.call("HSET", q, id, "\\26" .. "0:0:" .. m[1]) n = n + 1 end end return {#ids, n}'
+# Move up to KEYS[3] messages of dead-letter queue KEYS[1] to queue KEYS[2], visible at KEYS[4],
+# publishing their number to realtime channel KEYS[5] ("" if realtime is off).
+# Returns number of moved messages, false if dead-letter queue does not exist, -1 if queue does not exist
+SCRIPT_REDRIVEMESSAGES = 'local src, dst = KEYS[1] .. ":Q", KEYS[2] .. ":Q" local def = redis.call("HMGET", src, "vt", "layout") if not def[1] then return false end if not redis.call("HGET", dst, "vt") then return -1 end local compact = redis.call("HGET", dst, "layout") == "compact" local ids = redis.call("ZRANGE", KEYS[1], 0, KEYS[3] - 1) for i, id in ipairs(ids) do local mbody = redis.call("HGET", src, id) redis.call("ZREM", KEYS[1], id) redis.call("HDEL", src, id, id .. ":rc", id .. ":fr") if mbody then if def[2] == "compact" then local h = string.match(mbody, "^(\\26%d+:%d+:)") if h then mbody = string.sub(mbody, #h + 1) end end if compact and string.byte(mbody, 1) == 26 then mbody = "\\26" .. "0:0:" .. mbody end redis.call("ZADD", KEYS[2], KEYS[4], id) redis.call("HSET", dst, id, mbody) redis.call("HINCRBY", dst, "totalsent", 1) end end if #ids > 0 and KEYS[5] ~= "" then redis.call("PUBLISH", KEYS[5], #ids) end return #ids'
+
+# Single round trip versions of the scripts - queue definition and time are resolved server side
+# Return false (nil) if queue does not exist. Send returns {maxsize} if message is longer than maxsize
+# Queue layout is read with queue definition, so scripts handle both layouts
+SCRIPT_SENDMESSAGE_RTT = 'if redis.replicate_commands then redis.replicate_commands() end local q = KEYS[1] .. ":Q" local def = redis.call("HMGET", q, "vt", "delay", "maxsize", "layout") if not def[1] then return false end if tonumber(def[3]) >= 0 and #KEYS[3] > tonumber(def[3]) then redis.call("HINCRBY", q, "totalrejected", 1) return {def[3]} end local t = redis.call("TIME") local usec = t[1] * 1000000 + t[2] local ms = t[1] * 1000 + math.floor(t[2] / 1000) local chars = "0123456789abcdefghijklmnopqrstuvwxyz" local id = "" while usec > 0 do local r = usec % 36 id = string.sub(chars, r + 1, r + 1) .. id usec = math.floor(usec / 36) end id = id .. KEYS[2] local delay = KEYS[4] if delay == "" then delay = math.floor(tonumber(def[2]) * 1000 + 0.5) end redis.call("ZADD", KEYS[1], string.format("%.0f", ms + tonumber(delay)), id) local mbody = KEYS[3] if def[4] == "compact" and string.byte(mbody, 1) == 26 then mbody = "\\26" .. "0:0:" .. mbody end redis.call("HSET", q, id, mbody) redis.call("HINCRBY", q, "totalsent", 1) if KEYS[5] ~= "" then redis.call("PUBLISH", KEYS[5], 1) end return id'
+SCRIPT_POPMESSAGE_RTT = 'if redis.replicate_commands then redis.replicate_commands() end local q = KEYS[1] .. ":Q" local def = redis.call("HMGET", q, "vt", "layout") if not def[1] then return false end local t = redis.call("TIME") local now = string.format("%.0f", t[1] * 1000 + math.floor(t[2] / 1000)) local msg = redis.call("ZRANGEBYSCORE", KEYS[1], "-inf", now, "LIMIT", "0", "1") if #msg == 0 then return {} end redis.call("HINCRBY", q, "totalrecv", 1) local o if def[2] == "compact" then local m = redis.call("HMGET", q, msg[1], msg[1] .. ":rc", msg[1] .. ":fr") local mbody, rc, fr = m[1] or "", tonumber(m[2]) or 0, m[3] local h, r, f = string.match(mbody, "^(\\26(%d+):(%d+):)") if h then rc, fr, mbody = tonumber(r), f, string.sub(mbody, #h + 1) end rc = rc + 1 if rc == 1 then fr = now end o = {msg[1], mbody, rc, fr} else local mbody = redis.call("HGET", q, msg[1]) local rc = redis.call("HINCRBY", q, msg[1] .. ":rc", 1) o = {msg[1], mbody, rc} if rc==1 then table.insert(o, now) else local fr = redis.call("HGET", q, msg[1] .. ":fr") table.insert(o, fr) end end redis.call("ZREM", KEYS[1], msg[1]) redis.call("HDEL", q, msg[1], msg[1] .. ":rc", msg[1] .. ":fr") return o'
+SCRIPT_RECEIVEMESSAGE_RTT = 'if redis.replicate_commands then redis.replicate_commands() end local q = KEYS[1] .. ":Q" local def = redis.call("HMGET", q, "vt", "layout", "max_receive_count", "dead_letter_queue") if not def[1] then return false end local t = redis.call("TIME") local ms = t[1] * 1000 + math.floor(t[2] / 1000) local now = string.format("%.0f", ms) local vt = KEYS[2] if vt == "" then vt = math.floor(tonumber(def[1]) * 1000 + 0.5) end local vtimeout = string.format("%.0f", ms + tonumber(vt)) local dlq, max, rt = "", tonumber(def[3]) or 0, "" if max > 0 and def[4] then dlq = KEYS[3] .. def[4] if KEYS[4] ~= "" then rt = KEYS[4] .. def[4] end end if max > 0 and not redis.call("HGET", dlq .. ":Q", "vt") then max = 0 end local function dead(id, mbody) redis.call("ZREM", KEYS[1], id) redis.call("HDEL", q, id, id .. ":rc", id .. ":fr") redis.call("HINCRBY", q, "totaldeadlettered", 1) if not mbody then return end local d = dlq .. ":Q" if redis.call("HGET", d, "layout") == "compact" and string.byte(mbody, 1) == 26 then mbody = "\\26" .. "0:0:" .. mbody end redis.call("ZADD", dlq, now, id) redis.call("HSET", d, id, mbody) redis.call("HINCRBY", d, "totalsent", 1) if rt ~= "" then redis.call("PUBLISH", rt, 1) end end while true do local msg = redis.call("ZRANGEBYSCORE", KEYS[1], "-inf", now, "LIMIT", "0", "1") if #msg == 0 then return {} end redis.call("HINCRBY", q, "totalrecv", 1) if def[2] == "compact" then local m = redis.call("HMGET", q, msg[1], msg[1] .. ":rc", msg[1] .. ":fr") local mbody, rc, fr = m[1] or "", tonumber(m[2]) or 0, m[3] local h, r, f = string.match(mbody, "^(\\26(%d+):(%d+):)") if h then rc, fr, mbody = tonumber(r), f, string.sub(mbody, #h + 1) elseif m[2] then redis.call("HDEL", q, msg[1] .. ":rc", msg[1] .. ":fr") end rc = rc + 1 if rc == 1 then fr = now end if max > 0 and rc > max then dead(msg[1], mbody) else redis.call("ZADD", KEYS[1], vtimeout, msg[1]) redis.call("HSET", q, msg[1], "\\26" .. rc .. ":" .. fr .. ":" .. mbody) return {msg[1], mbody, rc, fr} end else local mbody = redis.call("HGET", q, msg[1]) local rc = redis.call("HINCRBY", q, msg[1] .. ":rc", 1) if max > 0 and rc > max then dead(msg[1], mbody) else redis.call("ZADD", KEYS[1], vtimeout, msg[1]) local o = {msg[1], mbody, rc} if rc==1 then redis.call("HSET", q, msg[1] .. ":fr", now) table.insert(o, now) else local fr = redis.call("HGET", q, msg[1] .. ":fr") table.insert(o, fr) end return o end end end'
+SCRIPT_CHANGEMESSAGEVISIBILITY_RTT = 'if redis.replicate_commands then redis.replicate_commands() end local def = redis.call("HMGET", KEYS[1] .. ":Q", "vt") if not def[1] then return false end local msg = redis.call("ZSCORE", KEYS[1], KEYS[2]) if not msg then return 0 end local t = redis.call("TIME") local ms = t[1] * 1000 + math.floor(t[2] / 1000) local vt = KEYS[3] if vt == "" then vt = math.floor(tonumber(def[1]) * 1000 + 0.5) end redis.call("ZADD", KEYS[1], string.format("%.0f", ms + tonumber(vt)), KEYS[2]) return 1'
+SCRIPT_CHANGEMESSAGESVISIBILITY = 'if redis.replicate_commands then redis.replicate_commands() end local def = redis.call("HMGET", KEYS[1] .. ":Q", "vt") if not def[1] then return false end local t = redis.call("TIME") local ms = t[1] * 1000 + math.floor(t[2] / 1000) local vt = KEYS[2] if vt == "" then vt = math.floor(tonumber(def[1]) * 1000 + 0.5) end local ts = string.format("%.0f", ms + tonumber(vt)) local o = {} for i = 3, #KEYS do if redis.call("ZSCORE", KEYS[1], KEYS[i]) then redis.call("ZADD", KEYS[1], ts, KEYS[i]) table.insert(o, KEYS[i]) end end return o'
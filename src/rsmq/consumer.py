@@ -8,12 +8,15 @@ from threading import Thread
 
 from redis.exceptions import NoScriptError
 
+from . import const
 from .cmd import utils
 from .cmd.exceptions import NoMessageInQueue
 from .cmd.exceptions import RedisSMQException
+from .lease_manager import LeaseManager
+from .message import Message
+from .realtime import RealtimeListener
 from .retry_delay_handler import RetryDelayHandler
 from .rsmq import RedisSMQ
-from .rsmq import const
 
 LOG = logging.getLogger(__name__)
 
@@ -24,66 +27,14 @@ class RedisSMQConsumer:
     """
 
     # local parameters and their value
-    LOCAL_PARAMS = {"retry_delay": 0, "empty_queue_delay": 2.0, "decode": True}
-
-    class VisibilityTimeoutExtender(Thread):
-        """ Thread that keeps the visibility """
-
-        def __init__(self, consumer, message_id):
-            """Initialize"""
-            self.consumer = consumer
-            self.rsqm = consumer.rsqm
-
-            self.vt = consumer.vt
-            self.message_id = message_id
-            thread_name = "VTExtender:%s" % message_id
-            super(RedisSMQConsumer.VisibilityTimeoutExtender, self).__init__(
-                name=thread_name
-            )
-
-            self.daemon = True
-            self._request_stop = False
-
-            # How often to check time
-            self.interval = self.vt / 4
-
-            self.next_extension = time.time() + self.vt / 2
-            self.set_next_extension()
-
-        def set_next_extension(self):
-            """set next extension"""
-            self.next_extension = time.time() + self.vt / 2
-
-        def trace(self, msg, *args):
-            """Passthrough for trace messages"""
-            self.consumer.trace("VisibilityTimeoutExtender: %s" % msg, args)
-
-        def extend(self):
-            """extend visibility timeout"""
-            try:
-                self.trace("Extending visibility by %s seconds...", self.vt)
-                self.rsqm.changeMessageVisibility(
-                    vt=self.vt, id=self.message_id
-                ).execute()
-                self.set_next_extension()
-            except RedisSMQException as ex:
-                LOG.warning(
-                    "Failed to extend message visibility for %s: %s",
-                    self.message_id,
-                    ex,
-                )
-
-        def stop(self):
-            """Stop this thread"""
-            self._request_stop = True
-
-        def run(self):
-            """Run"""
-            while not self._request_stop:
-                time.sleep(self.interval)
-                if not self._request_stop and time.time() > self.next_extension:
-                    self.extend()
-                    self.set_next_extension()
+    LOCAL_PARAMS = {
+        "retry_delay": 0,
+        "empty_queue_delay": 2.0,
+        "decode": True,
+        "message_object": False,
+    }
+    # controller class
+    CONTROLLER = RedisSMQ
 
     def __init__(self, qname, processor, **rsmq_params):
         """
@@ -99,12 +50,17 @@ class RedisSMQConsumer:
         retried
         @param empty_queue_delay: (float) Amount of time, in seconds, to wait
         if no items in queue
+        @param decode: if true, decode messages (see `rsmq.cmd.utils.decode_message()`)
+        @param message_object: if true, processor is called with a single `rsmq.message.Message`
+        object, whose payload is only decoded when accessed, instead of keyword arguments
 
         Remaining args are passed to RedisSMQ()
 
         """
         self._request_stop = False
-        self.rsqm = RedisSMQ(qname=qname, **rsmq_params)
+        self.leases = None
+        self.notifications = None
+        self.rsqm = self.CONTROLLER(qname=qname, **rsmq_params)
         self.qname = qname
         self.processor = processor
 
@@ -142,6 +98,16 @@ class RedisSMQConsumer:
         """decode, if true, attempt to decode the output from JSON"""
         return self._param("decode")
 
+    @property
+    def message_object(self):
+        """message_object, if true, pass `Message` object to the processor"""
+        return self._param("message_object")
+
+    @property
+    def realtime(self):
+        """realtime, if true, wait for notifications about new messages instead of polling"""
+        return self.rsqm.options.get("realtime", False) is True
+
     def _get_vt(self):
         """Get VT from the queue info if not set"""
         if self.vt is None:
@@ -193,36 +159,60 @@ class RedisSMQConsumer:
         if self._trace is not False:
             LOG.debug(fmt, *args)
 
+    def consume(self):
+        """Receive and process a single message"""
+        msg = self.rsqm.receiveMessage().execute()
+        if not msg or "id" not in msg:
+            raise RedisSMQException(
+                "Invalid message in queue '%s': %s" % (self.qname, msg)
+            )
+        self.leases.register(msg["id"])
+        try:
+            if self.message_object:
+                success = self.processor(Message.from_dict(msg, self.decode))
+            else:
+                if self.decode and "message" in msg:
+                    msg["message"] = utils.decode_message(msg["message"])
+                success = self.processor(**msg)
+        finally:
+            self.leases.unregister(msg["id"])
+        if success:
+            self.on_success(msg)
+        else:
+            self.on_failure(msg)
+
+    def wait_for_messages(self):
+        """Wait before retrying when there are no messages in queue"""
+        delay = self.empty_queue_delay
+        if self.notifications is not None:
+            self.trace("No message in queue, waiting up to %s seconds", delay)
+            self.notifications.wait(delay)
+            return
+        self.trace("No message in queue, waiting %s seconds", delay)
+        if delay:
+            time.sleep(delay)
+
+    def shutdown(self):
+        """Clean up at the end of the main loop"""
+        self.leases.stop()
+        if self.notifications is not None:
+            self.notifications.close()
+
     def run(self):
         """main loop of the thread"""
         self.trace("Starting Queue Consumer for %s", self.qname)
         self.create_queue()
         retry_delay = RetryDelayHandler(0, 60)
+        self.leases = LeaseManager(self.rsqm, self.qname, self.vt)
+        self.leases.start()
+        if self.realtime:
+            self.notifications = RealtimeListener(self.rsqm, self.qname)
         while not self._request_stop:
             try:
-                msg = self.rsqm.receiveMessage().execute()
-                if msg and "id" in msg:
-                    extender = RedisSMQConsumer.VisibilityTimeoutExtender(
-                        self, msg["id"]
-                    )
-                    extender.start()
-                    if self.decode and "message" in msg:
-                        msg["message"] = utils.decode_message(msg["message"])
-                    if self.processor(**msg):
-                        self.on_success(msg)
-                    else:
-                        self.on_failure(msg)
-                    extender.stop()
-                    retry_delay.reset()
-                else:
-                    raise RedisSMQException(
-                        "Invalid message in queue '%s': %s" % (self.qname, msg)
-                    )
+                self.consume()
+                retry_delay.reset()
             except NoMessageInQueue:
-                delay = self.empty_queue_delay
-                self.trace("No message in queue, waiting %s seconds", delay)
-                if delay:
-                    time.sleep(delay)
+                self.wait_for_messages()
             except RedisSMQException as ex:
                 LOG.warning("Exception while processing queue `%s`: %s",
                             self.qname, ex)
@@ -240,8 +230,8 @@ class RedisSMQConsumer:
                 LOG.warning("Unexpected error while processing queue `%s`: %s",
                             self.qname, ex)
                 retry_delay.delay()
-            self.rsqm.reset_scripts()
 
+        self.shutdown()
         self._request_stop = None
         self.trace("Ended Queue Consumer for %s", self.qname)
 
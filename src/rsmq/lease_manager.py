@@ -0,0 +1,188 @@
+"""
+Visibility timeout lease manager
+"""
+
+import heapq
+import itertools
+import logging
+import time
+from threading import Condition, Lock, Thread
+
+from redis.exceptions import RedisError
+
+from .cmd.exceptions import QueueDoesNotExist, RedisSMQException
+
+LOG = logging.getLogger(__name__)
+
+
+class LeaseManager(Thread):
+    """
+    Single thread that keeps the visibility timeout of all in-flight messages of a queue
+    extended.
+
+    Leases are kept in a timer heap. Every lease is extended by `vt` seconds once half of
+    it has elapsed, and all leases that are due at the same time are extended in one
+    batch, with a single script call.
+    """
+
+    def __init__(self, rsmq, qname, vt):
+        """
+        Initialize
+
+        @param rsmq: RedisSMQ controller
+        @param qname: queue name
+        @param vt: visibility timeout (in seconds) to extend leases by
+        """
+        super(LeaseManager, self).__init__(name="LeaseManager:%s" % qname)
+        self.daemon = True
+        self.rsmq = rsmq
+        self.qname = qname
+        self.vt = vt
+
+        # heap of [due, sequence, message_id] entries. Unregistered entries have
+        # message_id set to None and are discarded when they reach top of the heap
+        self._heap = []
+        self._leases = {}
+        self._sequence = itertools.count()
+        self._condition = Condition()
+        # held while a batch is being extended
+        self._extending = Lock()
+        self._request_stop = False
+
+    @property
+    def interval(self):
+        """How often, in seconds, each lease is extended"""
+        return self.vt / 2
+
+    def __len__(self):
+        """Number of registered leases"""
+        return len(self._leases)
+
+    def __contains__(self, message_id):
+        """Check if message has a registered lease"""
+        return message_id in self._leases
+
+    def register(self, message_id):
+        """Start keeping message visibility timeout extended"""
+        if self.vt <= 0:
+            # messages are visible again right away, there is no lease to keep
+            return
+        with self._condition:
+            self._remove(message_id)
+            entry = [time.monotonic() + self.interval, next(self._sequence), message_id]
+            self._leases[message_id] = entry
+            heapq.heappush(self._heap, entry)
+            if self._heap[0] is entry:
+                self._condition.notify()
+
+    def unregister(self, message_id):
+        """
+        Stop extending message visibility timeout.
+
+        Returns once any extension already in progress is done, so the caller may safely
+        change the visibility of the message afterwards
+        """
+        with self._condition:
+            self._remove(message_id)
+        with self._extending:
+            pass
+
+    def _remove(self, message_id):
+        """Remove lease, if registered. Must be called with the lock held"""
+        entry = self._leases.pop(message_id, None)
+        if entry is not None:
+            entry[2] = None
+            # Compact heap if it is mostly made of removed entries
+            if len(self._heap) > 64 and len(self._heap) > 2 * len(self._leases):
+                self._heap = [item for item in self._heap if item[2] is not None]
+                heapq.heapify(self._heap)
+
+    def stop(self, wait=None):
+        """Stop extending all leases and stop the thread"""
+        with self._condition:
+            self._request_stop = True
+            self._leases.clear()
+            self._heap = []
+            self._condition.notify()
+        if wait and self.is_alive():
+            self.join(wait)
+
+    def _next_due(self):
+        """Wait until leases are due and return their message ids, or None when stopped"""
+        with self._condition:
+            while not self._request_stop:
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                now = time.monotonic()
+                if self._heap[0][0] > now:
+                    self._condition.wait(self._heap[0][0] - now)
+                    continue
+
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    entry = heapq.heappop(self._heap)
+                    if entry[2] is None:
+                        continue
+                    due.append(entry[2])
+                    entry[0] = now + self.interval
+                    heapq.heappush(self._heap, entry)
+                if due:
+                    return due
+        return None
+
+    def extend(self, message_ids):
+        """Extend visibility timeout of messages with a single script call"""
+        LOG.debug(
+            "Extending visibility of %s messages by %s seconds",
+            len(message_ids),
+            self.vt,
+        )
+        existing = self.change_visibility(message_ids, self.vt)
+        if existing is None:
+            return
+        existing = set(existing)
+        for message_id in message_ids:
+            if message_id not in existing:
+                LOG.warning("Message %s is no longer in queue", message_id)
+                with self._condition:
+                    self._remove(message_id)
+
+    def release(self, message_ids, vt=0):
+        """
+        Unregister leases and set visibility timeout of messages to `vt` seconds, with a
+        single script call.
+
+        @return list of ids of messages that still existed, or None if the call failed
+        """
+        for message_id in message_ids:
+            self.unregister(message_id)
+        return self.change_visibility(message_ids, vt)
+
+    def change_visibility(self, message_ids, vt):
+        """
+        Set visibility timeout of messages to `vt` seconds, with a single script call.
+
+        @return list of ids of messages that still existed, or None if the call failed
+        """
+        if not message_ids:
+            return []
+        command = self.rsmq.changeMessagesVisibility(
+            qname=self.qname, ids=list(message_ids), vt=vt
+        ).exceptions(True)
+        try:
+            return command.execute()
+        except QueueDoesNotExist:
+            return []
+        except (RedisError, RedisSMQException) as ex:
+            LOG.warning("Failed to change message visibility: %s", ex)
+            return None
+
+    def run(self):
+        """Run"""
+        while True:
+            due = self._next_due()
+            if due is None:
+                break
+            with self._extending:
+                self.extend(due)
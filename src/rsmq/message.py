@@ -0,0 +1,62 @@
+"""
+Received message
+"""
+
+from .cmd.utils import decode_message
+
+
+class Message:
+    """
+    Message passed to processors of consumers with `message_object` option.
+
+    Payload is decoded (if `decode` is set) on first access of `message`, and kept - so
+    processors that only use `id` or `raw` payload do not pay for decoding. Message can also
+    be read like the dicts returned by receive commands, i.e. `msg["message"]`.
+    """
+
+    __slots__ = ("id", "raw", "rc", "ts", "_decode", "_decoded", "_message")
+
+    KEYS = ("id", "message", "rc", "ts")
+
+    def __init__(self, message_id, raw, rc, ts, decode=True):
+        """
+        Initialize
+
+        @param message_id: message id
+        @param raw: message payload, as received
+        @param rc: receive count
+        @param ts: timestamp (in milliseconds) the message was sent at
+        @param decode: if true, payload is decoded by `rsmq.cmd.utils.decode_message()`
+        """
+        self.id = message_id  # pylint: disable=C0103
+        self.raw = raw
+        self.rc = rc  # pylint: disable=C0103
+        self.ts = ts  # pylint: disable=C0103
+        self._decode = decode
+        self._decoded = False
+        self._message = None
+
+    @classmethod
+    def from_dict(cls, msg, decode=True):
+        """Create from message returned by receive commands"""
+        return cls(msg["id"], msg["message"], msg["rc"], msg["ts"], decode=decode)
+
+    @property
+    def message(self):
+        """Message payload, decoded on first access"""
+        if not self._decoded:
+            self._message = decode_message(self.raw) if self._decode else self.raw
+            self._decoded = True
+        return self._message
+
+    def __getitem__(self, key):
+        """Get `id`, `message`, `rc` or `ts` by key"""
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self.KEYS
+
+    def __repr__(self):
+        return "Message(id=%r, rc=%r, ts=%r)" % (self.id, self.rc, self.ts)
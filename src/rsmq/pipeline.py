@@ -0,0 +1,226 @@
+"""
+Pipeline executing multiple commands together
+"""
+
+import logging
+
+from redis.exceptions import NoScriptError
+
+from .cmd.exceptions import RedisSMQException
+
+LOG = logging.getLogger(__name__)
+
+
+class RedisSMQPipeline:
+    """
+    Collects commands and executes them together, in as few round trips as possible, in the
+    order they were added:
+
+    * Commands that can not be pipelined (i.e. queue management) are executed one by one
+    * Each run of consecutive commands that can be pipelined is executed as a batch: queue
+      definitions needed by the commands are fetched once per queue, and then operations of
+      all the commands are executed in one transaction
+
+    Usage:
+
+        with rsmq.pipeline() as pipeline:
+            pipeline.add(rsmq.sendMessage(qname="queue-1", message="Hello"))
+            pipeline.add(rsmq.sendMessage(qname="queue-2", message="World"))
+            pipeline.add(rsmq.deleteMessage(qname="input", id=message_id))
+        message_id_1, message_id_2, deleted = pipeline.results
+
+    Each command honors its own `exceptions` setting: if exceptions are disabled, failed command
+    result is `False`. Otherwise, the first exception is raised once all commands were executed,
+    and the exception is also placed in `results`.
+    """
+
+    def __init__(self, rsmq):
+        """
+        Initialize
+
+        @param rsmq: RedisSMQ controller
+        """
+        self.rsmq = rsmq
+        self.commands = []
+        self.results = None
+        self._errors = []
+
+    def __len__(self):
+        """Number of commands waiting to be executed"""
+        return len(self.commands)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.execute()
+        return False
+
+    def add(self, command):
+        """
+        Add command to the pipeline
+
+        @return index of the command result in `results`
+        """
+        self.commands.append(command)
+        return len(self.commands) - 1
+
+    # pylint: disable=W0212
+
+    def _error(self, command, ex):
+        """Handle command exception according to command settings"""
+        if command._exceptions:
+            self._errors.append(ex)
+            return ex
+        return command._failed(ex)
+
+    def _execute_one(self, command):
+        """Execute command on its own"""
+        try:
+            return command.execute()
+        except RedisSMQException as ex:
+            return self._error(command, ex)
+
+    def _prepare(self):
+        """
+        Take commands to execute
+
+        @return (commands, list of batches). Each batch is either a list of indexes of ready
+        commands to pipeline, or index of a ready command to execute on its own
+        """
+        commands, self.commands = self.commands, []
+        self.results = [False] * len(commands)
+        self._errors = []
+        batches = []
+        for index, command in enumerate(commands):
+            if not command.ready():
+                continue
+            if not command.PIPELINED:
+                batches.append(index)
+            elif batches and isinstance(batches[-1], list):
+                batches[-1].append(index)
+            else:
+                batches.append([index])
+        return commands, batches
+
+    def _queue_def_request(self, tx, commands):
+        """
+        Add requests for definitions of all queues used by commands
+
+        @return dict of (command, first operation, last operation, state) by queue key
+        """
+        queues = {}
+        for command in commands:
+            if command.uses_queue_def and command.queue_key not in queues:
+                start = len(tx)
+                state = command._queue_def_request(tx)
+                queues[command.queue_key] = (command, start, len(tx), state)
+        return queues
+
+    def _queue_def_result(self, queues, results, queue_defs):
+        """
+        Set queue definitions (or QueueDoesNotExist exceptions) by queue key
+
+        @return commands whose cached queue definition was out of date, to request again
+        """
+        stale = []
+        for queue_key, (command, start, end, state) in queues.items():
+            try:
+                queue = command._queue_def_result(results[start:end], state)
+            except RedisSMQException as ex:
+                queue = ex
+            if queue is None:
+                stale.append(command)
+            else:
+                queue_defs[queue_key] = queue
+        return stale
+
+    def _request(self, tx, commands, indexes, queue_defs):
+        """
+        Add operations of commands to the transaction
+
+        @return list of (index, first operation, last operation, state) of each command
+        """
+        pending = []
+        for index in indexes:
+            command = commands[index]
+            queue = None
+            if command.uses_queue_def:
+                queue = queue_defs[command.queue_key]
+                if isinstance(queue, Exception):
+                    self.results[index] = self._error(command, queue)
+                    continue
+            start = len(tx)
+            try:
+                state = command.pipeline_request(tx, queue)
+            except RedisSMQException as ex:
+                self.results[index] = self._error(command, ex)
+                continue
+            pending.append((index, start, len(tx), state))
+        return pending
+
+    def _result(self, commands, pending, results):
+        """
+        Set results of pipelined commands
+
+        @return indexes of commands whose scripts were not loaded, to execute again
+        """
+        retry = []
+        for index, start, end, state in pending:
+            command = commands[index]
+            command_results = results[start:end]
+            errors = [r for r in command_results if isinstance(r, Exception)]
+            if any(isinstance(error, NoScriptError) for error in errors):
+                retry.append(index)
+            elif errors:
+                self.results[index] = self._error(command, errors[0])
+            else:
+                try:
+                    self.results[index] = command.pipeline_result(
+                        command_results, state
+                    )
+                except RedisSMQException as ex:
+                    self.results[index] = self._error(command, ex)
+        return retry
+
+    def _finish(self):
+        """Raise first error, if any, and return results"""
+        errors, self._errors = self._errors, []
+        if errors:
+            raise errors[0]
+        return self.results
+
+    def execute(self):
+        """
+        Execute all commands
+
+        @return list of results, in the order commands were added
+        """
+        commands, batches = self._prepare()
+        for batch in batches:
+            if isinstance(batch, list):
+                self._execute_batch(commands, batch)
+            else:
+                self.results[batch] = self._execute_one(commands[batch])
+        return self._finish()
+
+    def _execute_batch(self, commands, pipelined):
+        """Execute commands together, in at most two round trips"""
+        queue_defs = {}
+        stale = [commands[index] for index in pipelined]
+        while stale:
+            tx = self.rsmq.client.pipeline(transaction=False)
+            queues = self._queue_def_request(tx, stale)
+            if not queues:
+                break
+            results = tx.execute() if len(tx) else []
+            stale = self._queue_def_result(queues, results, queue_defs)
+
+        self.rsmq.scripts.load()
+        tx = self.rsmq.client.pipeline(transaction=True)
+        pending = self._request(tx, commands, pipelined, queue_defs)
+        results = tx.execute(raise_on_error=False) if len(tx) else []
+        for index in self._result(commands, pending, results):
+            LOG.info("Scripts are not loaded in Redis, executing command again")
+            self.results[index] = self._execute_one(commands[index])
@@ -0,0 +1,305 @@
+"""
+Python Redis Simple Queue Manager Consumer with a pool of workers
+"""
+
+import logging
+import multiprocessing
+import queue
+import time
+from collections import deque
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+from threading import Event, Thread
+
+from .cmd import utils
+from .consumer import RedisSMQConsumer
+from .message import Message
+
+LOG = logging.getLogger(__name__)
+
+
+def process_message(processor, decode, msg, message_object=False):
+    """Run processor for a message in a worker, returns True on success"""
+    if message_object:
+        return bool(processor(Message.from_dict(msg, decode)))
+    if decode and "message" in msg:
+        msg["message"] = utils.decode_message(msg["message"])
+    return bool(processor(**msg))
+
+
+class RedisSMQPoolConsumer(RedisSMQConsumer):
+    """
+    RSMQ Consumer Worker that processes messages concurrently in a pool of worker threads.
+
+    Messages are received in batches into a bounded local prefetch buffer and dispatched to
+    the pool. Processed messages are acknowledged (deleted) and failed ones returned to the
+    queue in pipelined batches. Visibility of all buffered and in-flight messages is kept
+    extended, but messages sitting in the buffer for longer than `max_prefetch_age` are
+    released back to the queue.
+    """
+
+    # local parameters and their value
+    LOCAL_PARAMS = dict(
+        RedisSMQConsumer.LOCAL_PARAMS,
+        workers=4,
+        batch_size=10,
+        prefetch=None,
+        max_prefetch_age=None,
+    )
+
+    def __init__(self, qname, processor, **rsmq_params):
+        """
+        initialize
+
+        Required Parameters:
+
+        @param qname: queue name
+        @param processor: processor for each item
+
+        Optional Parameters (in addition to ones of RedisSMQConsumer):
+        @param workers: number of workers processing messages concurrently
+        @param batch_size: max number of messages received in one call
+        @param prefetch: max number of messages waiting in local buffer (default: workers)
+        @param max_prefetch_age: max time, in seconds, message may wait in local buffer
+        before it is released back to queue (default: vt)
+
+        Remaining args are passed to RedisSMQ()
+
+        """
+        super(RedisSMQPoolConsumer, self).__init__(qname, processor, **rsmq_params)
+        self.executor = None
+        # (received at, message) waiting to be dispatched
+        self._buffer = deque()
+        # futures of messages being processed
+        self._running = set()
+        # futures of processed messages, waiting to be acknowledged
+        self._results = queue.SimpleQueue()
+        self._wakeup = Event()
+
+    @property
+    def workers(self):
+        """number of workers"""
+        return int(self._param("workers"))
+
+    @property
+    def batch_size(self):
+        """max number of messages received in one call"""
+        return int(self._param("batch_size"))
+
+    @property
+    def prefetch(self):
+        """max number of messages waiting in local buffer"""
+        prefetch = self._param("prefetch")
+        return self.workers if prefetch is None else int(prefetch)
+
+    @property
+    def max_prefetch_age(self):
+        """max time, in seconds, message may wait in local buffer"""
+        max_prefetch_age = self._param("max_prefetch_age")
+        return self.vt if max_prefetch_age is None else float(max_prefetch_age)
+
+    def stop(self, wait=None):
+        """Stop"""
+        self._request_stop = True
+        self._wakeup.set()
+        return super(RedisSMQPoolConsumer, self).stop(wait)
+
+    def create_executor(self):
+        """Create executor running the processor"""
+        return ThreadPoolExecutor(
+            max_workers=self.workers,
+            thread_name_prefix="RedisSMQWorker:%s" % self.qname,
+        )
+
+    def submit(self, msg):
+        """Submit message to be processed by the executor"""
+        return self.executor.submit(
+            process_message, self.processor, self.decode, msg, self.message_object
+        )
+
+    def restart_executor(self, executor=None):
+        """
+        Replace broken executor with a new one
+
+        @param executor: broken executor, if it is known. Nothing is done if it was already
+            replaced
+        """
+        if executor is not None and executor is not self.executor:
+            return
+        LOG.error("Worker pool for queue `%s` is broken, restarting it", self.qname)
+        self.executor.shutdown(wait=False)
+        self.executor = self.create_executor()
+
+    def _on_done(self, future):
+        """Callback when processing of a message is done"""
+        self._results.put(future)
+        self._wakeup.set()
+
+    def on_success_batch(self, msgs):
+        """Delete successfully processed messages, in one transaction"""
+        if not msgs:
+            return
+        for msg in msgs:
+            self.leases.unregister(msg["id"])
+        self.rsqm.deleteMessages(
+            qname=self.qname, ids=[msg["id"] for msg in msgs]
+        ).execute()
+        self.trace("Processed %s messages", len(msgs))
+
+    def on_failure_batch(self, msgs, vt=None):
+        """Return messages to the queue, visible after `vt` (default: retry_delay)"""
+        if not msgs:
+            return
+        if vt is None:
+            vt = self.retry_delay
+            for msg in msgs:
+                LOG.warning("Failed to process message %s", msg["id"])
+        self.leases.release([msg["id"] for msg in msgs], vt)
+
+    def _flush_results(self):
+        """Acknowledge processed messages"""
+        succeeded = []
+        failed = []
+        broken = None
+        while True:
+            try:
+                future = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._running.discard(future)
+            exception = None if future.cancelled() else future.exception()
+            if exception is not None:
+                LOG.warning(
+                    "Processor failed for message %s: %s", future.msg["id"], exception
+                )
+                if isinstance(exception, BrokenExecutor):
+                    broken = future.executor
+                failed.append(future.msg)
+            elif not future.cancelled() and future.result():
+                succeeded.append(future.msg)
+            else:
+                failed.append(future.msg)
+        self.on_success_batch(succeeded)
+        self.on_failure_batch(failed)
+        if broken is not None:
+            # failures of a broken executor may be flushed after it was replaced already
+            self.restart_executor(broken)
+
+    def _release_stale(self):
+        """Release messages that were waiting in the buffer for too long"""
+        stale_before = time.monotonic() - self.max_prefetch_age
+        stale = []
+        while self._buffer and self._buffer[0][0] < stale_before:
+            stale.append(self._buffer.popleft()[1])
+        if stale:
+            self.trace("Releasing %s stale prefetched messages", len(stale))
+            self.on_failure_batch(stale, vt=0)
+
+    def _dispatch(self):
+        """Submit buffered messages to idle workers"""
+        while self._buffer and len(self._running) < self.workers:
+            received, msg = self._buffer.popleft()
+            try:
+                future = self.submit(dict(msg))
+            except BrokenExecutor:
+                self._buffer.appendleft((received, msg))
+                self.restart_executor()
+                continue
+            future.msg = msg
+            future.executor = self.executor
+            self._running.add(future)
+            future.add_done_callback(self._on_done)
+
+    def _fetch(self):
+        """Receive a batch of messages into the buffer"""
+        count = min(self.batch_size, self.prefetch - len(self._buffer))
+        if count <= 0:
+            return False
+        msgs = self.rsqm.receiveMessages(qname=self.qname, count=count).execute()
+        received = time.monotonic()
+        for msg in msgs:
+            self.leases.register(msg["id"])
+            self._buffer.append((received, msg))
+        return True
+
+    def consume(self):
+        """Acknowledge processed messages, receive and dispatch new ones"""
+        self._wakeup.clear()
+        self._flush_results()
+        self._release_stale()
+        self._dispatch()
+        if not self._fetch():
+            # buffer is full and all workers are busy
+            self._wakeup.wait(min(1.0, self.max_prefetch_age / 2))
+        self._dispatch()
+
+    def wait_for_messages(self):
+        """Wait for new messages, or for processing of a message to complete"""
+        delay = self.empty_queue_delay
+        if self.notifications is not None and not self._running:
+            # nothing to acknowledge, so wait for new messages only
+            self.trace("No message in queue, waiting up to %s seconds", delay)
+            self.notifications.wait(delay)
+            return
+        self.trace("No message in queue, waiting %s seconds", delay)
+        if delay:
+            self._wakeup.wait(delay)
+
+    def shutdown(self):
+        """Release buffered messages and wait for in-flight ones to complete"""
+        self.on_failure_batch([msg for _received, msg in self._buffer], vt=0)
+        self._buffer.clear()
+        self.executor.shutdown(wait=True)
+        self._flush_results()
+        super(RedisSMQPoolConsumer, self).shutdown()
+
+    def run(self):
+        """main loop of the thread"""
+        self.executor = self.create_executor()
+        super(RedisSMQPoolConsumer, self).run()
+
+
+class RedisSMQProcessPoolConsumer(RedisSMQPoolConsumer):
+    """
+    Version of RedisSMQPoolConsumer that processes messages in a pool of worker processes,
+    for CPU bound processors.
+
+    All Redis I/O and visibility timeout extension stays in the parent process - workers only
+    receive the message and return success or failure, so the processor must be picklable
+    (i.e. a module level function). If a worker process dies, all messages in flight are
+    treated as failed and the pool is restarted.
+    """
+
+    # local parameters and their value
+    LOCAL_PARAMS = dict(RedisSMQPoolConsumer.LOCAL_PARAMS, mp_context=None)
+
+    @property
+    def mp_context(self):
+        """multiprocessing start method (i.e. `fork`, `spawn`, `forkserver`)"""
+        return self._param("mp_context")
+
+    def create_executor(self):
+        """Create executor running the processor"""
+        mp_context = self.mp_context
+        if mp_context is not None:
+            mp_context = multiprocessing.get_context(mp_context)
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=mp_context)
+
+
+class RedisSMQPoolConsumerThread(RedisSMQPoolConsumer, Thread):
+    """Version of a RedisSMQPoolConsumer implemented as a self-contained thread"""
+
+    def __init__(self, qname, processor, **rsmq_params):
+        """Constructor"""
+        RedisSMQPoolConsumer.__init__(self, qname, processor, **rsmq_params)
+        Thread.__init__(self, name="RedisSMQPoolConsumer:%s" % qname, daemon=True)
+
+
+class RedisSMQProcessPoolConsumerThread(RedisSMQProcessPoolConsumer, Thread):
+    """Version of a RedisSMQProcessPoolConsumer implemented as a self-contained thread"""
+
+    def __init__(self, qname, processor, **rsmq_params):
+        """Constructor"""
+        RedisSMQProcessPoolConsumer.__init__(self, qname, processor, **rsmq_params)
+        Thread.__init__(
+            self, name="RedisSMQProcessPoolConsumer:%s" % qname, daemon=True
+        )
@@ -0,0 +1,66 @@
+"""
+Prepared commands
+"""
+
+from .cmd.exceptions import InvalidParameterValue
+
+
+class PreparedSend:
+    """
+    Sends messages to a queue with `sendMessage()`, for loops sending many messages.
+
+    Parameters other than the message are validated and queue key names are resolved once,
+    when the sender is created by `RedisSMQ.prepare_send()`, so each call only validates and
+    sends the message:
+
+        send = rsmq.prepare_send(qname="jobs", delay=5)
+        for job in jobs:
+            send(job)
+
+    With `AsyncRedisSMQ`, calls return awaitables, like `execute()` of the commands.
+    """
+
+    __slots__ = ("queue_base", "queue_key", "_command")
+
+    def __init__(self, command, **kwargs):
+        """
+        Initialize
+
+        @param command: `sendMessage()` command with default parameters of the controller
+        @param kwargs: parameters of the command, other than `message`
+
+        @raise InvalidParameterValue if a parameter is not valid or `qname` is not set
+        """
+        # pylint: disable=W0212
+        kwargs.setdefault("qname", command.get_qname)
+        for name, value in kwargs.items():
+            if name == "message" or not command._set_param(name, value):
+                raise InvalidParameterValue(name, value)
+        self.queue_base = command.queue_base
+        self.queue_key = command.queue_key
+        self._command = command
+
+    def command(self, message, delay=None):
+        """
+        Get command sending the message, e.g. to add it to a pipeline
+
+        @param message: message to send
+        @param delay: if set, overrides `delay` of the sender
+        @raise InvalidParameterValue if message or delay is not valid
+        """
+        # pylint: disable=W0212
+        params = {"message": message}
+        if delay is not None:
+            params["delay"] = delay
+        for name, value in params.items():
+            if not self._command._validate_param(name, value):
+                raise InvalidParameterValue(name, value)
+        return self._command.prepared((self.queue_base, self.queue_key), **params)
+
+    def __call__(self, message, delay=None):
+        """
+        Send message
+
+        @return id of the sent message (see `sendMessage()`)
+        """
+        return self.command(message, delay).execute()
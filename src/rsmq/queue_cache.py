@@ -0,0 +1,127 @@
+"""
+Cache of queue definitions
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class QueueDefCache:
+    """
+    LRU cache of queue definitions (`vt`, `delay` and `maxsize` attributes), kept by
+    `RedisSMQ` when `queue_cache_ttl` option is set.
+
+    Cached definitions are used without reading the queue. Every `check_interval` seconds,
+    commands read the `modified` and `revision` attributes of the queue instead, and read the
+    whole definition again if they changed - so changes made by other clients are picked up
+    within `check_interval` seconds. Entries are also dropped when the queue is created,
+    deleted or changed through the same controller, and `ttl` seconds after they were read.
+
+    `revision` is incremented by `setQueueAttributes()`. Other RSMQ implementations only
+    update `modified`, which has a resolution of one second and is set from the clock of the
+    client making the change, so definitions of queues modified less than `MODIFIED_MARGIN`
+    seconds (of Redis server time) before they were read are not cached. Changes made by
+    other implementations from clients whose clock is off by more than that may be missed
+    until the entry expires.
+    """
+
+    MODIFIED_MARGIN = 2
+
+    def __init__(self, ttl=0, size=1000, check_interval=1):
+        """
+        Initialize
+
+        @param ttl: how long, in seconds, definitions are kept. Cache is disabled if not set
+        @param size: max number of cached definitions
+        @param check_interval: how often, in seconds, cached definitions are checked against
+            the queue `modified` and `revision` attributes
+        """
+        self.ttl = ttl
+        self.size = size
+        self.check_interval = check_interval
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.checks = 0
+
+    @property
+    def enabled(self):
+        """True if definitions are cached"""
+        return bool(self.ttl) and self.size > 0
+
+    def __len__(self):
+        """Number of cached definitions"""
+        return len(self._entries)
+
+    def get(self, queue_key):
+        """
+        Get cached definition of the queue
+
+        @return (definition, True if definition must be checked), or (None, False)
+        """
+        if not self.enabled:
+            return None, False
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(queue_key)
+            if entry is not None and entry["expires"] <= now:
+                del self._entries[queue_key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None, False
+            self._entries.move_to_end(queue_key)
+            self.hits += 1
+            check = entry["checked"] + self.check_interval <= now
+            if check:
+                self.checks += 1
+            return entry, check
+
+    def put(self, queue_key, definition, version, ts):
+        """
+        Cache definition of the queue
+
+        @param queue_key: key of the queue hash
+        @param definition: dict of queue attributes
+        @param version: values of `modified` and `revision` attributes
+        @param ts: Redis time (in milliseconds) the definition was read at
+        """
+        if not self.enabled or version[0] is None:
+            return
+        if int(version[0]) * 1000 > ts - self.MODIFIED_MARGIN * 1000:
+            return
+        now = time.monotonic()
+        entry = dict(
+            definition, version=list(version), checked=now, expires=now + self.ttl
+        )
+        with self._lock:
+            self._entries[queue_key] = entry
+            self._entries.move_to_end(queue_key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def checked(self, queue_key, entry, version):
+        """
+        Compare version of the queue with the cached definition
+
+        @return True if cached definition is up to date, otherwise it is dropped
+        """
+        if list(version) == entry["version"]:
+            entry["checked"] = time.monotonic()
+            return True
+        self.invalidate(queue_key)
+        return False
+
+    def invalidate(self, queue_key=None):
+        """Drop cached definition of the queue, or all definitions"""
+        with self._lock:
+            if queue_key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(queue_key, None)
+
+    def stats(self):
+        """Get counters of cache hits, misses and checks of cached definitions"""
+        return {"hits": self.hits, "misses": self.misses, "checks": self.checks}
@@ -0,0 +1,82 @@
+"""
+Realtime notifications about new messages
+"""
+
+import logging
+import time
+
+LOG = logging.getLogger(__name__)
+
+
+class RealtimeListener:
+    """
+    Waits for notifications about new messages in a queue, published by send commands when
+    `realtime` option is on.
+
+    Wait is also cut short when the next message in the queue (i.e. a delayed message, or one
+    whose visibility timeout expires) is due to become visible.
+    """
+
+    def __init__(self, rsmq, qname):
+        """
+        Initialize
+
+        @param rsmq: RedisSMQ controller
+        @param qname: queue name
+        """
+        self.rsmq = rsmq
+        command = rsmq.getQueueAttributes(qname=qname)
+        self.channel = command.realtime_channel
+        self.queue_base = command.queue_base
+        self.pubsub = None
+
+    def subscribe(self):
+        """Subscribe to the notification channel"""
+        self.pubsub = self.rsmq.client.pubsub(ignore_subscribe_messages=True)
+        self.pubsub.subscribe(self.channel)
+
+    def next_visible(self):
+        """Get time, in seconds, until the next message becomes visible, or None"""
+        tx = self.rsmq.client.pipeline(transaction=False)
+        tx.zrange(self.queue_base, 0, 0, withscores=True)
+        tx.time()
+        items, (seconds, microseconds) = tx.execute()
+        if not items:
+            return None
+        now = int(seconds) * 1000 + int(microseconds) // 1000
+        return max(0.0, (float(items[0][1]) - now) / 1000.0)
+
+    def wait(self, timeout):
+        """
+        Wait up to `timeout` seconds for new messages
+
+        @return True if notification was received
+        """
+        if self.pubsub is None:
+            # Notifications published before subscribing are lost, so the queue must be
+            # checked again before waiting
+            self.subscribe()
+            return False
+
+        next_visible = self.next_visible()
+        if next_visible is not None:
+            timeout = min(timeout, next_visible)
+
+        wait_until = time.monotonic() + timeout
+        notified = False
+        while not notified:
+            remaining = wait_until - time.monotonic()
+            if remaining <= 0:
+                break
+            notified = self.pubsub.get_message(timeout=remaining) is not None
+
+        # Drop queued notifications, they are all handled by the next receive
+        while self.pubsub.get_message(timeout=0) is not None:
+            pass
+        return notified
+
+    def close(self):
+        """Unsubscribe and release the connection"""
+        if self.pubsub is not None:
+            self.pubsub.close()
+            self.pubsub = None
@@ -20,11 +20,18 @@ class RetryDelayHandler:
         """ Reset delay """
         self.current_delay = self.min_delay
 
-    def delay(self):
-        """ Perform delay """
-        if self.current_delay:
-            LOG.debug("Retrying in %s seconds", self.current_delay)
-            time.sleep(self.current_delay)
-            self.current_delay = min(self.current_delay * 2, self.max_delay)
+    def next_delay(self):
+        """ Get delay to perform now and increase the following one """
+        delay = self.current_delay
+        if delay:
+            LOG.debug("Retrying in %s seconds", delay)
+            self.current_delay = min(delay * 2, self.max_delay)
         else:
             self.current_delay = 1.0
+        return delay
+
+    def delay(self):
+        """ Perform delay """
+        delay = self.next_delay()
+        if delay:
+            time.sleep(delay)
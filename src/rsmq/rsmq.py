@@ -2,19 +2,60 @@
 Python Redis Simple Queue Manager
 """
 
+import os
+import weakref
+
 from redis import Redis
 
-from . import const
-from .cmd import ChangeMessageVisibilityCommand
+from .clock import ClockSync
+from .codec import get_codec
+from .compression import Compression
+from .cmd import ChangeMessageVisibilityCommand, ChangeMessagesVisibilityCommand
 from .cmd import CreateQueueCommand, DeleteQueueCommand, ListQueuesCommand
-from .cmd import DeleteMessageCommand
+from .cmd import DeleteMessageCommand, DeleteMessagesCommand
 from .cmd import SendMessageCommand, ReceiveMessageCommand, PopMessageCommand
+from .cmd import SendMessagesCommand, ReceiveMessagesCommand, PopMessagesCommand
 from .cmd import SetQueueAttributesCommand, GetQueueAttributesCommand
+from .cmd import MigrateQueueCommand, RedriveMessagesCommand
+from .pipeline import RedisSMQPipeline
+from .prepared import PreparedSend
+from .queue_cache import QueueDefCache
+from .scripts import ScriptManager
 
 
 DEFAULT_REDIS_OPTIONS = {"encoding": "utf-8", "decode_responses": True}
 
-DEFAULT_OPTIONS = {"ns": "rsmq", "realtime": False, "exceptions": True}
+# Controllers that may hold a redis client created in the parent process
+_CONTROLLERS = weakref.WeakSet()
+
+
+def _reset_after_fork():
+    """Drop redis clients created by controllers before fork, in the child process"""
+    for controller in list(_CONTROLLERS):
+        controller._after_fork()  # pylint: disable=W0212
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+DEFAULT_OPTIONS = {
+    "ns": "rsmq",
+    "realtime": False,
+    "exceptions": True,
+    "single_rtt": False,
+    "queue_cache_ttl": 0,
+    "queue_cache_size": 1000,
+    "queue_cache_check": 1,
+    "clock_sync": False,
+    "clock_max_error": 0.01,
+    "clock_interval": 10,
+    "compression": None,
+    "compress_threshold": 1024,
+    "codec": None,
+    "queue_codecs": None,
+    "binary": False,
+}
 
 
 class RedisSMQ:
@@ -38,6 +79,29 @@ class RedisSMQ:
         @param ns: namespace
         @param realtime: if true, use realtime comms (pubsub)(default is False)
         @param exceptions: if true, throw exceptions on errors, else return False(default is True)
+        @param single_rtt: if true, send/receive/pop/changeMessageVisibility resolve queue
+            definition and time inside the Lua scripts, using one round trip (default is False)
+        @param queue_cache_ttl: if set, queue definitions are cached for up to this many
+            seconds (default is 0, no cache)
+        @param queue_cache_size: max number of cached queue definitions (default is 1000)
+        @param queue_cache_check: how often (in seconds) cached queue definitions are checked
+            for changes made by other clients (default is 1)
+        @param clock_sync: if true, estimate Redis server time locally instead of reading it
+            on every call (default is False)
+        @param clock_max_error: max error (in seconds) of server time estimate (default is 0.01)
+        @param clock_interval: how often (in seconds) server time is sampled again while
+            estimate is in use (default is 10)
+        @param compression: if set, name of compressor (`zlib`, `lzma` or one registered with
+            `rsmq.compression.register_compressor()`) used to compress sent messages
+            (default is None, no compression)
+        @param compress_threshold: min size (in bytes) of compressed messages (default is 1024)
+        @param codec: if set, name of codec (`json`, `text`, `bytes` or one registered with
+            `rsmq.codec.register_codec()`) sent messages are encoded with, tagged so receivers
+            decode them without trial parsing (default is None, legacy untagged encoding)
+        @param queue_codecs: dict of codec names by queue name, overriding `codec` option
+        @param binary: if true, received messages are returned as bytes, and binary codecs and
+            compression store payloads without base64 encoding. Redis client created by the
+            controller does not decode responses (default is False)
 
         Remaining params are automatically passed to commands
 
@@ -45,6 +109,9 @@ class RedisSMQ:
 
         # redis_client
         self._client = client
+        # True if client was created by this controller
+        self._own_client = False
+        _CONTROLLERS.add(self)
 
         # Redis Options
         self.redis_options = dict(DEFAULT_REDIS_OPTIONS)
@@ -68,46 +135,75 @@ class RedisSMQ:
         for param in to_remove:
             del kwargs[param]
 
+        # In binary mode, responses are decoded by commands, except for message payloads
+        if self.options["binary"]:
+            self.redis_options["decode_responses"] = False
+
         # Everything else is passed through to commands
         self._default_params = kwargs
 
-        self._popMessageSha1 = None
-        self._receiveMessageSha1 = None
-        self._changeMessageVisibilitySha1 = None
+        # Lua scripts, loaded once on first use
+        self.scripts = ScriptManager(self)
+
+        # Queue definitions used by send/receive commands
+        self.queue_cache = QueueDefCache(
+            ttl=self.options["queue_cache_ttl"],
+            size=self.options["queue_cache_size"],
+            check_interval=self.options["queue_cache_check"],
+        )
+
+        # Redis server time estimate
+        self.clock = ClockSync(
+            enabled=self.options["clock_sync"],
+            max_error=self.options["clock_max_error"],
+            interval=self.options["clock_interval"],
+        )
+
+        # Codecs of sent messages must be registered
+        if self.options["codec"] is not None:
+            get_codec(self.options["codec"])
+        for codec in (self.options["queue_codecs"] or {}).values():
+            get_codec(codec)
+
+        # Compression of sent messages
+        self.compression = Compression(
+            method=self.options["compression"],
+            threshold=self.options["compress_threshold"],
+            binary=self.options["binary"],
+        )
 
     @property
     def popMessageSha1(self):
         """Get Pop Message Script SHA1"""
-        if self._popMessageSha1 is None:
-            client = self.client
-            self._popMessageSha1 = client.script_load(const.SCRIPT_POPMESSAGE)
-        return self._popMessageSha1
+        return self.scripts.sha1("popMessage")
 
     @property
     def receiveMessageSha1(self):
         """Get Received Message Script SHA1"""
-        if self._receiveMessageSha1 is None:
-            client = self.client
-            self._receiveMessageSha1 = client.script_load(const.SCRIPT_RECEIVEMESSAGE)
-        return self._receiveMessageSha1
+        return self.scripts.sha1("receiveMessage")
 
     @property
     def changeMessageVisibilitySha1(self):
         """Get Change Message Visibilities Script SHA1"""
-        if self._changeMessageVisibilitySha1 is None:
-            client = self.client
-            self._changeMessageVisibilitySha1 = client.script_load(
-                const.SCRIPT_CHANGEMESSAGEVISIBILITY
-            )
-        return self._changeMessageVisibilitySha1
+        return self.scripts.sha1("changeMessageVisibility")
 
     @property
     def client(self):
         """get Redis client. Create one if one does not exist"""
         if not self._client:
             self._client = Redis(**self.redis_options)
+            self._own_client = True
         return self._client
 
+    def _after_fork(self):
+        """
+        Drop client created in the parent process, so child process creates its own
+        connections. Connection pools of provided clients reset themselves on fork
+        """
+        if self._own_client:
+            self._client = None
+            self._own_client = False
+
     def exceptions(self, enabled=True):
         """Set global exceptions flag"""
         self.options["exceptions"] = enabled == True
@@ -116,6 +212,7 @@ class RedisSMQ:
     def setClient(self, client):
         """Set Redis Client"""
         self._client = client
+        self._own_client = False
         return self
 
     def _command(self, command, **kwargs):
@@ -140,6 +237,10 @@ class RedisSMQ:
         """getQueueAttributesCommand()"""
         return self._command(GetQueueAttributesCommand, **kwargs)
 
+    def migrateQueue(self, **kwargs):
+        """Migrate Queue to compact storage layout"""
+        return self._command(MigrateQueueCommand, **kwargs)
+
     def listQueues(self, **kwargs):
         """List Queues"""
         return self._command(ListQueuesCommand, **kwargs)
@@ -148,28 +249,68 @@ class RedisSMQ:
         """ChangeMessageVisibilityCommand"""
         return self._command(ChangeMessageVisibilityCommand, **kwargs)
 
+    def changeMessagesVisibility(self, **kwargs):
+        """Change Messages Visibility (batch) Command"""
+        return self._command(ChangeMessagesVisibilityCommand, **kwargs)
+
     def sendMessage(self, **kwargs):
         """Send Message Command"""
         return self._command(SendMessageCommand, **kwargs)
 
+    def sendMessages(self, **kwargs):
+        """Send Messages (batch) Command"""
+        return self._command(SendMessagesCommand, **kwargs)
+
+    def prepare_send(self, **kwargs):
+        """
+        Prepared `sendMessage()`: callable sending a message, with all other parameters
+        validated once (see `rsmq.prepared.PreparedSend`)
+        """
+        return PreparedSend(self.sendMessage(), **kwargs)
+
     def receiveMessage(self, **kwargs):
         """Receive Message Command"""
         return self._command(ReceiveMessageCommand, **kwargs)
 
+    def receiveMessages(self, **kwargs):
+        """Receive Messages (batch) Command"""
+        return self._command(ReceiveMessagesCommand, **kwargs)
+
     def popMessage(self, **kwargs):
         """Pop Message Command"""
         return self._command(PopMessageCommand, **kwargs)
 
+    def popMessages(self, **kwargs):
+        """Pop Messages (batch) Command"""
+        return self._command(PopMessagesCommand, **kwargs)
+
+    def redriveMessages(self, **kwargs):
+        """Move messages from dead-letter queue back to a queue"""
+        return self._command(RedriveMessagesCommand, **kwargs)
+
     def deleteMessage(self, **kwargs):
         """Delete Message Command"""
         return self._command(DeleteMessageCommand, **kwargs)
 
+    def deleteMessages(self, **kwargs):
+        """Delete Messages (batch) Command"""
+        return self._command(DeleteMessagesCommand, **kwargs)
+
+    def pipeline(self):
+        """
+        Create pipeline executing multiple commands together:
+
+            with rsmq.pipeline() as pipeline:
+                pipeline.add(rsmq.sendMessage(qname="queue-1", message="Hello"))
+                pipeline.add(rsmq.deleteMessage(qname="input", id=message_id))
+            message_id, deleted = pipeline.results
+        """
+        return RedisSMQPipeline(self)
+
     def quit(self):
         """Quit - here for compatibility purposes"""
         self._client = None
 
     def reset_scripts(self):
         """ Reset scripts to forse re-load """
-        self._popMessageSha1 = None
-        self._receiveMessageSha1 = None
-        self._changeMessageVisibilitySha1 = None
\ No newline at end of file
+        self.scripts.reset()
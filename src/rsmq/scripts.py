@@ -0,0 +1,118 @@
+"""
+Lua script manager
+"""
+import logging
+from threading import Lock
+
+from redis.exceptions import NoScriptError
+
+from . import const
+
+LOG = logging.getLogger(__name__)
+
+# Lua scripts used by commands, by name
+SCRIPTS = {
+    "popMessage": const.SCRIPT_POPMESSAGE,
+    "receiveMessage": const.SCRIPT_RECEIVEMESSAGE,
+    "changeMessageVisibility": const.SCRIPT_CHANGEMESSAGEVISIBILITY,
+    "popMessages": const.SCRIPT_POPMESSAGES,
+    "receiveMessages": const.SCRIPT_RECEIVEMESSAGES,
+    "sendMessageRtt": const.SCRIPT_SENDMESSAGE_RTT,
+    "popMessageRtt": const.SCRIPT_POPMESSAGE_RTT,
+    "receiveMessageRtt": const.SCRIPT_RECEIVEMESSAGE_RTT,
+    "changeMessageVisibilityRtt": const.SCRIPT_CHANGEMESSAGEVISIBILITY_RTT,
+    "changeMessagesVisibility": const.SCRIPT_CHANGEMESSAGESVISIBILITY,
+    "popMessageCompact": const.SCRIPT_POPMESSAGE_COMPACT,
+    "receiveMessageCompact": const.SCRIPT_RECEIVEMESSAGE_COMPACT,
+    "popMessagesCompact": const.SCRIPT_POPMESSAGES_COMPACT,
+    "receiveMessagesCompact": const.SCRIPT_RECEIVEMESSAGES_COMPACT,
+    "migrateQueueCompact": const.SCRIPT_MIGRATEQUEUE_COMPACT,
+    "redriveMessages": const.SCRIPT_REDRIVEMESSAGES,
+}
+
+
+class ScriptManager:
+    """
+    Loads all Lua scripts once (thread-safely) and executes them by name.
+
+    Scripts are only re-loaded if Redis reports it no longer has them (i.e. after a restart
+    or SCRIPT FLUSH)
+    """
+
+    def __init__(self, rsmq, scripts=None):
+        """Initialize"""
+        self.rsmq = rsmq
+        self.scripts = dict(SCRIPTS if scripts is None else scripts)
+        self._sha1 = {}
+        self._lock = Lock()
+
+        # counters
+        self.loads = 0
+        self.reloads = 0
+        self.executions = 0
+
+    def load(self, force=False):
+        """
+        Load all scripts into Redis in one round trip, unless already loaded
+
+        @return dict of script SHA1s, by name
+        """
+        with self._lock:
+            if self._sha1 and not force:
+                return self._sha1
+            names = list(self.scripts)
+            tx = self.rsmq.client.pipeline(transaction=False)
+            for name in names:
+                tx.script_load(self.scripts[name])
+            self._sha1 = dict(zip(names, tx.execute()))
+            self.loads += len(names)
+            LOG.debug("Loaded %s scripts", len(names))
+            return self._sha1
+
+    def reset(self):
+        """Forget loaded scripts, forcing re-load on next use"""
+        with self._lock:
+            self._sha1 = {}
+
+    def sha1(self, name):
+        """Get SHA1 of a loaded script"""
+        sha1s = self._sha1 or self.load()
+        return sha1s[name]
+
+    def evalsha(self, name, *keys, client=None):
+        """
+        Execute script by name, passing all arguments as keys.
+
+        If Redis no longer has the script, scripts are re-loaded and execution is retried once
+        """
+        if client is None:
+            client = self.rsmq.client
+        sha1 = self.sha1(name)
+        with self._lock:
+            self.executions += 1
+        try:
+            return client.evalsha(sha1, len(keys), *keys)
+        except NoScriptError:
+            LOG.info("Script '%s' is not loaded in Redis, re-loading scripts", name)
+            with self._lock:
+                self.reloads += 1
+            self.load(force=True)
+            return client.evalsha(self.sha1(name), len(keys), *keys)
+
+    def request(self, tx, name, *keys):
+        """
+        Add script call by name, passing all arguments as keys, to a pipeline.
+
+        Scripts must already be loaded (see `load()`)
+        """
+        with self._lock:
+            self.executions += 1
+        tx.evalsha(self._sha1[name], len(keys), *keys)
+
+    def stats(self):
+        """Get counters of script loads vs executions"""
+        return {
+            "loads": self.loads,
+            "reloads": self.reloads,
+            "executions": self.executions,
+        }
@@ -0,0 +1,273 @@
+"""
+Unit Tests for asyncio RedisSMQ
+"""
+
+import asyncio
+import time
+import unittest
+
+import fakeredis
+
+from rsmq.aio import AsyncRedisSMQ, AsyncRedisSMQConsumer
+from rsmq.cmd import InvalidParameterValue, NoMessageInQueue, QueueDoesNotExist
+
+
+class AsyncRedisSMQUnitTests(unittest.IsolatedAsyncioTestCase):
+    """Unit Tests for AsyncRedisSMQ"""
+
+    async def asyncSetUp(self):
+        """Setup"""
+        self.client = fakeredis.FakeAsyncRedis(decode_responses=True)
+        await self.client.flushall()
+        self.queue = AsyncRedisSMQ(client=self.client, qname="test-queue-aio")
+
+    async def test_queue_lifecycle(self):
+        """Test creating, listing, updating and deleting queue"""
+        self.assertTrue(await self.queue.createQueue(vt=15).execute())
+        self.assertSetEqual({"test-queue-aio"}, await self.queue.listQueues().execute())
+        attributes = await self.queue.setQueueAttributes(delay=5).execute()
+        self.assertEqual(15, attributes["vt"])
+        self.assertEqual(5, attributes["delay"])
+        self.assertTrue(await self.queue.deleteQueue().execute())
+        with self.assertRaises(QueueDoesNotExist):
+            await self.queue.getQueueAttributes().execute()
+
+    async def test_send_messages_order(self):
+        """Test messages sent in a batch are received in the order they were provided"""
+        await self.queue.createQueue().execute()
+        messages = ["message-%s" % i for i in range(25)]
+        message_ids = await self.queue.sendMessages(
+            messages=messages, chunk_size=10
+        ).execute()
+        received = [(await self.queue.popMessage().execute()) for _ in range(25)]
+        self.assertListEqual(message_ids, [msg["id"] for msg in received])
+        self.assertListEqual(messages, [msg["message"] for msg in received])
+
+    async def test_messages(self):
+        """Test sending, receiving and deleting messages"""
+        await self.queue.createQueue().execute()
+        message_id = await self.queue.sendMessage(message={"a": 1}).execute()
+        await self.queue.sendMessages(messages=["b", "c", "d"]).execute()
+
+        msg = await self.queue.receiveMessage().execute()
+        self.assertEqual(message_id, msg["id"])
+        self.assertEqual('{"a": 1}', msg["message"])
+        self.assertTrue(
+            await self.queue.changeMessageVisibility(id=message_id, vt=0).execute()
+        )
+        self.assertEqual(4, len(await self.queue.receiveMessages(count=5).execute()))
+        self.assertTrue(await self.queue.deleteMessage(id=message_id).execute())
+
+        await self.queue.changeMessageVisibility(id=message_id, vt=0).exceptions(
+            False
+        ).execute()
+        await self.queue.sendMessage(message="e").execute()
+        self.assertEqual("e", (await self.queue.popMessage().execute())["message"])
+        with self.assertRaises(NoMessageInQueue):
+            await self.queue.popMessages().execute()
+
+        attributes = await self.queue.getQueueAttributes().execute()
+        self.assertEqual(5, attributes["totalsent"])
+        self.assertEqual(3, attributes["msgs"])
+
+        message_ids = await self.client.zrange("rsmq:test-queue-aio", 0, -1)
+        result = await self.queue.deleteMessages(ids=message_ids).execute()
+        self.assertListEqual([True] * 3, list(result.values()))
+
+    async def test_single_rtt(self):
+        """Test single round trip scripts"""
+        queue = AsyncRedisSMQ(
+            client=self.client, qname="test-queue-aio", single_rtt=True
+        )
+        await queue.createQueue().execute()
+        message_id = await queue.sendMessage(message="a").execute()
+        msg = await queue.receiveMessage().execute()
+        self.assertEqual(message_id, msg["id"])
+        self.assertTrue(
+            await queue.changeMessageVisibility(id=message_id, vt=0).execute()
+        )
+        self.assertEqual(2, (await queue.popMessage().execute())["rc"])
+
+    async def test_pipeline(self):
+        """Test executing multiple commands in a pipeline"""
+        await self.queue.createQueue().execute()
+        async with self.queue.pipeline() as pipeline:
+            pipeline.add(self.queue.createQueue(qname="test-queue-aio-2"))
+            pipeline.add(self.queue.sendMessage(message="a"))
+            pipeline.add(
+                self.queue.sendMessages(qname="test-queue-aio-2", messages=["b", "c"])
+            )
+        created, message_id, message_ids = pipeline.results
+        self.assertTrue(created)
+        self.assertEqual(2, len(message_ids))
+
+        pipeline = self.queue.pipeline()
+        pipeline.add(self.queue.receiveMessage())
+        pipeline.add(self.queue.popMessages(qname="test-queue-aio-2"))
+        received, popped = await pipeline.execute()
+        self.assertEqual(message_id, received["id"])
+        self.assertEqual(2, len(popped))
+
+    async def test_compact_layout(self):
+        """Test compact queues and migration"""
+        await self.queue.createQueue(vt=0).execute()
+        message_id = await self.queue.sendMessage(message="a").execute()
+        await self.queue.receiveMessage().execute()
+        self.assertEqual(1, await self.queue.migrateQueue().execute())
+        attributes = await self.queue.getQueueAttributes().execute()
+        self.assertEqual("compact", attributes["layout"])
+        msg = await self.queue.receiveMessage().execute()
+        self.assertEqual(("a", 2), (msg["message"], msg["rc"]))
+        self.assertEqual(
+            "\x1a2:%s:a" % msg["ts"],
+            await self.client.hget("rsmq:test-queue-aio:Q", message_id),
+        )
+        await self.queue.createQueue(qname="compact", layout="compact").execute()
+        attributes = await self.queue.getQueueAttributes(qname="compact").execute()
+        self.assertEqual("compact", attributes["layout"])
+        with self.assertRaises(QueueDoesNotExist):
+            await self.queue.migrateQueue(qname="unknown").execute()
+
+    async def test_dead_letter_queue(self):
+        """Test moving messages to a dead-letter queue and back"""
+        await self.queue.createQueue(qname="dead").execute()
+        with self.assertRaises(QueueDoesNotExist):
+            await self.queue.createQueue(dead_letter_queue="unknown").execute()
+        await self.queue.createQueue(
+            vt=0, max_receive_count=1, dead_letter_queue="dead"
+        ).execute()
+        message_id = await self.queue.sendMessage(message="a").execute()
+        await self.queue.receiveMessage().execute()
+        self.assertFalse(await self.queue.receiveMessage().exceptions(False).execute())
+        attributes = await self.queue.getQueueAttributes().execute()
+        self.assertEqual(1, attributes["totaldeadlettered"])
+        attributes = await self.queue.setQueueAttributes(max_receive_count=2).execute()
+        self.assertEqual(
+            (2, "dead"),
+            (attributes["max_receive_count"], attributes["dead_letter_queue"]),
+        )
+
+        redrive = self.queue.redriveMessages(qname="dead", target="test-queue-aio")
+        self.assertEqual(1, await redrive.execute())
+        msg = await self.queue.receiveMessage().execute()
+        self.assertEqual((message_id, 1), (msg["id"], msg["rc"]))
+
+    async def test_prepare_send(self):
+        """Test prepared sendMessage"""
+        await self.queue.createQueue().execute()
+        send = self.queue.prepare_send()
+        message_ids = [await send("a"), await send("b")]
+        received = await self.queue.popMessages(count=5).execute()
+        self.assertListEqual(message_ids, [msg["id"] for msg in received])
+
+    async def test_validation(self):
+        """Test parameter validation is shared with regular commands"""
+        self.assertFalse(
+            self.queue.sendMessage().exceptions(False).qname("bad:name").ready()
+        )
+        with self.assertRaises(InvalidParameterValue):
+            self.queue.receiveMessage().vt(-1)
+        self.assertFalse(
+            await self.queue.popMessage(qname="").exceptions(False).execute()
+        )
+
+    async def test_consumer(self):
+        """Test consumer processes messages concurrently, extending visibility"""
+        await self.queue.createQueue(vt=1).execute()
+        await self.queue.sendMessages(messages=[{"n": i} for i in range(30)]).execute()
+        processed = []
+
+        async def processor(id, message, rc, ts):  # pylint: disable=W0613,W0622
+            """Slow processor, failing first time it sees message 1"""
+            processed.append((message["n"], rc))
+            await asyncio.sleep(1.2 if message["n"] == 0 else 0.2)
+            if message["n"] == 2:
+                raise ValueError("Processor error")
+            return message["n"] != 1 or rc > 1
+
+        consumer = AsyncRedisSMQConsumer(
+            "test-queue-aio",
+            processor,
+            client=self.client,
+            empty_queue_delay=0.1,
+            concurrency=10,
+        )
+        start = time.time()
+        task = asyncio.ensure_future(consumer.run())
+        while len(processed) < 31 and time.time() - start < 5:
+            await asyncio.sleep(0.05)
+        # 30 messages of 0.2 seconds each are processed 10 at a time
+        self.assertLess(time.time() - start, 1.5)
+        self.assertTrue(await consumer.stop(5))
+        await task
+
+        # Message 0 was not received twice while being processed
+        self.assertIn((0, 1), processed)
+        self.assertNotIn((0, 2), processed)
+        self.assertIn((1, 2), processed)
+        attributes = await self.queue.getQueueAttributes().execute()
+        # Message 2 always fails
+        self.assertEqual(1, attributes["msgs"])
+        self.assertEqual(0, len(consumer.leases))
+
+    async def test_consumer_concurrency(self):
+        """Test consumer receives no more messages than it has idle slots"""
+        await self.queue.createQueue(vt=1).execute()
+        await self.queue.sendMessages(messages=[{"n": i} for i in range(5)]).execute()
+        processed = []
+
+        async def processor(id, message, rc, ts):  # pylint: disable=W0613,W0622
+            """Record message and number of invisible messages"""
+            attributes = await self.queue.getQueueAttributes().execute()
+            processed.append((message["n"], rc, attributes["hiddenmsgs"]))
+            await asyncio.sleep(0.1)
+            return True
+
+        consumer = AsyncRedisSMQConsumer(
+            "test-queue-aio",
+            processor,
+            client=self.client,
+            empty_queue_delay=0.1,
+            concurrency=1,
+        )
+        task = asyncio.ensure_future(consumer.run())
+        start = time.time()
+        while len(processed) < 5 and time.time() - start < 5:
+            await asyncio.sleep(0.05)
+        self.assertTrue(await consumer.stop(5))
+        await task
+
+        self.assertEqual([(n, 1, 1) for n in range(5)], sorted(processed))
+
+    async def test_realtime_consumer(self):
+        """Test realtime consumer is notified about new messages"""
+        processed = asyncio.Event()
+
+        async def processor(id, message, rc, ts):  # pylint: disable=W0613,W0622
+            """Record message was processed"""
+            processed.set()
+            return True
+
+        consumer = AsyncRedisSMQConsumer(
+            "test-queue-aio",
+            processor,
+            client=self.client,
+            empty_queue_delay=10,
+            realtime=True,
+        )
+        task = asyncio.ensure_future(consumer.run())
+        while consumer.notifications is None or consumer.notifications.pubsub is None:
+            await asyncio.sleep(0.05)
+
+        queue = AsyncRedisSMQ(client=self.client, qname="test-queue-aio", realtime=True)
+        start = time.time()
+        await queue.sendMessage(message="now").execute()
+        await asyncio.wait_for(processed.wait(), 1)
+        self.assertLess(time.time() - start, 0.5)
+        await consumer.stop()
+        await queue.sendMessage(message="wakeup").execute()
+        await asyncio.wait_for(task, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+"""
+Unit Tests for binary mode
+"""
+
+import unittest
+
+import fakeredis
+
+from rsmq.cmd import utils
+from rsmq.compression import Compression, decompress
+from rsmq.consumer import RedisSMQConsumer
+from rsmq.rsmq import RedisSMQ
+
+PAYLOAD = bytes(range(256))
+
+
+class BinaryModeTests(unittest.TestCase):
+    """Payloads are returned as bytes, everything else is decoded"""
+
+    def setUp(self):
+        """Setup"""
+        self.client = fakeredis.FakeStrictRedis()
+        self.client.flushall()
+        self.queue = RedisSMQ(
+            client=self.client, qname="test-queue-binary", binary=True
+        )
+        self.queue.createQueue(vt=0).execute()
+
+    def test_redis_options(self):
+        """Client created by the controller does not decode responses"""
+        self.assertFalse(self.queue.redis_options["decode_responses"])
+        self.assertTrue(RedisSMQ().redis_options["decode_responses"])
+
+    def test_send_receive(self):
+        """Binary payloads are received as is"""
+        message_id = self.queue.sendMessage(message=PAYLOAD).execute()
+        self.queue.sendMessages(messages=[PAYLOAD, "text"]).execute()
+        self.assertIsInstance(message_id, str)
+
+        message = self.queue.receiveMessage().execute()
+        self.assertEqual(message_id, message["id"])
+        self.assertEqual(PAYLOAD, message["message"])
+        self.assertEqual(1, message["rc"])
+
+        messages = self.queue.popMessages(count=3).execute()
+        self.assertEqual(
+            [PAYLOAD, PAYLOAD, b"text"], sorted(m["message"] for m in messages)
+        )
+        for message in messages:
+            self.assertIsInstance(message["id"], str)
+
+        self.assertEqual({"test-queue-binary"}, self.queue.listQueues().execute())
+        attributes = self.queue.getQueueAttributes().execute()
+        self.assertEqual(3, attributes["totalsent"])
+        self.assertEqual(0.0, attributes["vt"])
+
+    def test_single_rtt(self):
+        """Single round trip scripts decode message ids"""
+        self.queue.options["single_rtt"] = True
+        message_id = self.queue.sendMessage(message=PAYLOAD).execute()
+        self.assertIsInstance(message_id, str)
+        message = self.queue.popMessage().execute()
+        self.assertEqual((message_id, PAYLOAD), (message["id"], message["message"]))
+
+    def test_pipeline(self):
+        """Pipelined commands decode message ids"""
+        self.queue.sendMessage(message=PAYLOAD).execute()
+        pipeline = self.queue.pipeline()
+        pipeline.add(self.queue.receiveMessage())
+        pipeline.add(self.queue.sendMessage(message=b"b"))
+        message, message_id = pipeline.execute()
+        self.assertIsInstance(message["id"], str)
+        self.assertEqual(PAYLOAD, message["message"])
+        self.assertEqual(
+            {message["id"]: True, message_id: True},
+            self.queue.deleteMessages(ids=[message["id"], message_id]).execute(),
+        )
+
+    def test_compression(self):
+        """Compressed payloads are stored without base64 encoding"""
+        queue = RedisSMQ(
+            client=self.client,
+            qname="test-queue-binary",
+            binary=True,
+            compression="zlib",
+            compress_threshold=100,
+        )
+        message_id = queue.sendMessage(message=PAYLOAD * 10).execute()
+        stored = self.client.hget("rsmq:test-queue-binary:Q", message_id)
+        self.assertTrue(stored.startswith(b"\x1dz"))
+        self.assertEqual(PAYLOAD * 10, decompress(stored))
+        self.assertEqual(PAYLOAD * 10, queue.popMessage().execute()["message"])
+
+        # messages compressed in text mode are decompressed to bytes
+        compressed = Compression("zlib", threshold=0).compress("a" * 1000)
+        self.assertEqual(b"a" * 1000, decompress(compressed.encode("utf-8")))
+
+    def test_codecs(self):
+        """Binary codecs store payloads as is, other codecs as text"""
+        self.queue.sendMessage(message=PAYLOAD, codec="bytes").execute()
+        self.queue.sendMessage(message={"a": 1}, codec="json").execute()
+        self.queue.sendMessage(message=b'{"a": 1}').execute()
+        stored = [m["message"] for m in self.queue.popMessages(count=3).execute()]
+        self.assertEqual(b"\x1cb" + PAYLOAD, stored[0])
+        self.assertEqual(b'\x1ej{"a": 1}', stored[1])
+        self.assertEqual(
+            [PAYLOAD, {"a": 1}, b'{"a": 1}'], [utils.decode_message(m) for m in stored]
+        )
+
+    def test_consumer(self):
+        """Consumer passes binary payloads to the processor"""
+        self.queue.sendMessage(message=PAYLOAD).execute()
+        received = []
+
+        def processor(id, message, rc, ts):  # pylint: disable=C0103,W0622,W0613
+            received.append((id, message))
+            consumer.stop()
+            return True
+
+        consumer = RedisSMQConsumer(
+            "test-queue-binary", processor, client=self.client, binary=True
+        )
+        consumer.run()
+        self.assertEqual(PAYLOAD, received[0][1])
+        self.assertIsInstance(received[0][0], str)
+        self.assertEqual(0, self.queue.getQueueAttributes().execute()["msgs"])
+
+    def test_consumer_lease(self):
+        """Consumer keeps lease of the message it processes when it is extended"""
+        message_id = self.queue.sendMessage(message=PAYLOAD).execute()
+        self.assertEqual(
+            [message_id],
+            self.queue.changeMessagesVisibility(ids=[message_id], vt=0).execute(),
+        )
+        leased = []
+
+        def processor(id, message, rc, ts):  # pylint: disable=C0103,W0622,W0613
+            consumer.leases.extend([id])
+            leased.append(id in consumer.leases)
+            consumer.stop()
+            return True
+
+        consumer = RedisSMQConsumer(
+            "test-queue-binary", processor, client=self.client, binary=True, vt=30
+        )
+        consumer.run()
+        self.assertEqual([True], leased)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+"""
+Unit Tests for Redis server time estimation
+"""
+
+import unittest
+from unittest import mock
+
+import fakeredis
+
+from rsmq.clock import ClockSync
+from rsmq.rsmq import RedisSMQ
+
+
+class ClockSyncUnitTests(unittest.TestCase):
+    """Unit Tests for ClockSync"""
+
+    def setUp(self):
+        """Setup"""
+        self.now = 100.0
+        patcher = mock.patch("time.monotonic", side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.clock = ClockSync(enabled=True, max_error=0.01, interval=10)
+
+    def test_disabled(self):
+        """Estimate is never available when disabled"""
+        clock = ClockSync()
+        self.assertEqual(1000000001, clock.sample(1000, 1, 99.999, 100.001))
+        self.assertIsNone(clock.time_usec())
+
+    def test_midpoint(self):
+        """Sample is taken at the midpoint of the round trip"""
+        self.assertIsNone(self.clock.time_usec())
+        self.clock.sample(1000, 500000, 99.998, 100.002)
+        self.assertEqual(1000500000, self.clock.time_usec())
+        self.now = 101.5
+        self.assertEqual(1002000000, self.clock.time_usec())
+        self.assertAlmostEqual(0.002 + 1.5 * ClockSync.MAX_DRIFT, self.clock.error())
+
+    def test_stale(self):
+        """Estimate is stale after `interval` seconds, or once error is too large"""
+        self.clock.sample(1000, 0, 99.99, 100.01)
+        # error is at max_error already, so any drift makes it stale
+        self.now = 100.5
+        self.assertIsNone(self.clock.time_usec())
+
+        self.clock.sample(1000, 0, 99.999, 100.001)
+        self.assertIsNotNone(self.clock.time_usec())
+        self.now = 110.5
+        self.assertIsNone(self.clock.time_usec())
+
+    def test_imprecise_sample_ignored(self):
+        """Samples with round trip longer than twice the max error are ignored"""
+        self.assertEqual(1000000000, self.clock.sample(1000, 0, 99.9, 100.1))
+        self.assertIsNone(self.clock.time_usec())
+
+    def test_precise_sample_kept(self):
+        """More precise previous sample is kept while it is not stale"""
+        self.clock.sample(1000, 0, 99.9999, 100.0001)
+        self.now = 101.0
+        self.clock.sample(1001, 5000, 100.995, 101.005)
+        self.assertEqual(1001000000, self.clock.time_usec())
+        self.now = 111.0
+        self.clock.sample(1011, 5000, 110.995, 111.005)
+        self.assertEqual(1011005000, self.clock.time_usec())
+
+    def test_drift(self):
+        """Drift is estimated from samples far enough apart"""
+        self.clock.sample(1000, 0, 99.9999, 100.0001)
+        self.assertEqual(0.0, self.clock.stats()["drift"])
+        # server clock runs faster by 50 ppm
+        self.now = 120.0
+        self.clock.sample(1020, 1000, 119.9999, 120.0001)
+        self.assertAlmostEqual(0.00005, self.clock.stats()["drift"])
+        self.now = 128.0
+        self.assertEqual(1028001400, self.clock.time_usec())
+
+    def test_clock_jump(self):
+        """Drift beyond DRIFT_LIMIT is treated as a clock jump and ignored"""
+        self.clock.sample(1000, 0, 99.9999, 100.0001)
+        self.now = 120.0
+        self.clock.sample(1021, 0, 119.9999, 120.0001)
+        self.assertEqual(0.0, self.clock.stats()["drift"])
+        self.assertEqual(1021000000, self.clock.time_usec())
+
+
+class ClockSyncCommandTests(unittest.TestCase):
+    """Commands use the server time estimate"""
+
+    def setUp(self):
+        """Setup"""
+        self.client = fakeredis.FakeStrictRedis(decode_responses=True)
+        self.client.flushall()
+        self.queue = RedisSMQ(
+            client=self.client, qname="test-queue-clock", clock_sync=True
+        )
+        self.queue.createQueue(vt=0).execute()
+
+    def test_time_sampled_once(self):
+        """Server time is read once and estimated afterwards"""
+        message_id = self.queue.sendMessage(message="a").execute()
+        self.assertEqual("a", self.queue.receiveMessage().execute()["message"])
+        self.assertEqual(1, self.queue.getQueueAttributes().execute()["totalsent"])
+        self.assertEqual(1, self.queue.clock.stats()["samples"])
+        self.assertEqual(2, self.queue.clock.stats()["estimates"])
+
+        # estimate matches server time
+        seconds, microseconds = self.client.time()
+        sent = int(message_id[:10], 36)
+        self.assertLess(abs(seconds * 1000000 + microseconds - sent), 2000000)
+
+    def test_time_sampled_when_stale(self):
+        """Server time is read again once the estimate is stale"""
+        self.queue.sendMessage(message="a").execute()
+        self.queue.clock.reset()
+        self.queue.sendMessage(message="b").execute()
+        self.assertEqual(2, self.queue.clock.stats()["samples"])
+
+    def test_pipeline(self):
+        """Pipeline uses the estimate for queue definitions"""
+        self.queue.sendMessage(message="a").execute()
+        pipeline = self.queue.pipeline()
+        pipeline.add(self.queue.sendMessage(message="b"))
+        pipeline.add(self.queue.sendMessages(messages=["c", "d"]))
+        pipeline.add(self.queue.receiveMessage())
+        results = pipeline.execute()
+        self.assertEqual("a", results[2]["message"])
+        self.assertEqual(1, self.queue.clock.stats()["samples"])
+
+
+if __name__ == "__main__":
+    unittest.main()
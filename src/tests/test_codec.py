@@ -0,0 +1,141 @@
+"""
+Unit Tests for message codecs
+"""
+
+import json
+import unittest
+from unittest import mock
+
+import fakeredis
+
+from rsmq import codec
+from rsmq.cmd import InvalidParameterValue, utils
+from rsmq.rsmq import RedisSMQ
+
+
+class CodecUnitTests(unittest.TestCase):
+    """Unit Tests for codecs"""
+
+    def test_round_trip(self):
+        """Messages decode to what was encoded"""
+        tests = [
+            ("json", {"a": [1, 2]}, {"a": [1, 2]}),
+            ("json", "1", "1"),
+            ("text", "1", "1"),
+            ("text", b"abc", "abc"),
+            ("bytes", b"\x00\xff", b"\x00\xff"),
+            ("bytes", "abc", b"abc"),
+        ]
+        for name, message, expected in tests:
+            encoded = utils.encode_message(message, codec=name)
+            self.assertIsInstance(encoded, str)
+            self.assertEqual(codec.MARK + codec.get_codec(name).tag, encoded[:2])
+            self.assertEqual(expected, utils.decode_message(encoded))
+
+    def test_no_trial_parsing(self):
+        """Plain text is not parsed as JSON"""
+        with mock.patch("json.loads") as loads:
+            self.assertEqual(
+                "1", utils.decode_message(utils.encode_message("1", codec="text"))
+            )
+            self.assertEqual("hello", utils.decode_message("hello"))
+            loads.assert_not_called()
+        # legacy JSON messages are still decoded
+        self.assertEqual({"a": 1}, utils.decode_message(' {"a": 1}'))
+        self.assertEqual(1, utils.decode_message("1"))
+        self.assertEqual("[a", utils.decode_message("[a"))
+        # messages starting with the marks, but not encoded
+        for message in (codec.MARK + "j{", codec.MARK + "b!", b"\x1ej{", b"\x1et\xff"):
+            self.assertEqual(message, utils.decode_message(message))
+
+    def test_pickle_opt_in(self):
+        """Pickle codec must be enabled explicitly"""
+        self.assertNotIn("pickle", codec.CODECS)
+        encoded = codec.MARK + "pgARLg=="
+        self.assertEqual(encoded, utils.decode_message(encoded))
+        codec.enable_pickle()
+        self.addCleanup(codec.CODECS.pop, "pickle")
+        self.addCleanup(codec._TAGS.pop, "p")  # pylint: disable=W0212
+        message = {"a": {1, 2}}
+        encoded = utils.encode_message(message, codec="pickle")
+        self.assertEqual(message, utils.decode_message(encoded))
+
+    def test_register(self):
+        """Codecs can be registered"""
+        upper = codec.register_codec("upper", "u", str.upper, str.lower)
+        self.addCleanup(codec.CODECS.pop, "upper")
+        self.addCleanup(codec._TAGS.pop, "u")  # pylint: disable=W0212
+        self.assertIs(upper, codec.get_codec("upper"))
+        self.assertEqual(
+            codec.MARK + "uABC", utils.encode_message("abc", codec="upper")
+        )
+        with self.assertRaises(ValueError):
+            codec.register_codec("other", "j", str, str)
+        with self.assertRaises(ValueError):
+            codec.get_codec("unknown")
+
+    def test_compressed(self):
+        """Encoded messages can be compressed"""
+        compression = mock.Mock(compress=lambda msg: msg.upper())
+        encoded = utils.encode_message("abc", compression=compression, codec="text")
+        self.assertEqual(codec.MARK + "TABC", encoded)
+
+
+class CodecCommandTests(unittest.TestCase):
+    """Send commands encode messages with codecs"""
+
+    def setUp(self):
+        """Setup"""
+        self.client = fakeredis.FakeStrictRedis(decode_responses=True)
+        self.client.flushall()
+
+    def _receive(self, queue, qname):
+        """Receive all messages of the queue, as stored and decoded"""
+        messages = queue.popMessages(qname=qname, count=10).execute()
+        return [message["message"] for message in messages]
+
+    def test_codec_options(self):
+        """Codec is set by controller, per queue and per command"""
+        queue = RedisSMQ(
+            client=self.client, codec="text", queue_codecs={"q-json": "json"}
+        )
+        for qname in ("q-text", "q-json"):
+            queue.createQueue(qname=qname).execute()
+            queue.sendMessage(qname=qname, message="1").execute()
+            queue.sendMessages(qname=qname, messages=["2"]).execute()
+            queue.sendMessage(qname=qname, message=b"3", codec="bytes").execute()
+
+        stored = self._receive(queue, "q-text")
+        self.assertEqual([codec.MARK + "t1", codec.MARK + "t2"], stored[:2])
+        self.assertEqual(["1", "2", b"3"], [utils.decode_message(m) for m in stored])
+
+        stored = self._receive(queue, "q-json")
+        self.assertEqual(codec.MARK + 'j"1"', stored[0])
+        self.assertEqual(["1", "2", b"3"], [utils.decode_message(m) for m in stored])
+
+        with self.assertRaises(ValueError):
+            RedisSMQ(client=self.client, codec="unknown")
+
+    def test_chained_codec(self):
+        """Codec is set with chained parameter setters"""
+        queue = RedisSMQ(client=self.client, qname="q-chained")
+        queue.createQueue().execute()
+        queue.sendMessage().message("1").codec("text").execute()
+        queue.sendMessages().messages(["2"]).codec("json").execute()
+        stored = self._receive(queue, "q-chained")
+        self.assertEqual([codec.MARK + "t1", codec.MARK + 'j"2"'], stored)
+        with self.assertRaises(InvalidParameterValue):
+            queue.sendMessage().codec("unknown")
+
+    def test_legacy(self):
+        """Without codec, messages are sent as before"""
+        queue = RedisSMQ(client=self.client, qname="q-legacy")
+        queue.createQueue().execute()
+        queue.sendMessage(message={"a": 1}).execute()
+        queue.sendMessage(message="b").execute()
+        stored = self._receive(queue, "q-legacy")
+        self.assertEqual([json.dumps({"a": 1}), "b"], stored)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+"""
+Unit Tests for compression of messages
+"""
+
+import json
+import unittest
+import zlib
+
+import fakeredis
+
+from rsmq.cmd import MessageTooLong
+from rsmq.cmd import utils
+from rsmq.compression import COMPRESSORS, Compression, MARK
+from rsmq.compression import decompress, register_compressor
+from rsmq.consumer import RedisSMQConsumer
+from rsmq.rsmq import RedisSMQ
+
+DOCUMENT = {"items": [{"id": i, "name": "item %s" % i} for i in range(100)]}
+
+
+class CompressionUnitTests(unittest.TestCase):
+    """Unit Tests for Compression"""
+
+    def test_disabled(self):
+        """Messages are left as is when disabled"""
+        message = "a" * 2000
+        self.assertIs(message, Compression().compress(message))
+
+    def test_threshold(self):
+        """Only messages of at least `threshold` bytes are compressed"""
+        compression = Compression("zlib", threshold=100)
+        self.assertEqual("a" * 99, compression.compress("a" * 99))
+        # 50 characters, 100 bytes
+        compressed = compression.compress("é" * 50)
+        self.assertTrue(compressed.startswith(MARK + "z"))
+        self.assertEqual("é" * 50, decompress(compressed))
+
+    def test_round_trip(self):
+        """Compressed messages are decompressed by every registered method"""
+        message = json.dumps(DOCUMENT)
+        for method in COMPRESSORS:
+            compression = Compression(method, threshold=0)
+            compressed = compression.compress(message)
+            self.assertLess(len(compressed), len(message))
+            self.assertEqual(message, decompress(compressed))
+            self.assertEqual(DOCUMENT, utils.decode_message(decompress(compressed)))
+            compressed = compression.compress(message.encode("utf-8"))
+            self.assertEqual(message, decompress(compressed))
+
+    def test_incompressible(self):
+        """Messages compression does not make shorter are sent as is"""
+        compression = Compression("zlib", threshold=0)
+        self.assertEqual("ab", compression.compress("ab"))
+        stats = compression.stats()
+        self.assertEqual(0, stats["messages"])
+        self.assertEqual(1, stats["skipped"])
+        self.assertEqual(1.0, stats["ratio"])
+
+    def test_stats(self):
+        """Compression ratio is counted"""
+        compression = Compression("zlib", threshold=0)
+        self.assertIsNone(compression.stats()["ratio"])
+        compressed = compression.compress("a" * 1000)
+        stats = compression.stats()
+        self.assertEqual(1, stats["messages"])
+        self.assertEqual(1000, stats["bytes_in"])
+        self.assertEqual(len(compressed), stats["bytes_out"])
+        self.assertEqual(1000 / len(compressed), stats["ratio"])
+
+    def test_legacy(self):
+        """Uncompressed messages are returned as is"""
+        for message in ("", "a", '{"a": 1}', MARK + "?abc", b"a"):
+            self.assertEqual(message, decompress(message))
+        # messages starting with the marks, but not compressed
+        for message in (MARK + "zabc", MARK + "z" + "eJw=", b"\x1dzabc", b"\x1fz!"):
+            self.assertEqual(message, decompress(message))
+
+    def test_register(self):
+        """Compressors can be registered"""
+        register_compressor("test-zlib", "t", zlib.compress, zlib.decompress)
+        compressed = Compression("test-zlib", threshold=0).compress("a" * 100)
+        self.assertTrue(compressed.startswith(MARK + "t"))
+        self.assertEqual("a" * 100, decompress(compressed))
+        with self.assertRaises(ValueError):
+            register_compressor("other", "z", zlib.compress, zlib.decompress)
+        with self.assertRaises(ValueError):
+            Compression("unknown")
+
+
+class CompressionCommandTests(unittest.TestCase):
+    """Commands compress sent and decompress received messages"""
+
+    def setUp(self):
+        """Setup"""
+        self.client = fakeredis.FakeStrictRedis(decode_responses=True)
+        self.client.flushall()
+        self.queue = RedisSMQ(
+            client=self.client,
+            qname="test-queue-compression",
+            compression="zlib",
+            compress_threshold=100,
+        )
+        self.queue.createQueue(vt=0).execute()
+
+    def test_send_receive(self):
+        """Messages are compressed in Redis and returned decompressed"""
+        message_id = self.queue.sendMessage(message=DOCUMENT).execute()
+        self.queue.sendMessages(messages=[DOCUMENT, "short"]).execute()
+        stored = self.client.hget("rsmq:test-queue-compression:Q", message_id)
+        self.assertTrue(stored.startswith(MARK + "z"))
+
+        message = self.queue.receiveMessage().execute()
+        self.assertEqual(DOCUMENT, json.loads(message["message"]))
+        messages = self.queue.popMessages(count=2).execute()
+        self.assertEqual(
+            [DOCUMENT, "short"], [utils.decode_message(m["message"]) for m in messages]
+        )
+        self.assertEqual(2, self.queue.compression.stats()["messages"])
+
+    def test_legacy_marks(self):
+        """Messages starting with the marks, but not compressed or encoded, are returned as is"""
+        messages = ["\x1fzabc", "\x1ejnot json", "\x1eb!", "\x1f\x1ejabc"]
+        queue = RedisSMQ(client=self.client, qname="test-queue-compression")
+        queue.sendMessages(messages=messages).execute()
+        received = [m["message"] for m in self.queue.popMessages(count=5).execute()]
+        self.assertEqual(messages, received)
+        self.assertEqual(messages, [utils.decode_message(m) for m in received])
+
+    def test_single_rtt(self):
+        """Single round trip scripts return decompressed messages"""
+        self.queue.options["single_rtt"] = True
+        self.queue.sendMessage(message=DOCUMENT).execute()
+        message = self.queue.popMessage().execute()
+        self.assertEqual(DOCUMENT, json.loads(message["message"]))
+
+    def test_uncompressed_receiver(self):
+        """Controller without compression reads compressed messages"""
+        self.queue.sendMessage(message=DOCUMENT).execute()
+        queue = RedisSMQ(client=self.client, qname="test-queue-compression")
+        message = queue.receiveMessage().execute()
+        self.assertEqual(DOCUMENT, json.loads(message["message"]))
+
+    def test_consumer(self):
+        """Consumer decodes compressed messages"""
+        self.queue.sendMessage(message=DOCUMENT).execute()
+        received = []
+
+        def processor(id, message, rc, ts):  # pylint: disable=C0103,W0622,W0613
+            received.append(message)
+            consumer.stop()
+            return True
+
+        consumer = RedisSMQConsumer(
+            "test-queue-compression", processor, client=self.client
+        )
+        consumer.run()
+        self.assertEqual([DOCUMENT], received)
+
+    def test_maxsize(self):
+        """maxsize applies to compressed size"""
+        self.queue.setQueueAttributes(maxsize=1024).execute()
+        self.assertTrue(self.queue.sendMessage(message="a" * 10000).execute())
+        with self.assertRaises(MessageTooLong):
+            self.queue.sendMessage(message=utils.random_string(2000)).execute()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,238 @@
+"""
+Unit Tests for RedisSMQConsumer
+"""
+
+import os
+import time
+import unittest
+from unittest import mock
+
+import fakeredis
+
+from rsmq.cmd.utils import decode_message
+from rsmq.consumer import RedisSMQConsumerThread
+from rsmq.message import Message
+from rsmq.pool_consumer import RedisSMQPoolConsumer
+from rsmq.pool_consumer import RedisSMQPoolConsumerThread
+from rsmq.pool_consumer import RedisSMQProcessPoolConsumerThread
+from rsmq.rsmq import RedisSMQ, _reset_after_fork
+
+
+def crashing_processor(id, message, rc, ts):  # pylint: disable=W0613,W0622
+    """Processor running in worker process, crashing the worker first time it sees message 2"""
+    if message["n"] == 2 and rc == 1:
+        os._exit(1)  # pylint: disable=W0212
+    return message["pid"] != os.getpid()
+
+
+class MessageUnitTests(unittest.TestCase):
+    """Unit Tests for Message"""
+
+    def test_lazy_decode(self):
+        """Payload is decoded once, on first access"""
+        msg = Message.from_dict({"id": "a", "message": '{"a": 1}', "rc": 1, "ts": 2})
+        with mock.patch(
+            "rsmq.message.decode_message", side_effect=decode_message
+        ) as decode:
+            self.assertEqual(("a", '{"a": 1}', 1, 2), (msg.id, msg.raw, msg.rc, msg.ts))
+            decode.assert_not_called()
+            self.assertEqual({"a": 1}, msg.message)
+            self.assertIs(msg.message, msg["message"])
+            self.assertEqual(1, decode.call_count)
+        self.assertEqual(
+            '{"a": 1}', Message("a", '{"a": 1}', 1, 2, decode=False).message
+        )
+        self.assertIn("id", msg)
+        with self.assertRaises(KeyError):
+            msg["raw"]  # pylint: disable=W0104
+        with self.assertRaises(AttributeError):
+            msg.other = 1  # pylint: disable=W0201
+
+
+class ConsumerUnitTests(unittest.TestCase):
+    """Unit Tests for RedisSMQConsumer"""
+
+    def setUp(self):
+        """Setup"""
+        self.client = fakeredis.FakeStrictRedis(decode_responses=True)
+        self.client.flushall()
+        self.queue = RedisSMQ(client=self.client, qname="test-queue-consumer")
+        self.queue.createQueue(vt=1).execute()
+
+    def wait_for(self, condition, timeout=5):
+        """Wait for condition to become true"""
+        wait_until = time.time() + timeout
+        while not condition() and time.time() < wait_until:
+            time.sleep(0.05)
+        return condition()
+
+    def test_consumer(self):
+        """Test consumer processes messages, extending visibility of slow ones"""
+        self.queue.sendMessages(messages=[{"n": i} for i in range(3)]).execute()
+        processed = []
+
+        def processor(id, message, rc, ts):  # pylint: disable=W0613,W0622
+            """Slow processor, failing first time it sees message 1"""
+            processed.append((message["n"], rc))
+            time.sleep(0.8 if message["n"] == 0 else 0.05)
+            return message["n"] != 1 or rc > 1
+
+        consumer = RedisSMQConsumerThread(
+            "test-queue-consumer", processor, client=self.client, empty_queue_delay=0.1
+        )
+        consumer.start()
+        self.assertTrue(self.wait_for(lambda: len(processed) >= 4))
+        self.assertTrue(consumer.stop(5))
+
+        # Message 0 was not received twice while being processed
+        self.assertListEqual([(0, 1), (1, 1), (1, 2), (2, 1)], sorted(processed))
+        attributes = self.queue.getQueueAttributes().execute()
+        self.assertEqual(0, attributes["msgs"])
+
+    def test_message_object(self):
+        """Test consumer passes message objects, decoding payloads only when accessed"""
+        self.queue.sendMessages(messages=[{"n": i} for i in range(4)]).execute()
+        processed = []
+
+        def processor(msg):
+            """Routing processor, decoding every other message"""
+            self.assertIsInstance(msg, Message)
+            processed.append(msg.message["n"] if len(processed) % 2 else msg.raw)
+            return True
+
+        for consumer_class in (RedisSMQConsumerThread, RedisSMQPoolConsumerThread):
+            processed.clear()
+            with mock.patch(
+                "rsmq.message.decode_message", side_effect=decode_message
+            ) as decode:
+                consumer = consumer_class(
+                    "test-queue-consumer",
+                    processor,
+                    client=self.client,
+                    empty_queue_delay=0.1,
+                    message_object=True,
+                    workers=1,
+                )
+                consumer.start()
+                self.assertTrue(self.wait_for(lambda: len(processed) >= 4))
+                self.assertTrue(consumer.stop(5))
+            self.assertEqual(2, decode.call_count)
+            self.assertEqual(['{"n": 0}', 1, '{"n": 2}', 3], processed)
+            self.queue.sendMessages(messages=[{"n": i} for i in range(4)]).execute()
+
+    def test_realtime_consumer(self):
+        """Test realtime consumer is notified about new and delayed messages"""
+        processed = []
+
+        def processor(id, message, rc, ts):  # pylint: disable=W0613,W0622
+            """Record time message was processed"""
+            processed.append((message, time.time()))
+            return True
+
+        consumer = RedisSMQConsumerThread(
+            "test-queue-consumer",
+            processor,
+            client=self.client,
+            empty_queue_delay=10,
+            realtime=True,
+        )
+        consumer.start()
+        self.assertTrue(self.wait_for(lambda: consumer.notifications is not None))
+        time.sleep(0.2)
+
+        queue = RedisSMQ(client=self.client, qname="test-queue-consumer", realtime=True)
+        sent = time.time()
+        queue.sendMessage(message="now").execute()
+        queue.sendMessage(message="delayed", delay=1).execute()
+        self.assertTrue(self.wait_for(lambda: len(processed) == 2))
+        self.assertEqual("now", processed[0][0])
+        self.assertLess(processed[0][1] - sent, 0.5)
+        self.assertEqual("delayed", processed[1][0])
+        self.assertGreater(processed[1][1] - sent, 0.9)
+        self.assertLess(processed[1][1] - sent, 2)
+        consumer.stop()
+
+    def test_pool_consumer(self):
+        """Test pool consumer processes messages concurrently"""
+        self.queue.sendMessages(messages=[{"n": i} for i in range(20)]).execute()
+        processed = []
+
+        def processor(id, message, rc, ts):  # pylint: disable=W0613,W0622
+            """Slow processor, failing first time it sees message 3"""
+            processed.append((message["n"], rc))
+            time.sleep(0.1)
+            if message["n"] == 5:
+                raise ValueError("Processor error")
+            return message["n"] != 3 or rc > 1
+
+        consumer = RedisSMQPoolConsumerThread(
+            "test-queue-consumer",
+            processor,
+            client=self.client,
+            empty_queue_delay=0.1,
+            retry_delay=0,
+            workers=10,
+            batch_size=5,
+        )
+        start = time.time()
+        consumer.start()
+        self.assertTrue(self.wait_for(lambda: len(processed) >= 21))
+        # 20 messages of 0.1 seconds each are processed concurrently
+        self.assertLess(time.time() - start, 1.5)
+        self.assertTrue(consumer.stop(5))
+
+        self.assertIn((3, 2), processed)
+        self.assertSetEqual(set(range(20)), {n for n, _rc in processed})
+        attributes = self.queue.getQueueAttributes().execute()
+        # Message 5 always fails
+        self.assertEqual(1, attributes["msgs"])
+        self.assertEqual(0, len(consumer.leases))
+
+    def test_restart_broken_executor_once(self):
+        """Executor is replaced once, even if its failures are flushed in several batches"""
+        consumer = RedisSMQPoolConsumer(
+            "test-queue-consumer", lambda **_msg: True, client=self.client
+        )
+        broken = consumer.executor = consumer.create_executor()
+        consumer.restart_executor(broken)
+        replacement = consumer.executor
+        self.assertIsNot(broken, replacement)
+        consumer.restart_executor(broken)
+        self.assertIs(replacement, consumer.executor)
+        replacement.shutdown()
+
+    def test_process_pool_consumer(self):
+        """Test process pool consumer processes messages in worker processes"""
+        self.queue.sendMessages(
+            messages=[{"n": i, "pid": os.getpid()} for i in range(10)]
+        ).execute()
+
+        consumer = RedisSMQProcessPoolConsumerThread(
+            "test-queue-consumer",
+            crashing_processor,
+            client=self.client,
+            empty_queue_delay=0.1,
+            retry_delay=0,
+            workers=2,
+        )
+        consumer.start()
+        self.assertTrue(
+            self.wait_for(
+                lambda: self.queue.getQueueAttributes().execute()["msgs"] == 0, 20
+            )
+        )
+        self.assertTrue(consumer.stop(5))
+        self.assertGreater(self.queue.getQueueAttributes().execute()["totalrecv"], 10)
+
+    def test_reset_client_after_fork(self):
+        """Test client created by controller is not shared with forked processes"""
+        controller = RedisSMQ(host="localhost")
+        self.assertIsNotNone(controller.client)
+        _reset_after_fork()
+        self.assertIsNone(controller._client)  # pylint: disable=W0212
+        # Provided clients are kept
+        self.assertIs(self.client, self.queue._client)  # pylint: disable=W0212
+
+
+if __name__ == "__main__":
+    unittest.main()
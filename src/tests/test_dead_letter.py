@@ -0,0 +1,219 @@
+"""
+Unit Tests for dead-letter queues
+"""
+
+import unittest
+
+import fakeredis
+
+from rsmq.cmd import InvalidParameterValue, QueueDoesNotExist
+from rsmq.rsmq import RedisSMQ
+
+
+class DeadLetterQueueTests(unittest.TestCase):
+    """Messages received too many times are moved to a dead-letter queue"""
+
+    def setUp(self):
+        """Setup"""
+        self.client = fakeredis.FakeStrictRedis(decode_responses=True)
+        self.client.flushall()
+        self.queue = RedisSMQ(client=self.client, qname="test-queue-dlq")
+        self.queue.createQueue(qname="dead").execute()
+
+    def create(self, **kwargs):
+        """Create queue moving messages to `dead` after 2 receives"""
+        kwargs.setdefault("vt", 0)
+        kwargs.setdefault("max_receive_count", 2)
+        self.queue.createQueue(dead_letter_queue="dead", **kwargs).execute()
+
+    def dead(self):
+        """Get messages of the dead-letter queue"""
+        return self.queue.popMessages(qname="dead", count=10).execute()
+
+    def test_attributes(self):
+        """Limit and dead-letter queue are queue attributes"""
+        attributes = self.queue.getQueueAttributes(qname="dead").execute()
+        self.assertEqual(
+            (0, None, 0),
+            (
+                attributes["max_receive_count"],
+                attributes["dead_letter_queue"],
+                attributes["totaldeadlettered"],
+            ),
+        )
+        self.create()
+        attributes = self.queue.getQueueAttributes().execute()
+        self.assertEqual(
+            (2, "dead"),
+            (attributes["max_receive_count"], attributes["dead_letter_queue"]),
+        )
+
+        attributes = self.queue.setQueueAttributes(max_receive_count=5).execute()
+        self.assertEqual(5, attributes["max_receive_count"])
+
+        with self.assertRaises(QueueDoesNotExist):
+            self.queue.setQueueAttributes(dead_letter_queue="unknown").execute()
+        with self.assertRaises(InvalidParameterValue):
+            self.queue.setQueueAttributes(dead_letter_queue="test-queue-dlq").execute()
+        with self.assertRaises(QueueDoesNotExist):
+            self.queue.createQueue(qname="other", dead_letter_queue="unknown").execute()
+        self.assertFalse(self.client.exists("rsmq:other:Q"))
+        with self.assertRaises(InvalidParameterValue):
+            self.queue.createQueue(qname="other").max_receive_count(-1)
+
+    def test_receive(self):
+        """Message is moved when received more than max_receive_count times"""
+        self.create()
+        message_id = self.queue.sendMessage(message="a").execute()
+        for count in (1, 2):
+            self.assertEqual(count, self.queue.receiveMessage().execute()["rc"])
+        self.assertFalse(self.queue.receiveMessage().exceptions(False).execute())
+
+        self.assertEqual(
+            [(message_id, "a", 1)],
+            [(m["id"], m["message"], m["rc"]) for m in self.dead()],
+        )
+        attributes = self.queue.getQueueAttributes().execute()
+        self.assertEqual((0, 1), (attributes["msgs"], attributes["totaldeadlettered"]))
+        fields = self.client.hgetall("rsmq:test-queue-dlq:Q")
+        self.assertFalse([key for key in fields if key.startswith(message_id)])
+
+    def test_receive_next(self):
+        """Receive skips moved messages and returns the next one"""
+        self.create()
+        first = self.queue.sendMessage(message="a").execute()
+        self.queue.receiveMessage().execute()
+        self.queue.receiveMessage().execute()
+        self.queue.sendMessage(message="b").execute()
+        message = self.queue.receiveMessage().execute()
+        self.assertEqual(("b", 1), (message["message"], message["rc"]))
+        self.assertEqual([first], [m["id"] for m in self.dead()])
+
+    def test_receive_messages(self):
+        """Batch receive skips moved messages"""
+        self.create()
+        self.queue.sendMessages(messages=["a", "b"]).execute()
+        self.queue.receiveMessages(count=5).execute()
+        self.queue.receiveMessage().execute()
+        messages = self.queue.receiveMessages(count=5).execute()
+        self.assertEqual(1, len(messages))
+        self.assertEqual(2, messages[0]["rc"])
+        self.assertEqual(1, len(self.dead()))
+
+    def test_receive_messages_refill(self):
+        """Batch receive returns messages queued behind the moved ones"""
+        self.create(vt=30, max_receive_count=1)
+        first = self.queue.sendMessages(messages=["a", "b"]).execute()
+        self.queue.receiveMessages(count=2).execute()
+        self.queue.changeMessagesVisibility(ids=first, vt=0).execute()
+        ids = self.queue.sendMessages(messages=["c", "d"]).execute()
+
+        messages = self.queue.receiveMessages(count=2).execute()
+        self.assertEqual(ids, [m["id"] for m in messages])
+        self.assertEqual(first, [m["id"] for m in self.dead()])
+
+    def test_receive_messages_no_duplicates(self):
+        """Messages visible again right away are returned once per batch"""
+        self.create(max_receive_count=1)
+        self.queue.sendMessages(messages=["a", "b"]).execute()
+        self.queue.receiveMessages(count=2).execute()
+        self.queue.sendMessages(messages=["c", "d", "e"]).execute()
+        messages = self.queue.receiveMessages(count=5).execute()
+        self.assertEqual(["c", "d", "e"], sorted(m["message"] for m in messages))
+        self.assertEqual(2, len(self.dead()))
+
+    def test_compact(self):
+        """Messages of and to compact queues keep their payload"""
+        self.queue.deleteQueue(qname="dead").execute()
+        self.queue.createQueue(qname="dead", layout="compact").execute()
+        self.create(layout="compact")
+        self.queue.sendMessages(messages=["a", "\x1ab"]).execute()
+        for _ in range(3):
+            self.queue.receiveMessages(count=5).exceptions(False).execute()
+        self.assertEqual(
+            [("\x1ab", 1), ("a", 1)],
+            sorted((m["message"], m["rc"]) for m in self.dead()),
+        )
+
+    def test_single_rtt(self):
+        """Single round trip receive reads limit from the queue"""
+        queue = RedisSMQ(client=self.client, qname="test-queue-dlq", single_rtt=True)
+        self.create()
+        queue.sendMessage(message="a").execute()
+        queue.receiveMessage().execute()
+        queue.receiveMessage().execute()
+        self.assertFalse(queue.receiveMessage().exceptions(False).execute())
+        self.assertEqual(["a"], [m["message"] for m in self.dead()])
+
+    def test_realtime(self):
+        """Moved messages are published to realtime channel of the queue they are moved to"""
+        self.create(max_receive_count=1)
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe("rsmq:rt:dead", "rsmq:rt:test-queue-dlq")
+        for _ in range(2):
+            pubsub.get_message(timeout=1)
+
+        for single_rtt, receive in (
+            (False, "receiveMessage"),
+            (True, "receiveMessage"),
+            (False, "receiveMessages"),
+        ):
+            queue = RedisSMQ(
+                client=self.client,
+                qname="test-queue-dlq",
+                realtime=True,
+                single_rtt=single_rtt,
+            )
+            self.queue.sendMessage(message="a").execute()
+            self.queue.receiveMessage().execute()
+            getattr(queue, receive)().exceptions(False).execute()
+            message = pubsub.get_message(timeout=1)
+            self.assertEqual(
+                ("rsmq:rt:dead", "1"), (message["channel"], message["data"])
+            )
+
+        queue.redriveMessages(qname="dead", target="test-queue-dlq").execute()
+        message = pubsub.get_message(timeout=1)
+        self.assertEqual(
+            ("rsmq:rt:test-queue-dlq", "3"), (message["channel"], message["data"])
+        )
+        self.assertIsNone(pubsub.get_message(timeout=0.1))
+        pubsub.close()
+
+    def test_missing_dead_letter_queue(self):
+        """Messages are delivered when the dead-letter queue does not exist"""
+        self.create()
+        self.queue.deleteQueue(qname="dead").execute()
+        self.queue.sendMessage(message="a").execute()
+        for count in (1, 2, 3):
+            self.assertEqual(count, self.queue.receiveMessage().execute()["rc"])
+
+    def test_redrive(self):
+        """Messages are moved back to the target queue"""
+        self.create()
+        ids = self.queue.sendMessages(messages=["a", "b", "c"]).execute()
+        for _ in range(3):
+            self.queue.receiveMessages(count=5).exceptions(False).execute()
+        self.assertEqual(0, self.queue.getQueueAttributes().execute()["msgs"])
+
+        redrive = self.queue.redriveMessages(qname="dead", target="test-queue-dlq")
+        self.assertEqual(1, redrive.count(1).execute())
+        redrive = self.queue.redriveMessages(qname="dead", target="test-queue-dlq")
+        self.assertEqual(2, redrive.batch_size(1).execute())
+        self.assertEqual(0, redrive.execute())
+
+        messages = self.queue.receiveMessages(count=5).execute()
+        self.assertEqual(
+            [("a", 1), ("b", 1), ("c", 1)],
+            sorted((m["message"], m["rc"]) for m in messages),
+        )
+        self.assertEqual(set(ids), {m["id"] for m in messages})
+
+        with self.assertRaises(QueueDoesNotExist):
+            self.queue.redriveMessages(qname="unknown", target="dead").execute()
+        with self.assertRaises(QueueDoesNotExist):
+            self.queue.redriveMessages(qname="dead", target="unknown").execute()
+
+
+if __name__ == "__main__":
+    unittest.main()
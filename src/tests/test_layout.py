@@ -0,0 +1,190 @@
+"""
+Unit Tests for compact storage layout
+"""
+
+import unittest
+
+import fakeredis
+
+from rsmq.cmd import InvalidParameterValue, QueueDoesNotExist
+from rsmq.rsmq import RedisSMQ
+
+QUEUE_KEY = "rsmq:test-queue-layout:Q"
+
+
+class CompactLayoutTests(unittest.TestCase):
+    """Messages of compact queues are stored in a single hash field"""
+
+    def setUp(self):
+        """Setup"""
+        self.client = fakeredis.FakeStrictRedis(decode_responses=True)
+        self.client.flushall()
+        self.queue = RedisSMQ(client=self.client, qname="test-queue-layout")
+
+    def message_fields(self):
+        """Get message fields of the queue hash"""
+        return {
+            key: value
+            for key, value in self.client.hgetall(QUEUE_KEY).items()
+            if len(key.split(":")[0]) == 32
+        }
+
+    def test_create(self):
+        """Layout is set on create and returned with queue attributes"""
+        self.queue.createQueue().execute()
+        self.assertEqual("legacy", self.queue.getQueueAttributes().execute()["layout"])
+        self.assertNotIn("layout", self.client.hgetall(QUEUE_KEY))
+
+        self.queue.createQueue(qname="compact", layout="compact").execute()
+        attributes = self.queue.getQueueAttributes(qname="compact").execute()
+        self.assertEqual("compact", attributes["layout"])
+
+        with self.assertRaises(InvalidParameterValue):
+            self.queue.createQueue(qname="other").layout("other")
+
+    def test_receive(self):
+        """Receive count and first receive time are stored in a header"""
+        self.queue.createQueue(vt=0, layout="compact").execute()
+        message_id = self.queue.sendMessage(message="a").execute()
+        self.assertEqual({message_id: "a"}, self.message_fields())
+
+        first = self.queue.receiveMessage().execute()
+        self.assertEqual(("a", 1), (first["message"], first["rc"]))
+        header = "\x1a1:%s:" % first["ts"]
+        self.assertEqual({message_id: header + "a"}, self.message_fields())
+
+        messages = self.queue.receiveMessages(count=5).execute()
+        self.assertEqual(
+            [("a", 2, first["ts"])],
+            [(m["message"], m["rc"], m["ts"]) for m in messages],
+        )
+        self.assertEqual(
+            {message_id: "\x1a2:%s:a" % first["ts"]}, self.message_fields()
+        )
+
+        message = self.queue.popMessage().execute()
+        self.assertEqual(
+            ("a", 3, first["ts"]), (message["message"], message["rc"], message["ts"])
+        )
+        self.assertEqual({}, self.message_fields())
+
+        self.queue.sendMessages(messages=["b", "c"]).execute()
+        self.queue.receiveMessages(count=5).execute()
+        messages = self.queue.popMessages(count=5).execute()
+        self.assertEqual(
+            [("b", 2), ("c", 2)], [(m["message"], m["rc"]) for m in messages]
+        )
+        self.assertEqual({}, self.message_fields())
+
+    def test_delete(self):
+        """Received messages of compact queues are deleted"""
+        self.queue.createQueue(vt=0, layout="compact").execute()
+        message_id = self.queue.sendMessage(message="a").execute()
+        self.queue.receiveMessage().execute()
+        self.assertTrue(self.queue.deleteMessage(id=message_id).execute())
+        self.assertEqual({}, self.message_fields())
+
+    def test_escape(self):
+        """Messages starting with the header mark are not mistaken for a header"""
+        self.queue.createQueue(vt=0, layout="compact").execute()
+        message = "\x1a1:2:abc"
+        self.queue.sendMessage(message=message).execute()
+        self.queue.sendMessages(messages=[message]).execute()
+        RedisSMQ(
+            client=self.client, qname="test-queue-layout", single_rtt=True
+        ).sendMessage(message=message).execute()
+        for stored in self.message_fields().values():
+            self.assertEqual("\x1a0:0:" + message, stored)
+
+        messages = self.queue.receiveMessages(count=5).execute()
+        self.assertEqual(
+            [(message, 1)] * 3, [(m["message"], m["rc"]) for m in messages]
+        )
+        messages = self.queue.popMessages(count=5).execute()
+        self.assertEqual(
+            [(message, 2)] * 3, [(m["message"], m["rc"]) for m in messages]
+        )
+
+    def test_single_rtt(self):
+        """Single round trip scripts use layout of the queue"""
+        queue = RedisSMQ(client=self.client, qname="test-queue-layout", single_rtt=True)
+        queue.createQueue(vt=0, layout="compact").execute()
+        message_id = queue.sendMessage(message="a").execute()
+        message = queue.receiveMessage().execute()
+        self.assertEqual(
+            {message_id: "\x1a1:%s:a" % message["ts"]}, self.message_fields()
+        )
+        message = queue.popMessage().execute()
+        self.assertEqual(("a", 2), (message["message"], message["rc"]))
+        self.assertEqual({}, self.message_fields())
+
+    def test_pipeline(self):
+        """Pipelined commands use layout of the queue"""
+        self.queue.createQueue(vt=0, layout="compact").execute()
+        self.queue.sendMessage(message="a").execute()
+        pipeline = self.queue.pipeline()
+        pipeline.add(self.queue.receiveMessage())
+        pipeline.add(self.queue.sendMessage(message="\x1ab"))
+        message, message_id = pipeline.execute()
+        self.assertEqual(
+            {
+                message["id"]: "\x1a1:%s:a" % message["ts"],
+                message_id: "\x1a0:0:\x1ab",
+            },
+            self.message_fields(),
+        )
+
+    def test_migrate(self):
+        """Received messages are converted, cached queue definitions are refreshed"""
+        queue = RedisSMQ(
+            client=self.client,
+            qname="test-queue-layout",
+            queue_cache_ttl=60,
+            queue_cache_check=0,
+        )
+        queue.createQueue(vt=0).execute()
+        ids = queue.sendMessages(messages=["a", "b", "\x1ac"]).execute()
+        first = queue.receiveMessage().execute()
+        self.assertEqual(ids[0], first["id"])
+        self.assertIn(ids[0] + ":rc", self.client.hgetall(QUEUE_KEY))
+
+        self.assertEqual(2, self.queue.migrateQueue(batch_size=2).execute())
+        self.assertEqual(0, self.queue.migrateQueue().execute())
+        self.assertEqual(
+            {
+                ids[0]: "\x1a1:%s:a" % first["ts"],
+                ids[1]: "b",
+                ids[2]: "\x1a0:0:\x1ac",
+            },
+            self.message_fields(),
+        )
+        attributes = self.queue.getQueueAttributes().execute()
+        self.assertEqual("compact", attributes["layout"])
+
+        messages = queue.popMessages(count=5).execute()
+        self.assertEqual(
+            [("\x1ac", 1), ("a", 2), ("b", 1)],
+            sorted((m["message"], m["rc"]) for m in messages),
+        )
+
+        with self.assertRaises(QueueDoesNotExist):
+            self.queue.migrateQueue(qname="unknown").execute()
+        self.assertFalse(self.client.exists("rsmq:unknown:Q"))
+
+    def test_legacy_received(self):
+        """Messages received in legacy layout are converted when received again"""
+        self.queue.createQueue(vt=0).execute()
+        message_id = self.queue.sendMessage(message="a").execute()
+        first = self.queue.receiveMessage().execute()
+        self.client.hset(QUEUE_KEY, "layout", "compact")
+
+        message = self.queue.receiveMessage().execute()
+        self.assertEqual((2, first["ts"]), (message["rc"], message["ts"]))
+        self.assertEqual(
+            {message_id: "\x1a2:%s:a" % first["ts"]}, self.message_fields()
+        )
+        self.assertNotIn(message_id + ":rc", self.client.hgetall(QUEUE_KEY))
+
+
+if __name__ == "__main__":
+    unittest.main()
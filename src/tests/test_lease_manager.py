@@ -0,0 +1,81 @@
+"""
+Unit Tests for LeaseManager
+"""
+
+import time
+import unittest
+
+import fakeredis
+
+from rsmq.lease_manager import LeaseManager
+from rsmq.rsmq import RedisSMQ
+
+
+class LeaseManagerUnitTests(unittest.TestCase):
+    """Unit Tests for LeaseManager"""
+
+    def setUp(self):
+        """Setup"""
+        self.client = fakeredis.FakeStrictRedis(decode_responses=True)
+        self.client.flushall()
+        self.queue = RedisSMQ(client=self.client, qname="test-queue-leases")
+        self.queue.createQueue().execute()
+
+    def test_register_unregister(self):
+        """Test registering and unregistering leases"""
+        leases = LeaseManager(self.queue, "test-queue-leases", 30)
+        for i in range(100):
+            leases.register("id-%s" % i)
+        self.assertEqual(100, len(leases))
+        for i in range(0, 100, 2):
+            leases.unregister("id-%s" % i)
+        self.assertEqual(50, len(leases))
+        self.assertIn("id-1", leases)
+        self.assertNotIn("id-2", leases)
+        # removed entries are compacted out of the heap
+        self.assertLessEqual(len(leases._heap), 100)
+
+    def test_extend(self):
+        """Test leases are extended in the background until unregistered"""
+        self.queue.sendMessages(messages=["a", "b"]).execute()
+        messages = self.queue.receiveMessages(vt=1).execute()
+        scores = {
+            msg["id"]: self.client.zscore("rsmq:test-queue-leases", msg["id"])
+            for msg in messages
+        }
+
+        leases = LeaseManager(self.queue, "test-queue-leases", 1)
+        leases.start()
+        for message_id in scores:
+            leases.register(message_id)
+        time.sleep(0.7)
+        leases.unregister(messages[0]["id"])
+        leases.stop(wait=1)
+        self.assertFalse(leases.is_alive())
+
+        for message_id, score in scores.items():
+            self.assertGreater(
+                self.client.zscore("rsmq:test-queue-leases", message_id), score
+            )
+
+    def test_extend_deleted_message(self):
+        """Test lease of deleted message is dropped"""
+        message_id = self.queue.sendMessage(message="a").execute()
+        self.queue.deleteMessage(id=message_id).execute()
+        leases = LeaseManager(self.queue, "test-queue-leases", 30)
+        leases.register(message_id)
+        leases.extend([message_id])
+        self.assertNotIn(message_id, leases)
+
+    def test_zero_vt(self):
+        """Test no lease is kept for queues without visibility timeout"""
+        leases = LeaseManager(self.queue, "test-queue-leases", 0)
+        leases.start()
+        leases.register("id-1")
+        self.assertEqual(0, len(leases))
+        leases.stop(wait=1)
+        self.assertFalse(leases.is_alive())
+
+
+if __name__ == "__main__":
+    unittest.main()
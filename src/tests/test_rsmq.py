@@ -4,11 +4,16 @@ Baseline Unit Test
 import difflib
 import os.path
 import pprint
+import time
 import unittest
+from unittest import mock
 from unittest.util import safe_repr
 
 import fakeredis
+from redis.exceptions import ResponseError
 
+from rsmq.cmd import InvalidParameterValue, MessageTooLong, NoMessageInQueue
+from rsmq.cmd import QueueDoesNotExist
 from rsmq.rsmq import RedisSMQ
 
 
@@ -218,6 +223,468 @@ class TestUnitTests(unittest.TestCase):
             attributes,
         )
 
+    def test_send_messages(self):
+        """Test sending a batch of messages"""
+        client = fakeredis.FakeStrictRedis(decode_responses=True)
+        client.flushall()
+        queue_name = "test-queue-batch"
+        queue = RedisSMQ(client=client, qname=queue_name)
+        queue.createQueue().execute()
+
+        messages = ("message-%s" % i for i in range(25))
+        message_ids = queue.sendMessages(messages=messages, chunk_size=10).execute()
+        self.assertEqual(25, len(message_ids))
+        self.assertEqual(25, len(set(message_ids)))
+
+        attributes = queue.getQueueAttributes().execute()
+        self.assertQueueAttributes({"totalsent": 25, "msgs": 25}, attributes)
+
+        received = [queue.popMessage().execute() for _ in range(25)]
+        self.assertListEqual(message_ids, [msg["id"] for msg in received])
+        self.assertListEqual(
+            ["message-%s" % i for i in range(25)], [msg["message"] for msg in received]
+        )
+
+    def test_send_messages_invalid(self):
+        """Test sending a batch of messages with invalid parameters"""
+        client = fakeredis.FakeStrictRedis(decode_responses=True)
+        client.flushall()
+        queue = RedisSMQ(client=client, qname="test-queue-batch", exceptions=False)
+        queue.createQueue().execute()
+
+        self.assertFalse(queue.sendMessages(messages="not-a-list").ready())
+        self.assertEqual([], queue.sendMessages(messages=[]).execute())
+
+    def test_maxsize(self):
+        """Test messages longer than maxsize are rejected"""
+        client = fakeredis.FakeStrictRedis(decode_responses=True)
+        client.flushall()
+        queue = RedisSMQ(client=client, qname="test-queue-maxsize")
+        queue.createQueue(maxsize=1024).execute()
+
+        for single_rtt in (False, True):
+            queue.options["single_rtt"] = single_rtt
+            self.assertTrue(queue.sendMessage(message="a" * 1024).execute())
+            self.assertTrue(queue.sendMessage(message="\u00e9" * 512).execute())
+            with self.assertRaises(MessageTooLong):
+                queue.sendMessage(message="\u00e9" * 513).execute()
+            with self.assertRaises(MessageTooLong):
+                queue.sendMessage(message={"a": "a" * 1024}).execute()
+
+        with self.assertRaises(MessageTooLong) as context:
+            queue.sendMessages(messages=["b", "c", "d" * 1025], chunk_size=2).execute()
+        self.assertEqual(2, len(context.exception.message_ids))
+
+        pipeline = queue.pipeline()
+        pipeline.add(queue.sendMessages(messages=["e", "f" * 1025]))
+        pipeline.add(queue.sendMessage(message="g"))
+        with self.assertRaises(MessageTooLong):
+            pipeline.execute()
+        self.assertTrue(pipeline.results[1])
+
+        attributes = queue.getQueueAttributes().execute()
+        self.assertQueueAttributes(
+            {"totalsent": 7, "msgs": 7, "totalrejected": 6}, attributes
+        )
+
+        # no limit
+        queue.setQueueAttributes(maxsize=-1).execute()
+        self.assertTrue(queue.sendMessage(message="h" * 100000).execute())
+
+    def test_receive_messages(self):
+        """Test receiving a batch of messages"""
+        client = fakeredis.FakeStrictRedis(decode_responses=True)
+        client.flushall()
+        queue = RedisSMQ(client=client, qname="test-queue-receive-batch")
+        queue.createQueue().execute()
+        message_ids = queue.sendMessages(messages=["a", "b", "c", "d"]).execute()
+
+        messages = queue.receiveMessages(count=3, vt=60).execute()
+        self.assertEqual(3, len(messages))
+        self.assertLessEqual({msg["id"] for msg in messages}, set(message_ids))
+        self.assertTrue(all(msg["rc"] == 1 for msg in messages))
+
+        attributes = queue.getQueueAttributes().execute()
+        self.assertQueueAttributes(
+            {"totalrecv": 3, "msgs": 4, "hiddenmsgs": 3}, attributes
+        )
+
+        # Only one message is still visible
+        messages = queue.receiveMessages(count=3, vt=0).execute()
+        self.assertEqual(1, len(messages))
+
+        # Message with vt of 0 is visible again
+        messages = queue.receiveMessages(count=3).execute()
+        self.assertEqual(1, len(messages))
+        self.assertEqual(2, messages[0]["rc"])
+
+    def test_pop_messages(self):
+        """Test popping a batch of messages"""
+        client = fakeredis.FakeStrictRedis(decode_responses=True)
+        client.flushall()
+        queue = RedisSMQ(client=client, qname="test-queue-pop-batch")
+        queue.createQueue().execute()
+        message_ids = queue.sendMessages(messages=["a", "b", "c"]).execute()
+
+        messages = queue.popMessages(count=5).execute()
+        self.assertSetEqual(set(message_ids), {msg["id"] for msg in messages})
+        self.assertSetEqual({"a", "b", "c"}, {msg["message"] for msg in messages})
+
+        attributes = queue.getQueueAttributes().execute()
+        self.assertQueueAttributes({"totalrecv": 3, "msgs": 0}, attributes)
+        self.assertEqual(
+            ["totalrecv", "totalsent"],
+            sorted(
+                key
+                for key in client.hgetall("rsmq:test-queue-pop-batch:Q")
+                if key not in ("vt", "delay", "maxsize", "created", "modified")
+            ),
+        )
+        self.assertFalse(queue.popMessages().exceptions(False).execute())
+
+    def test_single_rtt(self):
+        """Test send/receive/pop/changeMessageVisibility using single round trip scripts"""
+        client = fakeredis.FakeStrictRedis(decode_responses=True)
+        client.flushall()
+        queue = RedisSMQ(client=client, qname="test-queue-rtt", single_rtt=True)
+        queue.createQueue(vt=20).execute()
+
+        message_id = queue.sendMessage(message="hello").execute()
+        self.assertEqual(32, len(message_id))
+        delayed_id = queue.sendMessage(message="later", delay=60).execute()
+
+        msg = queue.receiveMessage().execute()
+        self.assertEqual(message_id, msg["id"])
+        self.assertEqual("hello", msg["message"])
+        self.assertEqual(1, msg["rc"])
+        self.assertEqual(
+            msg["ts"], int(client.hget("rsmq:test-queue-rtt:Q", message_id + ":fr"))
+        )
+
+        # received message is hidden for vt, and the other one is delayed
+        self.assertRaises(NoMessageInQueue, queue.receiveMessage().execute)
+        self.assertTrue(queue.changeMessageVisibility(id=message_id, vt=0).execute())
+        self.assertTrue(queue.changeMessageVisibility(id=delayed_id, vt=0).execute())
+
+        msg = queue.popMessage().execute()
+        self.assertEqual(message_id, msg["id"])
+        self.assertEqual(2, msg["rc"])
+        msg = queue.popMessage().execute()
+        self.assertEqual(delayed_id, msg["id"])
+        self.assertEqual("later", msg["message"])
+
+        attributes = queue.getQueueAttributes().execute()
+        self.assertQueueAttributes(
+            {"totalsent": 2, "totalrecv": 3, "msgs": 0}, attributes
+        )
+
+        self.assertRaises(NoMessageInQueue, queue.popMessage().execute)
+        self.assertRaises(
+            NoMessageInQueue, queue.changeMessageVisibility(id=message_id).execute
+        )
+        for command in (
+            queue.sendMessage(message="x"),
+            queue.receiveMessage(),
+            queue.popMessage(),
+        ):
+            self.assertRaises(
+                QueueDoesNotExist, command.qname("no-such-queue").execute
+            )
+
+    def test_delete_messages(self):
+        """Test deleting a batch of messages"""
+        client = fakeredis.FakeStrictRedis(decode_responses=True)
+        client.flushall()
+        queue = RedisSMQ(client=client, qname="test-queue-delete")
+        queue.createQueue().execute()
+        message_ids = queue.sendMessages(messages=["a", "b", "c"]).execute()
+        queue.receiveMessages(count=2).execute()
+
+        self.assertDictEqual({}, queue.deleteMessages(ids=[]).execute())
+        result = queue.deleteMessages(
+            ids=[message_ids[0], message_ids[2].encode("utf-8"), "no-such-id"]
+        ).execute()
+        self.assertDictEqual(
+            {message_ids[0]: True, message_ids[2]: True, "no-such-id": False}, result
+        )
+        self.assertEqual(1, queue.getQueueAttributes().execute()["msgs"])
+        # receive count and first receive fields are deleted too
+        fields = client.hkeys("rsmq:test-queue-delete:Q")
+        self.assertFalse([f for f in fields if f.startswith(message_ids[0])])
+        with self.assertRaises(InvalidParameterValue):
+            queue.deleteMessages().ids("abc")
+
+    def test_change_messages_visibility(self):
+        """Test changing visibility of a batch of messages"""
+        client = fakeredis.FakeStrictRedis(decode_responses=True)
+        client.flushall()
+        queue = RedisSMQ(client=client, qname="test-queue-cmv")
+        queue.createQueue().execute()
+        message_ids = queue.sendMessages(messages=["a", "b", "c"]).execute()
+        queue.receiveMessages(count=3).execute()
+        queue.deleteMessage(id=message_ids[1]).execute()
+
+        self.assertListEqual([], queue.changeMessagesVisibility(ids=[]).execute())
+        result = queue.changeMessagesVisibility(ids=message_ids, vt=0).execute()
+        self.assertListEqual([message_ids[0], message_ids[2]], result)
+        msgs = queue.receiveMessages(count=3).execute()
+        self.assertSetEqual({message_ids[0], message_ids[2]}, {m["id"] for m in msgs})
+
+        # default visibility timeout of the queue is used
+        result = queue.changeMessagesVisibility(ids=[message_ids[0]]).execute()
+        self.assertListEqual([message_ids[0]], result)
+        self.assertRaises(
+            QueueDoesNotExist,
+            queue.changeMessagesVisibility(qname="no-such-queue", ids=["x"]).execute,
+        )
+
+    def test_pipeline(self):
+        """Test executing multiple commands in a pipeline"""
+        client = fakeredis.FakeStrictRedis(decode_responses=True)
+        client.flushall()
+        queue = RedisSMQ(client=client, qname="test-queue-p1")
+        queue.createQueue().execute()
+        input_id = queue.sendMessage(message="input").execute()
+        queue.receiveMessage().execute()
+
+        with queue.pipeline() as pipeline:
+            pipeline.add(queue.createQueue(qname="test-queue-p2"))
+            pipeline.add(queue.sendMessage(message="a"))
+            pipeline.add(queue.sendMessages(qname="test-queue-p2", messages=["b", "c"]))
+            pipeline.add(queue.deleteMessage(id=input_id))
+            pipeline.add(
+                queue.sendMessage(qname="no-such-queue", message="x", quiet=True)
+                .exceptions(False)
+            )
+        created, message_id, message_ids, deleted, failed = pipeline.results
+        self.assertTrue(created)
+        self.assertTrue(deleted)
+        self.assertFalse(failed)
+        self.assertEqual(2, len(message_ids))
+
+        # queue definitions are fetched in one round trip, commands run in another
+        with mock.patch.object(client, "pipeline", wraps=client.pipeline) as tx:
+            with queue.pipeline() as pipeline:
+                pipeline.add(queue.receiveMessage())
+                pipeline.add(queue.popMessages(qname="test-queue-p2"))
+                pipeline.add(queue.changeMessageVisibility(id=message_id, vt=0))
+                pipeline.add(queue.deleteMessages(ids=[input_id]))
+            self.assertEqual(2, tx.call_count)
+        received, popped, changed, deleted = pipeline.results
+        self.assertEqual(message_id, received["id"])
+        self.assertListEqual(["b", "c"], sorted(msg["message"] for msg in popped))
+        self.assertTrue(changed)
+        self.assertDictEqual({input_id: False}, deleted)
+
+        pipeline = queue.pipeline()
+        pipeline.add(queue.popMessage())
+        pipeline.add(queue.popMessage(qname="test-queue-p2"))
+        with self.assertRaises(NoMessageInQueue):
+            pipeline.execute()
+        self.assertEqual(message_id, pipeline.results[0]["id"])
+        self.assertIsInstance(pipeline.results[1], NoMessageInQueue)
+
+    def test_pipeline_order(self):
+        """Test pipeline executes commands in the order they were added"""
+        client = fakeredis.FakeStrictRedis(decode_responses=True)
+        client.flushall()
+        queue = RedisSMQ(client=client, qname="test-queue-p3")
+        queue.createQueue().execute()
+        message_id = queue.sendMessage(message="a").execute()
+
+        with queue.pipeline() as pipeline:
+            pipeline.add(queue.sendMessage(message="b"))
+            pipeline.add(queue.getQueueAttributes())
+            pipeline.add(queue.deleteQueue())
+            pipeline.add(queue.sendMessage(message="c", quiet=True).exceptions(False))
+        sent, attributes, deleted, failed = pipeline.results
+        self.assertTrue(sent)
+        self.assertEqual(2, attributes["msgs"])
+        self.assertTrue(deleted)
+        self.assertFalse(failed)
+
+        # Redis errors follow the exceptions setting of the command too
+        client.set("rsmq:test-queue-p3", "not-a-queue")
+        with queue.pipeline() as pipeline:
+            pipeline.add(queue.deleteMessage(id=message_id, quiet=True).exceptions(False))
+        self.assertListEqual([False], pipeline.results)
+        pipeline = queue.pipeline()
+        pipeline.add(queue.deleteMessage(id=message_id))
+        with self.assertRaises(ResponseError):
+            pipeline.execute()
+
+    def test_realtime(self):
+        """Test new messages are published to the realtime channel"""
+        client = fakeredis.FakeStrictRedis(decode_responses=True)
+        client.flushall()
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe("rsmq:rt:test-queue-rt")
+        pubsub.get_message(timeout=1)
+
+        for single_rtt in (False, True):
+            queue = RedisSMQ(
+                client=client,
+                qname="test-queue-rt",
+                realtime=True,
+                single_rtt=single_rtt,
+            )
+            queue.createQueue().exceptions(False).execute()
+            queue.sendMessage(message="a").execute()
+            self.assertEqual("1", pubsub.get_message(timeout=1)["data"])
+
+        queue.sendMessages(messages=["b", "c"]).execute()
+        self.assertEqual("2", pubsub.get_message(timeout=1)["data"])
+
+        # Not published unless realtime is on
+        RedisSMQ(client=client, qname="test-queue-rt").sendMessage(
+            message="d"
+        ).execute()
+        self.assertIsNone(pubsub.get_message(timeout=0.1))
+        pubsub.close()
+
+    def test_queue_cache(self):
+        """Test queue definitions are cached and invalidated when queue changes"""
+        client = fakeredis.FakeStrictRedis(decode_responses=True)
+        client.flushall()
+        queue = RedisSMQ(
+            client=client,
+            qname="test-queue-c",
+            queue_cache_ttl=60,
+            queue_cache_check=60,
+            clock_sync=True,
+        )
+        other = RedisSMQ(client=client, qname="test-queue-c")
+        queue.createQueue(vt=10).execute()
+        # definitions of recently modified queues are not cached
+        queue.sendMessage(message="a").execute()
+        self.assertEqual(0, len(queue.queue_cache))
+        client.hset("rsmq:test-queue-c:Q", "modified", int(time.time()) - 60)
+
+        queue.sendMessage(message="b").execute()
+        self.assertEqual(1, len(queue.queue_cache))
+        # cached definition and estimated time are used without reading the queue
+        with mock.patch.object(client, "time") as redis_time:
+            self.assertEqual("a", queue.receiveMessage().execute()["message"])
+            self.assertEqual(0, redis_time.call_count)
+        self.assertEqual(1, queue.clock.stats()["samples"])
+        self.assertDictEqual(
+            {"hits": 1, "misses": 2, "checks": 0}, queue.queue_cache.stats()
+        )
+
+        # changes made by other controllers are only detected by periodic checks
+        other.setQueueAttributes(vt=0).execute()
+        self.assertEqual("b", queue.receiveMessage().execute()["message"])
+        with self.assertRaises(NoMessageInQueue):
+            queue.receiveMessage().execute()
+        queue.queue_cache.check_interval = 0
+        queue.sendMessage(message="c").execute()
+        self.assertEqual("c", queue.receiveMessage().execute()["message"])
+        self.assertEqual("c", queue.receiveMessage().execute()["message"])
+        self.assertEqual(0, len(queue.queue_cache))
+
+        # changes are detected by revision, even if modified is the same
+        client.hset("rsmq:test-queue-c:Q", "modified", int(time.time()) - 60)
+        queue.sendMessage(message="d").execute()
+        self.assertEqual("0", queue.queue_cache.get("rsmq:test-queue-c:Q")[0]["vt"])
+        other.setQueueAttributes(vt=10).execute()
+        client.hset("rsmq:test-queue-c:Q", "modified", int(time.time()) - 60)
+        queue.sendMessage(message="e").execute()
+        self.assertEqual("10", queue.queue_cache.get("rsmq:test-queue-c:Q")[0]["vt"])
+
+        # changes made by the same controller invalidate the cache
+        queue.setQueueAttributes(delay=1).execute()
+        self.assertEqual(0, len(queue.queue_cache))
+        queue.deleteQueue().execute()
+        with self.assertRaises(QueueDoesNotExist):
+            queue.sendMessage(message="f").execute()
+
+        # deleted queues are detected
+        queue.createQueue().execute()
+        client.hset("rsmq:test-queue-c:Q", "modified", int(time.time()) - 60)
+        queue.sendMessage(message="g").execute()
+        self.assertEqual(1, len(queue.queue_cache))
+        other.deleteQueue().execute()
+        with self.assertRaises(QueueDoesNotExist):
+            queue.sendMessage(message="h").execute()
+        self.assertEqual(0, len(queue.queue_cache))
+
+    def test_queue_cache_lru(self):
+        """Test queue cache keeps most recently used definitions"""
+        client = fakeredis.FakeStrictRedis(decode_responses=True)
+        client.flushall()
+        queue = RedisSMQ(client=client, queue_cache_ttl=60, queue_cache_size=2)
+        for qname in ("q1", "q2", "q3"):
+            queue.createQueue(qname=qname).execute()
+            client.hset("rsmq:%s:Q" % qname, "modified", int(time.time()) - 60)
+        pipeline = queue.pipeline()
+        for qname in ("q1", "q2", "q1", "q3"):
+            pipeline.add(queue.sendMessage(qname=qname, message=qname))
+            pipeline.execute()
+        self.assertIsNone(queue.queue_cache.get("rsmq:q2:Q")[0])
+        self.assertIsNotNone(queue.queue_cache.get("rsmq:q1:Q")[0])
+        self.assertIsNotNone(queue.queue_cache.get("rsmq:q3:Q")[0])
+    def test_command_params(self):
+        """Test parameter accessors and metadata are created once per command class"""
+        queue = RedisSMQ(exceptions=False)
+        command = queue.receiveMessage(qname="q1", vt=5)
+        self.assertIs(type(command).vt, type(queue.receiveMessage()).vt)
+        self.assertFalse(hasattr(command, "__dict__"))
+        self.assertEqual(("q1", 5), (command.get_qname, command.get_vt))
+        self.assertIs(command, command.qname("q2").vt(-1))
+        self.assertEqual(("q2", 5), (command.get_qname, command.get_vt))
+        self.assertEqual(["qname"], command._required_params())
+        with self.assertRaises(AttributeError):
+            command.count(5)
+        with self.assertRaises(InvalidParameterValue):
+            command.exceptions().vt(-1)
+
+        class CustomCommand(type(command)):
+            """Command with additional parameter"""
+            PARAMS = dict(type(command).PARAMS, tag={"required": True, "value": "a"})
+
+            def _validate_tag(self, tag):
+                return tag in ("a", "b")
+
+        custom = CustomCommand(queue, qname="q1", tag="b", vt=5)
+        self.assertEqual(("b", 5), (custom.get_tag, custom.get_vt))
+        self.assertTrue(custom.tag("c").ready())
+        self.assertEqual("b", custom.get_tag)
+        self.assertEqual(["qname", "tag"], custom._required_params())
+        self.assertTrue(hasattr(custom, "__dict__"))
+
+    def test_prepare_send(self):
+        """Test prepared sendMessage"""
+        client = fakeredis.FakeStrictRedis(decode_responses=True)
+        client.flushall()
+        queue = RedisSMQ(client=client, qname="test-queue-prepared")
+        queue.createQueue(vt=0).execute()
+        send = queue.prepare_send(delay=0)
+        self.assertEqual("rsmq:test-queue-prepared:Q", send.queue_key)
+
+        message_id = send("a")
+        delayed_id = send({"b": 1}, delay=100)
+        pipeline = queue.pipeline()
+        pipeline.add(send.command("c"))
+        pipeline.add(send.command("d"))
+        pipelined_ids = pipeline.execute()
+        messages = queue.popMessages(count=5).execute()
+        self.assertEqual(
+            dict([(message_id, "a")] + list(zip(pipelined_ids, ["c", "d"]))),
+            {msg["id"]: msg["message"] for msg in messages},
+        )
+        self.assertEqual(1, queue.getQueueAttributes().execute()["msgs"])
+        self.assertTrue(queue.deleteMessage(id=delayed_id).execute())
+
+        with self.assertRaises(InvalidParameterValue):
+            send("")
+        with self.assertRaises(InvalidParameterValue):
+            send("a", delay=-1)
+        for kwargs in ({"qname": None}, {"vt": 1}, {"message": "a"}):
+            with self.assertRaises(InvalidParameterValue):
+                queue.prepare_send(**kwargs)
+        with self.assertRaises(QueueDoesNotExist):
+            queue.prepare_send(qname="unknown")("a")
+
 
 if __name__ == "__main__":
     unittest.main()
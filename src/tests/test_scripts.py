@@ -0,0 +1,55 @@
+"""
+Unit Tests for Lua script manager
+"""
+
+import unittest
+
+import fakeredis
+
+from rsmq.rsmq import RedisSMQ
+from rsmq.scripts import SCRIPTS
+
+
+class ScriptManagerUnitTests(unittest.TestCase):
+    """Unit Tests for ScriptManager"""
+
+    def setUp(self):
+        """Setup"""
+        self.client = fakeredis.FakeStrictRedis(decode_responses=True)
+        self.client.flushall()
+        self.queue = RedisSMQ(client=self.client, qname="test-queue-scripts")
+        self.queue.createQueue().execute()
+        self.queue.sendMessages(messages=["a", "b", "c"]).execute()
+
+    def test_scripts_loaded_once(self):
+        """Scripts are loaded once and not re-loaded on each execution"""
+        for _ in range(3):
+            self.queue.receiveMessage(vt=0).execute()
+        self.queue.reset_scripts()
+        self.queue.receiveMessage(vt=0).execute()
+        self.assertDictEqual(
+            {"loads": 2 * len(SCRIPTS), "reloads": 0, "executions": 4},
+            self.queue.scripts.stats(),
+        )
+
+    def test_scripts_reloaded_on_noscript(self):
+        """Scripts are re-loaded when redis lost them"""
+        self.queue.receiveMessage(vt=0).execute()
+        self.client.script_flush()
+        msg = self.queue.receiveMessage(vt=0).execute()
+        self.assertIn(msg["message"], ["a", "b", "c"])
+        self.assertDictEqual(
+            {"loads": 2 * len(SCRIPTS), "reloads": 1, "executions": 2},
+            self.queue.scripts.stats(),
+        )
+
+    def test_sha1_compatibility(self):
+        """Script SHA1 properties are still available"""
+        self.assertEqual(
+            self.queue.scripts.sha1("receiveMessage"), self.queue.receiveMessageSha1
+        )
+        self.assertEqual(40, len(self.queue.popMessageSha1))
+
+
+if __name__ == "__main__":
+    unittest.main()
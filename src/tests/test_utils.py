@@ -152,6 +152,40 @@ class CmdUtilsUnitTests(unittest.TestCase):
             # length is always 22 plus encoded value of 10000000 = which is
             self.assertEqual(27, len(mid))
 
+    def test_random_chars(self):
+        """Test random_chars"""
+        for length in (0, 1, 22, 1000):
+            rstr = utils.random_chars(length)
+            self.assertEqual(length, len(rstr))
+            self.assertLessEqual(set(rstr), set(utils.DEFAULT_CHARSET))
+        self.assertEqual(set(utils.DEFAULT_CHARSET), set(utils.random_chars(10000)))
+
+    def test_make_message_ids(self):
+        """Test make_message_ids"""
+        usec = 1600000000000000 - 100
+        mids = utils.make_message_ids(usec, 2000)
+        self.assertEqual(2000, len(set(mids)))
+        self.assertListEqual(sorted(mids), mids)
+        for index, mid in enumerate(mids):
+            self.assertEqual(32, len(mid))
+            self.assertEqual(utils.baseXencode(usec + index), mid[:10])
+        # small values are encoded without leading zeros
+        mids = utils.make_message_ids(1295, 2)
+        self.assertEqual(["zz", "100"], [mid[:-22] for mid in mids])
+        self.assertEqual([], utils.make_message_ids(usec, 0))
+
+    def test_message_too_long(self):
+        """Test message_too_long"""
+        self.assertFalse(utils.message_too_long("a" * 10, 10))
+        self.assertTrue(utils.message_too_long("a" * 11, 10))
+        self.assertFalse(utils.message_too_long("a" * 11, -1))
+        # length of strings is their utf-8 encoded length
+        self.assertFalse(utils.message_too_long("\u00e9" * 5, 10))
+        self.assertTrue(utils.message_too_long("\u00e9" * 6, 10))
+        self.assertTrue(utils.message_too_long("\U0001f600" * 3, 10))
+        self.assertFalse(utils.message_too_long(b"\x00" * 10, 10))
+        self.assertTrue(utils.message_too_long(memoryview(b"\x00" * 11), 10))
+
     def test_baseXencode(self):
         """Test baseXencode"""
         for raw, encoded, charset in BASE_X_ENCODED_TESTS: